@@ -0,0 +1,57 @@
+"""ASGI applications wrapping Django's, for what Django 4.1 cannot serve under ASGI."""
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgiInstance
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import Resolver404, resolve
+
+
+class WSGIViews:
+    """Serve the views of `view_names` with Django's WSGI handler, pass all else on.
+
+    Django 4.1 iterates streaming responses in the event loop under ASGI, where
+    their queries fail, so views which query while they stream are served like
+    under WSGI: every request in a thread of its own, which it holds until the
+    response is sent, and through Django's middleware.
+    """
+
+    def __init__(self, application, view_names):
+        self.application = application
+        self.view_names = frozenset(view_names)
+        self.handler = WSGIHandler()
+
+    def wsgi_application(self, environ, start_response):
+        response = self.handler(environ, start_response)
+        try:
+            yield from response
+        finally:
+            # Sends request_finished, which closes the database connections.
+            response.close()
+
+    async def __call__(self, scope, receive, send):
+        match = resolve_scope(scope)
+        if match is None or match.view_name not in self.view_names:
+            return await self.application(scope, receive, send)
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application)(scope, receive, send)
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """asgiref's adapter of a WSGI request, run in a thread of its own.
+
+    asgiref runs it in the one thread of thread-sensitive code, which a long
+    response would hold for all other requests.
+    """
+
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False
+    )
+
+
+def resolve_scope(scope):
+    """Return the `ResolverMatch` of the path of an HTTP scope, or None."""
+    if scope["type"] != "http":
+        return None
+    path = scope["path"].removeprefix(scope.get("root_path", ""))
+    try:
+        return resolve(path)
+    except Resolver404:
+        return None
@@ -0,0 +1,46 @@
+import logging
+
+import redis
+
+from apps.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+def get_or_build(cache, key, build, timeout, name):
+    """Return the value of `key` in the Django cache, or build and cache it.
+
+    `build` is called without arguments, exceptions it raises are not cached. The
+    lookup is counted for the cache `name`, see `record_cache`. Errors of the cache
+    are logged and count as a miss.
+    """
+    try:
+        value = cache.get(key)
+    except (redis.RedisError, OSError):
+        logger.exception("Reading %s from the cache failed", name)
+        value = None
+    record_cache(name, hit=value is not None)
+    if value is None:
+        value = build()
+        try:
+            cache.set(key, value, timeout=timeout)
+        except (redis.RedisError, OSError):
+            logger.exception("Writing %s to the cache failed", name)
+    return value
+
+
+async def aget_or_build(cache, key, build, timeout, name):
+    """Like `get_or_build` with the async cache API, `build` is a coroutine function."""
+    try:
+        value = await cache.aget(key)
+    except (redis.RedisError, OSError):
+        logger.exception("Reading %s from the cache failed", name)
+        value = None
+    record_cache(name, hit=value is not None)
+    if value is None:
+        value = await build()
+        try:
+            await cache.aset(key, value, timeout=timeout)
+        except (redis.RedisError, OSError):
+            logger.exception("Writing %s to the cache failed", name)
+    return value
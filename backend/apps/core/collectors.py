@@ -0,0 +1,84 @@
+import threading
+import time
+
+from kombu.exceptions import OperationalError
+from prometheus_client.core import GaugeMetricFamily
+
+
+class CeleryQueueCollector:
+    """Collect the number of messages waiting in the queues of a Celery app.
+
+    The broker is asked at most every `cache_timeout` seconds per process, and is
+    given up on after `timeout` seconds, so a slow or unreachable broker does not
+    stall scrapes. A queue which does not exist yet, or which the Redis transport
+    dropped because it was empty, has length 0.
+    """
+
+    def __init__(self, app, timeout=1.0, cache_timeout=15.0):
+        self.app = app
+        self.timeout = timeout
+        self.cache_timeout = cache_timeout
+        self._lock = threading.Lock()
+        self._expires = 0.0
+        self._lengths = None
+
+    @staticmethod
+    def _queue_length(connection, queue):
+        channel = connection.channel()
+        try:
+            return channel.queue_declare(queue=queue, passive=True).message_count
+        except connection.channel_errors:
+            return 0
+        finally:
+            channel.close()
+
+    def collect(self):
+        lengths = self.queue_lengths()
+        up = GaugeMetricFamily(
+            "lem_celery_broker_up", "Whether the Celery broker could be reached."
+        )
+        up.add_metric([], 0 if lengths is None else 1)
+        yield up
+        if lengths is None:
+            return
+        length = GaugeMetricFamily(
+            "lem_celery_queue_length",
+            "Messages waiting in a Celery queue.",
+            labels=["queue"],
+        )
+        for queue, count in lengths.items():
+            length.add_metric([queue], count)
+        yield length
+
+    def queue_lengths(self):
+        """Return the lengths of the queues by name, or None if the broker is down.
+
+        The result is cached for `cache_timeout` seconds, failures included.
+        """
+        with self._lock:
+            if time.monotonic() >= self._expires:
+                self._lengths = self._read_queue_lengths()
+                self._expires = time.monotonic() + self.cache_timeout
+            return self._lengths
+
+    def _read_queue_lengths(self):
+        timeouts = {
+            "socket_timeout": self.timeout,
+            "socket_connect_timeout": self.timeout,
+        }
+        with self.app.connection_for_read(
+            connect_timeout=self.timeout, transport_options=timeouts
+        ) as connection:
+            errors = (
+                OperationalError,
+                *connection.connection_errors,
+                *connection.channel_errors,
+            )
+            try:
+                connection.ensure_connection(max_retries=1, interval_start=0)
+                return {
+                    queue: self._queue_length(connection, queue)
+                    for queue in sorted(self.app.amqp.queues)
+                }
+            except errors:
+                return None
@@ -0,0 +1,109 @@
+"""PostgreSQL backend taking its connections from an `apps.core.db.pool` pool.
+
+Configured by the POOL entry of the database settings::
+
+    "POOL": {"MIN_SIZE": 2, "MAX_SIZE": 10, "TIMEOUT": 5.0, "PRE_PING": True}
+
+CONN_MAX_AGE should be 0, so Django returns the connection at the end of every
+request.
+"""
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from apps.core.db.pool import ConnectionPool, PoolTimeout, get_pool
+
+POOL_DEFAULTS = {"MIN_SIZE": 0, "MAX_SIZE": 10, "TIMEOUT": 5.0, "PRE_PING": True}
+
+
+def connect(conn_params, isolation_level):
+    """Open a connection like `base.DatabaseWrapper.get_new_connection`."""
+    connection = psycopg2.connect(**conn_params)
+    if isolation_level is not None and isolation_level != connection.isolation_level:
+        connection.set_session(isolation_level=isolation_level)
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    connection.autocommit = True
+    return connection
+
+
+def ping(connection):
+    """Return whether the connection still answers a query."""
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def reset(connection):
+    """Roll back what the last user left open, False when the connection is broken.
+
+    Idle connections are kept in autocommit mode, so the ping on checkout does not
+    open a transaction.
+    """
+    if connection.closed:
+        return False
+    status = connection.info.transaction_status
+    if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    try:
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+        connection.autocommit = True
+    except psycopg2.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def pool(self):
+        """Return the pool of this database in this process.
+
+        Pools are kept by the connection parameters too, so a changed NAME, like
+        the test database's, gets its own.
+        """
+        conn_params = self.get_connection_params()
+        key = (self.alias, repr(sorted(conn_params.items())))
+        return get_pool(key, lambda: self._create_pool(conn_params))
+
+    def open_pool(self):
+        self.pool().open()
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.pool().checkout()
+        except PoolTimeout as error:
+            raise psycopg2.OperationalError(str(error)) from error
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # The wrapper keeps the connection until the block ends, so it can
+                # not be handed out again.
+                self.pool().discard(self.connection)
+            else:
+                self.pool().checkin(self.connection)
+
+    def _create_pool(self, conn_params):
+        config = {**POOL_DEFAULTS, **self.settings_dict.get("POOL", {})}
+        isolation_level = self.settings_dict["OPTIONS"].get("isolation_level")
+        return ConnectionPool(
+            lambda: connect(conn_params, isolation_level),
+            min_size=config["MIN_SIZE"],
+            max_size=config["MAX_SIZE"],
+            timeout=config["TIMEOUT"],
+            pre_ping=config["PRE_PING"],
+            ping=ping,
+            reset=reset,
+            name=self.alias,
+        )
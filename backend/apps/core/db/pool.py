@@ -0,0 +1,224 @@
+"""A thread-safe pool of database connections, shared by the threads of a process.
+
+Django opens a connection per thread and, with CONN_MAX_AGE, keeps it until it
+gets too old, so a process holds as many connections as it ever had threads, and
+after an idle period all of them reconnect at once. With the pooled backend,
+`apps.core.db.backends.postgresql_pool`, every request takes a connection from
+the pool and returns it when Django closes it at the end of the request, so the
+connections of a process never exceed the pool's maximum size, and requests
+wait for a free connection instead of opening more.
+"""
+import contextlib
+import os
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+pool_wait = Histogram(
+    "lem_db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    ["alias"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float("inf")),
+)
+pool_timeouts = Counter(
+    "lem_db_pool_timeouts",
+    "Checkouts which found no free pooled connection in time.",
+    ["alias"],
+)
+pool_failed_pings = Counter(
+    "lem_db_pool_failed_pings",
+    "Pooled connections dropped because they failed the check on checkout.",
+    ["alias"],
+)
+pool_connections = Gauge(
+    "lem_db_pool_connections",
+    "Open pooled database connections.",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Hand out connections made by `connect`, at most `max_size` at once.
+
+    Args:
+        connect: A callable returning a new connection.
+        min_size: The number of connections opened by `open`.
+        max_size: The number of connections, idle or in use, never exceeded.
+        timeout: Seconds `checkout` waits for a free connection.
+        ping: A callable returning whether an idle connection still works, called
+            on checkout when `pre_ping` is set.
+        reset: A callable preparing a returned connection for the next checkout,
+            returning False when it cannot be reused.
+        name: The label of the pool's metrics, the database alias.
+    """
+
+    def __init__(
+        self,
+        connect,
+        min_size=0,
+        max_size=10,
+        timeout=5.0,
+        pre_ping=True,
+        ping=None,
+        reset=None,
+        name="default",
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.ping = ping
+        self.reset = reset
+        self.name = name
+        # The process which opened the connections, a forked child has to open its own.
+        self.pid = os.getpid()
+        self.closed = False
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    def open(self):
+        """Open connections until the pool has `min_size`."""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self._add_idle(self._connect())
+
+    def checkout(self):
+        """Return an idle connection, a new one, or wait for one to be returned.
+
+        Raises `PoolTimeout` when no connection is free after `timeout` seconds.
+        """
+        start = time.monotonic()
+        while True:
+            connection = self._take(start + self.timeout)
+            if connection is None:
+                connection = self._connect()
+                break
+            if not self.pre_ping or self.ping is None or self.ping(connection):
+                break
+            pool_failed_pings.labels(self.name).inc()
+            self._drop(connection)
+        pool_wait.labels(self.name).observe(time.monotonic() - start)
+        pool_connections.labels(self.name, "in_use").inc()
+        return connection
+
+    def checkin(self, connection):
+        """Return a connection taken with `checkout`, to be used again."""
+        pool_connections.labels(self.name, "in_use").dec()
+        if self.closed or (self.reset is not None and not self.reset(connection)):
+            self._drop(connection)
+        else:
+            self._add_idle(connection)
+
+    def discard(self, connection):
+        """Close a connection taken with `checkout`, making room for a new one."""
+        pool_connections.labels(self.name, "in_use").dec()
+        self._drop(connection)
+
+    def close(self):
+        """Close the idle connections, connections in use are closed on checkin."""
+        with self._condition:
+            self.closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        pool_connections.labels(self.name, "idle").dec(len(idle))
+        for connection in idle:
+            connection.close()
+
+    def _take(self, deadline):
+        """Return an idle connection, or None after reserving room for a new one."""
+        with self._condition:
+            while True:
+                if self._idle:
+                    pool_connections.labels(self.name, "idle").dec()
+                    # The most recently used connection is the least likely to have
+                    # been closed by the server.
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    pool_timeouts.labels(self.name).inc()
+                    message = f"No connection of the pool {self.name!r} became free within {self.timeout} seconds"
+                    raise PoolTimeout(message)
+                self._condition.wait(remaining)
+
+    def _add_idle(self, connection):
+        with self._condition:
+            self._idle.append(connection)
+            pool_connections.labels(self.name, "idle").inc()
+            self._condition.notify()
+
+    def _drop(self, connection):
+        with contextlib.suppress(Exception):  # the connection is dropped anyway
+            connection.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _connect(self):
+        try:
+            return self.connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, create):
+    """Return the pool of the key in this process, made by `create`."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            # Connections inherited from the parent process must not be used or
+            # closed, they still belong to the parent.
+            pool = _pools[key] = create()
+        return pool
+
+
+def close_pools():
+    """Close the idle connections of all pools of this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def open_pools():
+    """Open `MIN_SIZE` connections of every pooled database of this process.
+
+    Called by the WSGI and ASGI entry points, so the first requests of a worker do
+    not have to connect.
+    """
+    from django.db import connections
+
+    for alias in connections:
+        open_pool = getattr(connections[alias], "open_pool", None)
+        if open_pool is not None:
+            open_pool()
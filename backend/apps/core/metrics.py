@@ -0,0 +1,120 @@
+"""Statistics of the request being handled and their aggregation per view.
+
+`RequestMetricsMiddleware` collects a `RequestStats` per request and observes it
+in the histograms below, labeled by the name of the resolved URL. Every database
+connection times its queries with `record_query`, and caches report their lookups
+with `record_cache`, both count them for the current request, if any. The request
+is found in a context variable, which `sync_to_async` copies, so queries of async
+views made in a thread are counted too.
+
+With several worker processes, gunicorn's or Celery's, the environment variable
+PROMETHEUS_MULTIPROC_DIR has to name a directory shared by all of them, which is
+emptied before they start. Every process then writes its metrics to files there
+and `apps.core.views.metrics` aggregates them. Gunicorn has to call
+`mark_process_dead` from its `child_exit` hook, as `config.gunicorn` does, Celery
+workers do it on their own.
+"""
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import Counter as CounterMetric
+from prometheus_client import Histogram, multiprocess
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float("inf"))
+
+request_duration = Histogram(
+    "lem_request_duration_seconds",
+    "Time spent handling requests.",
+    ["view", "method"],
+)
+request_db_duration = Histogram(
+    "lem_request_db_duration_seconds",
+    "Time spent executing SQL queries per request.",
+    ["view", "method"],
+)
+request_queries = Histogram(
+    "lem_request_queries",
+    "Number of SQL queries per request.",
+    ["view", "method"],
+    buckets=QUERY_BUCKETS,
+)
+cache_lookups = CounterMetric(
+    "lem_cache_lookups",
+    "Cache lookups, also outside of requests.",
+    ["cache", "result"],
+)
+request_cache_lookups = CounterMetric(
+    "lem_request_cache_lookups",
+    "Cache lookups made while handling requests.",
+    ["view", "cache", "result"],
+)
+task_duration = Histogram(
+    "lem_celery_task_duration_seconds",
+    "Time spent running Celery tasks, by their final state.",
+    ["task", "state"],
+)
+
+
+def mark_process_dead(pid):
+    """Drop the live metrics of an exited worker process in multiprocess mode."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def multiprocess_enabled():
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+@dataclass
+class RequestStats:
+    """Queries, their duration and cache lookups of one request."""
+
+    started: float = field(default_factory=time.perf_counter)
+    queries: int = 0
+    db_time: float = 0.0
+    cache_hits: Counter = field(default_factory=Counter)
+    cache_misses: Counter = field(default_factory=Counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Time a query, to be installed with `connection.execute_wrapper`."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def observe(self, view, method, elapsed):
+        """Add the statistics to the histograms of the view."""
+        request_duration.labels(view, method).observe(elapsed)
+        request_db_duration.labels(view, method).observe(self.db_time)
+        request_queries.labels(view, method).observe(self.queries)
+        for result, counts in (("hit", self.cache_hits), ("miss", self.cache_misses)):
+            for cache, count in counts.items():
+                request_cache_lookups.labels(view, cache, result).inc(count)
+
+
+current_stats = ContextVar("current_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Count and time a query for the current request, installed on all connections."""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.execute_wrapper(execute, sql, params, many, context)
+
+
+def record_cache(cache, hit):
+    """Count a lookup in the named cache, also for the request being handled."""
+    cache_lookups.labels(cache, "hit" if hit else "miss").inc()
+    stats = current_stats.get()
+    if stats is not None:
+        (stats.cache_hits if hit else stats.cache_misses)[cache] += 1
@@ -0,0 +1,130 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.core.metrics import RequestStats, current_stats
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED_VIEW = "<unresolved>"
+
+
+class AsyncCapableMiddleware:
+    """Base of middleware which runs without a thread under ASGI.
+
+    Django passes an async `get_response` under ASGI, then requests are handled by
+    `__acall__`, otherwise by `call`. Middleware which is only sync would make
+    Django run it in a thread and every async view behind it in another event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            # Lets Django tell that the middleware is async, like MiddlewareMixin.
+            markcoroutinefunction(self)
+
+    def call(self, request):
+        return self.get_response(request)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.call(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """Record the queries, their duration and cache lookups of every request.
+
+    The statistics are aggregated per resolved URL name in the histograms of
+    `apps.core.metrics`, sent in a `Server-Timing` header when
+    `REQUEST_METRICS_SERVER_TIMING` is set, and a warning is logged for requests
+    over the budgets of `REQUEST_METRICS_BUDGETS`, which can be overridden per URL
+    name in `REQUEST_METRICS_VIEW_BUDGETS`. Queries are counted by an execute
+    wrapper instead of the query log, so it works without DEBUG and costs a few
+    microseconds per query. It should come first in `MIDDLEWARE` to time the whole
+    stack.
+
+    For streaming responses only the time until the response is returned is
+    measured.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return UNRESOLVED_VIEW
+        return match.view_name or UNRESOLVED_VIEW
+
+    @staticmethod
+    def server_timing(stats, elapsed):
+        hits, misses = sum(stats.cache_hits.values()), sum(stats.cache_misses.values())
+        return ", ".join(
+            [
+                f"total;dur={elapsed * 1000:.1f}",
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+                f'cache;desc="{hits} hits / {misses} misses"',
+            ]
+        )
+
+    @staticmethod
+    def check_budgets(request, view, stats, elapsed):
+        budgets = {
+            **settings.REQUEST_METRICS_BUDGETS,
+            **settings.REQUEST_METRICS_VIEW_BUDGETS.get(view, {}),
+        }
+        measured = {"queries": stats.queries, "db_time": stats.db_time, "time": elapsed}
+        exceeded = [
+            f"{name} {measured[name]:.3g} > {budget}"
+            for name, budget in budgets.items()
+            if budget is not None and measured[name] > budget
+        ]
+        if exceeded:
+            logger.warning(
+                "%s %s (%s) over budget: %s",
+                request.method,
+                request.path,
+                view,
+                ", ".join(exceeded),
+                extra={"view": view, **measured},
+            )
+
+    def call(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        elapsed = stats.elapsed
+        view = self.view_name(request)
+        stats.observe(view, request.method, elapsed)
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response["Server-Timing"] = self.server_timing(stats, elapsed)
+        self.check_budgets(request, view, stats, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats)
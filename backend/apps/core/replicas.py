@@ -0,0 +1,116 @@
+"""Routing of reads of some apps to read replicas, with read-your-writes.
+
+Replicas are only read within requests with a safe method, as chosen by
+`ReplicaRoutingMiddleware`, and only for models of `REPLICA_ROUTED_APPS`; every
+other query, and all queries of commands and Celery tasks, which often read what
+was just committed, go to the primary. A request stops reading from the replica
+at its first write, and its response sets a cookie pinning the client's requests
+to the primary for `REPLICA_PIN_SECONDS`, long enough for the replicas to catch
+up with the write.
+"""
+import random
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.core.middleware import AsyncCapableMiddleware
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@dataclass
+class RoutingState:
+    """The replica the reads of a request go to, None for the primary."""
+
+    replica: str = None
+    wrote: bool = False
+
+
+current_routing = ContextVar("current_routing", default=None)
+
+
+class ReplicaRouter:
+    """Route reads of `REPLICA_ROUTED_APPS` to the replica chosen for the request."""
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        state = current_routing.get()
+        if (
+            state is None
+            or state.replica is None
+            or model._meta.app_label not in settings.REPLICA_ROUTED_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.replica = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """Choose the database of the reads of every request and pin clients after writes.
+
+    It should come before any middleware which reads routed models.
+    """
+
+    @staticmethod
+    def finish(response, state):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    @staticmethod
+    def choose_replica(request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        ):
+            return None
+        replicas = settings.DATABASE_REPLICAS
+        return random.choice(replicas)  # noqa: DUO102, spreads load, not a secret
+
+    def call(self, request):
+        state = RoutingState(replica=self.choose_replica(request))
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(replica=self.choose_replica(request))
+        token = current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        return self.finish(response, state)
@@ -0,0 +1,36 @@
+import time
+
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from apps.core.metrics import mark_process_dead, record_query, task_duration
+
+# Start times of the tasks running in this process by their ids.
+_task_started = {}
+
+
+@task_prerun.connect
+def start_task_timer(task_id, task, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id, task, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        task_duration.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+@worker_process_shutdown.connect
+def mark_worker_process_dead(pid, **kwargs):
+    mark_process_dead(pid)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # The wrappers outlive the connection, which is reconnected after it is closed.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,85 @@
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.asgi import WSGIViews, resolve_scope
+from apps.forum.tests.factories import PostFactory
+
+
+# Requests are served in other threads, which see committed data only.
+@pytest.mark.django_db(transaction=True)
+class TestWSGIViews:
+    def test_streaming_export(self, admin_user):
+        PostFactory.create()
+        token = AccessToken.for_user(admin_user)
+        cookie = f"{settings.JWT_AUTH_COOKIE}={token}".encode()
+
+        messages = call(reverse("forum:export"), [(b"cookie", cookie)])  # act
+
+        assert messages[0]["status"] == 200
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        records = [json.loads(line) for line in body.decode().splitlines()]
+        assert [record["type"] for record in records] == ["category", "post"]
+
+    def test_in_own_thread(self, monkeypatch):
+        threads = []
+        application = WSGIViews(None, ["forum:export"])
+        handler = application.handler
+
+        def recording_handler(environ, start_response):
+            threads.append(threading.current_thread())
+            return handler(environ, start_response)
+
+        monkeypatch.setattr(application, "handler", recording_handler)
+
+        call(reverse("forum:export"), application=application)  # act
+
+        assert threads
+        assert threads[0] is not threading.main_thread()
+
+    def test_other_views_passed_on(self):
+        messages = call(reverse("forum:post-detail", args=[1]))  # act
+
+        assert messages == [{"type": "http.response.start", "status": 204}]
+
+
+def test_resolve_scope():
+    path = reverse("forum:export")
+
+    assert resolve_scope({"type": "http", "path": path}).view_name == "forum:export"
+    assert resolve_scope({"type": "http", "path": "/missing/"}) is None
+    assert resolve_scope({"type": "lifespan"}) is None
+
+
+async def passed_on(scope, receive, send):
+    await send({"type": "http.response.start", "status": 204})
+
+
+def call(path, headers=(), application=None):
+    """Send a GET request through `WSGIViews` of the export and return the messages."""
+    if application is None:
+        application = WSGIViews(passed_on, ["forum:export"])
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"host", b"testserver"), *headers],
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(application)(scope, receive, send)
+    return messages
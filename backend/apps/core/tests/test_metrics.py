@@ -0,0 +1,138 @@
+import subprocess
+import sys
+from unittest import mock
+
+import pytest
+from celery import Celery
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from apps.core.collectors import CeleryQueueCollector
+from apps.core.metrics import record_cache
+from apps.forum.tasks import compile_pending_markdown
+from apps.forum.tests.factories import PostFactory
+from config import gunicorn
+
+
+@pytest.mark.django_db()
+class TestMetricsView:
+    def test_text_format(self, client):
+        client.get(reverse("forum:post-detail", args=[PostFactory.create().pk]))
+
+        response = client.get(reverse("metrics"))
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        assert (
+            b'lem_request_duration_seconds_count{method="GET",view="forum:post-detail"}'
+            in response.content
+        )
+        assert b"lem_celery_broker_up" in response.content
+
+    def test_token(self, client, settings):
+        settings.METRICS_TOKEN = "secret"
+        url = reverse("metrics")
+
+        assert client.get(url).status_code == 403
+        assert client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+        assert client.get(url, HTTP_AUTHORIZATION="Bearer secret").status_code == 200
+
+    def test_multiprocess(self, client, monkeypatch, tmp_path):
+        script = "from prometheus_client import Counter\nCounter('lem_test_events', 'Events.').inc({})\n"
+        for events in (2, 3):
+            subprocess.run(
+                [sys.executable, "-c", script.format(events)],
+                check=True,
+                env={"PROMETHEUS_MULTIPROC_DIR": str(tmp_path)},
+            )
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        response = client.get(reverse("metrics"))
+
+        assert b"lem_test_events_total 5.0" in response.content
+
+
+@pytest.fixture()
+def _without_broker_env(monkeypatch):
+    # The environment variable takes precedence over the broker of an app.
+    monkeypatch.delenv("CELERY_BROKER_URL", raising=False)
+
+
+@pytest.mark.usefixtures("_without_broker_env")
+def test_celery_queue_length():
+    app = Celery("test", broker="memory://")
+    with app.connection_for_write() as connection:
+        queue = connection.SimpleQueue("celery")
+        for number in range(3):
+            queue.put({"number": number})
+        queue.close()
+
+    metrics = collected(CeleryQueueCollector(app))
+
+    assert metrics[("lem_celery_broker_up", ())] == 1
+    assert metrics[("lem_celery_queue_length", (("queue", "celery"),))] == 3
+
+
+@pytest.mark.usefixtures("_without_broker_env")
+def test_celery_broker_down():
+    app = Celery("test", broker="redis://localhost:1/0")
+    app.conf.broker_connection_timeout = 0.1
+
+    metrics = collected(CeleryQueueCollector(app))
+
+    assert metrics == {("lem_celery_broker_up", ()): 0}
+
+
+@pytest.mark.usefixtures("_without_broker_env")
+def test_celery_queue_length_cached():
+    app = Celery("test", broker="memory://")
+    key = ("lem_celery_queue_length", (("queue", "celery"),))
+    collector = CeleryQueueCollector(app, cache_timeout=60)
+    before = collected(collector)[key]
+    with app.connection_for_write() as connection:
+        connection.SimpleQueue("celery").put({"number": 0})
+
+    metrics = collected(collector)  # act
+
+    assert metrics[key] == before
+    assert collected(CeleryQueueCollector(app))[key] == before + 1
+
+
+def test_gunicorn_child_exit(monkeypatch):
+    marked = []
+    monkeypatch.setattr(gunicorn, "mark_process_dead", marked.append)
+
+    gunicorn.child_exit(server=None, worker=mock.Mock(pid=42))
+
+    assert marked == [42]
+
+
+@pytest.mark.django_db()
+def test_task_duration():
+    labels = {"task": compile_pending_markdown.name, "state": "SUCCESS"}
+    count = sample("lem_celery_task_duration_seconds_count", **labels)
+    post = PostFactory.create()
+
+    compile_pending_markdown.delay("forum.Post", post.pk)
+
+    assert sample("lem_celery_task_duration_seconds_count", **labels) == count + 1
+
+
+def test_cache_lookups_outside_request():
+    hits = sample("lem_cache_lookups_total", cache="markdown", result="hit")
+
+    record_cache("markdown", hit=True)
+
+    assert sample("lem_cache_lookups_total", cache="markdown", result="hit") == hits + 1
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def collected(collector):
+    return {
+        (sample.name, tuple(sample.labels.items())): sample.value
+        for family in collector.collect()
+        for sample in family.samples
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from apps.core.metrics import RequestStats, current_stats, record_cache
+from apps.core.middleware import RequestMetricsMiddleware
+from apps.forum.tests.factories import PostFactory
+
+VIEW = "forum:post-detail"
+
+
+def test_record_cache_outside_request():
+    record_cache("markdown", hit=True)  # act
+
+    assert current_stats.get() is None
+
+
+def test_record_cache():
+    stats = RequestStats()
+    token = current_stats.set(stats)
+    try:
+        record_cache("markdown", hit=True)
+        record_cache("markdown", hit=False)
+        record_cache("post_detail", hit=True)
+    finally:
+        current_stats.reset(token)
+
+    assert stats.cache_hits == {"markdown": 1, "post_detail": 1}
+    assert stats.cache_misses == {"markdown": 1}
+
+
+def test_async_capable():
+    async def get_response(request):
+        return None
+
+    assert asyncio.iscoroutinefunction(RequestMetricsMiddleware(get_response))
+    assert not asyncio.iscoroutinefunction(RequestMetricsMiddleware(lambda r: None))
+
+
+@pytest.mark.django_db()
+class TestRequestMetricsMiddleware:
+    def test_server_timing(self, api_client, post):
+        url = reverse(VIEW, args=[post.pk])
+
+        miss = parse_server_timing(api_client.get(url)["Server-Timing"])
+        hit = parse_server_timing(api_client.get(url)["Server-Timing"])
+
+        assert miss["db"]["desc"] != '"0 queries"'
+        assert miss["cache"]["desc"] == '"0 hits / 1 misses"'
+        assert hit["db"]["desc"] == '"0 queries"'
+        assert hit["cache"]["desc"] == '"1 hits / 0 misses"'
+        assert float(hit["total"]["dur"]) >= float(hit["db"]["dur"])
+
+    def test_histograms(self, api_client, post):
+        labels = {"view": VIEW, "method": "GET"}
+        requests = sample("lem_request_duration_seconds_count", **labels)
+        queries = sample("lem_request_queries_sum", **labels)
+        hits = sample(
+            "lem_request_cache_lookups_total",
+            view=VIEW,
+            cache="post_detail",
+            result="hit",
+        )
+        url = reverse(VIEW, args=[post.pk])
+
+        api_client.get(url)
+        api_client.get(url)
+
+        assert sample("lem_request_duration_seconds_count", **labels) == requests + 2
+        assert sample("lem_request_db_duration_seconds_count", **labels) >= 2
+        assert sample("lem_request_queries_sum", **labels) > queries
+        assert (
+            sample(
+                "lem_request_cache_lookups_total",
+                view=VIEW,
+                cache="post_detail",
+                result="hit",
+            )
+            == hits + 1
+        )
+
+    def test_unresolved(self, api_client):
+        labels = {"view": "<unresolved>", "method": "GET"}
+        requests = sample("lem_request_duration_seconds_count", **labels)
+
+        response = api_client.get("/not-found/")
+
+        assert response.status_code == 404
+        assert sample("lem_request_duration_seconds_count", **labels) == requests + 1
+
+    def test_over_budget(self, api_client, post, settings, caplog):
+        settings.REQUEST_METRICS_VIEW_BUDGETS = {VIEW: {"queries": 0}}
+        url = reverse(VIEW, args=[post.pk])
+
+        with caplog.at_level(logging.WARNING, logger="apps.core.middleware"):
+            api_client.get(url)
+            api_client.get(url)
+
+        assert len(caplog.records) == 1
+        assert caplog.records[0].view == VIEW
+        assert "over budget: queries" in caplog.records[0].getMessage()
+
+    def test_within_budget(self, api_client, post, caplog):
+        with caplog.at_level(logging.WARNING, logger="apps.core.middleware"):
+            api_client.get(reverse(VIEW, args=[post.pk]))
+
+        assert not caplog.records
+
+    def test_without_server_timing(self, api_client, post, settings):
+        settings.REQUEST_METRICS_SERVER_TIMING = False
+
+        response = api_client.get(reverse(VIEW, args=[post.pk]))
+
+        assert "Server-Timing" not in response
+
+    def test_async_view(self, post):
+        url = reverse("forum:async-post-detail", args=[post.pk])
+
+        response = async_to_sync(AsyncClient().get)(url)  # act
+
+        timing = parse_server_timing(response["Server-Timing"])
+        assert timing["db"]["desc"] != '"0 queries"'
+        assert timing["cache"]["desc"] == '"0 hits / 1 misses"'
+
+
+@pytest.fixture()
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture()
+def post(db):
+    return PostFactory.create()
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(", "):
+        name, *params = metric.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
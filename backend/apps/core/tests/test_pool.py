@@ -0,0 +1,204 @@
+import threading
+
+import pytest
+from django.db import OperationalError, connection
+from prometheus_client import REGISTRY
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from apps.core.db import pool as pool_module
+from apps.core.db.backends.postgresql_pool.base import DatabaseWrapper
+from apps.core.db.pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool:
+    def test_reuses_connections(self):
+        pool = make_pool()
+        connection = pool.checkout()
+        pool.checkin(connection)
+
+        assert pool.checkout() is connection
+        assert pool.size == 1
+
+    def test_timeout(self):
+        pool = make_pool(max_size=1, timeout=0.01)
+        pool.checkout()
+
+        with pytest.raises(PoolTimeout):
+            pool.checkout()
+
+    def test_waits_for_checkin(self):
+        pool = make_pool(max_size=1, timeout=5)
+        connection = pool.checkout()
+        timer = threading.Timer(0.05, pool.checkin, [connection])
+        timer.start()
+
+        assert pool.checkout() is connection  # act
+
+        timer.join()
+
+    def test_failed_ping(self):
+        pool = make_pool(ping=lambda connection: connection.number != 0)
+        broken = pool.checkout()
+        pool.checkin(broken)
+
+        connection = pool.checkout()  # act
+
+        assert broken.closed
+        assert connection.number == 1
+        assert pool.size == 1
+
+    def test_failed_reset(self):
+        pool = make_pool(reset=lambda connection: False)
+        connection = pool.checkout()
+
+        pool.checkin(connection)  # act
+
+        assert connection.closed
+        assert pool.size == pool.idle == 0
+
+    def test_discard(self):
+        pool = make_pool(max_size=1, timeout=0.01)
+        connection = pool.checkout()
+
+        pool.discard(connection)  # act
+
+        assert connection.closed
+        assert pool.checkout() is not connection
+
+    def test_failed_connect_frees_room(self):
+        def connect():
+            raise OSError("refused")
+
+        pool = ConnectionPool(connect, max_size=1)
+
+        with pytest.raises(OSError, match="refused"):
+            pool.checkout()
+
+        assert pool.size == 0
+
+    def test_open(self):
+        pool = make_pool(min_size=3)
+
+        pool.open()  # act
+
+        assert pool.size == pool.idle == 3
+
+    def test_close(self):
+        pool = make_pool()
+        idle, in_use = pool.checkout(), pool.checkout()
+        pool.checkin(idle)
+
+        pool.close()
+        pool.checkin(in_use)
+
+        assert idle.closed
+        assert in_use.closed
+        assert pool.size == 0
+
+    def test_wait_metric(self):
+        labels = {"alias": "metric-test"}
+        pool = make_pool(name="metric-test")
+        count = REGISTRY.get_sample_value("lem_db_pool_wait_seconds_count", labels)
+
+        pool.checkout()  # act
+
+        assert (
+            REGISTRY.get_sample_value("lem_db_pool_wait_seconds_count", labels)
+            == (count or 0) + 1
+        )
+
+
+def test_get_pool_after_fork(monkeypatch):
+    first = get_pool("fork-test", make_pool)
+    monkeypatch.setattr(pool_module.os, "getpid", lambda: first.pid + 1)
+
+    second = get_pool("fork-test", make_pool)  # act
+
+    assert second is not first
+    close_pools()
+
+
+@pytest.mark.django_db()
+class TestPooledBackend:
+    def test_reuses_connection(self, pooled_settings):
+        wrapper = DatabaseWrapper(pooled_settings, alias="default")
+        pid = backend_pid(wrapper)
+        wrapper.close()
+
+        assert backend_pid(wrapper) == pid
+        wrapper.close()
+
+    def test_pre_ping(self, pooled_settings):
+        wrapper = DatabaseWrapper(pooled_settings, alias="default")
+        pid = backend_pid(wrapper)
+        wrapper.close()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+
+        assert backend_pid(wrapper) != pid
+        wrapper.close()
+
+    def test_pool_exhausted(self, pooled_settings):
+        first = DatabaseWrapper(pooled_settings, alias="default")
+        second = DatabaseWrapper(pooled_settings, alias="default")
+        backend_pid(first)
+
+        with pytest.raises(OperationalError, match="became free"):
+            backend_pid(second)
+
+        first.close()
+        assert backend_pid(second)
+        second.close()
+
+    def test_open_transaction_rolled_back(self, pooled_settings):
+        wrapper = DatabaseWrapper(pooled_settings, alias="default")
+        wrapper.set_autocommit(False)
+        backend_pid(wrapper)
+        raw_connection = wrapper.connection
+
+        wrapper.close()  # act
+
+        assert raw_connection.info.transaction_status == TRANSACTION_STATUS_IDLE
+        assert backend_pid(wrapper)
+        assert wrapper.get_autocommit()
+        wrapper.close()
+
+    def test_pool_per_database_name(self, pooled_settings):
+        wrapper = DatabaseWrapper(pooled_settings, alias="default")
+        pool = wrapper.pool()
+
+        wrapper.settings_dict = {**pooled_settings, "NAME": "other"}
+
+        assert wrapper.pool() is not pool
+
+
+def make_pool(**kwargs):
+    numbers = iter(range(100))
+    return ConnectionPool(lambda: FakeConnection(next(numbers)), **kwargs)
+
+
+@pytest.fixture()
+def pooled_settings():
+    settings = {
+        **connection.settings_dict,
+        "ENGINE": "apps.core.db.backends.postgresql_pool",
+        "CONN_MAX_AGE": 0,
+        "POOL": {"MAX_SIZE": 1, "TIMEOUT": 0.1},
+    }
+    yield settings
+    close_pools()
+
+
+def backend_pid(wrapper):
+    with wrapper.cursor() as cursor:
+        cursor.execute("SELECT pg_backend_pid()")
+        return cursor.fetchone()[0]
@@ -0,0 +1,135 @@
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connections, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.core.replicas import ReplicaRoutingMiddleware, RoutingState, current_routing
+from apps.forum.models import Post
+from apps.forum.tests.factories import PostFactory
+from apps.users.models import User
+
+
+class TestReplicaRouter:
+    def test_outside_request(self):
+        assert router.db_for_read(Post) == "default"
+
+    @pytest.mark.usefixtures("routing")
+    def test_routed_app(self):
+        assert router.db_for_read(Post) == "replica"
+        assert router.db_for_read(User) == "default"
+
+    def test_write_pins_primary(self, routing):
+        assert router.db_for_write(Post) == "default"
+        assert router.db_for_read(Post) == "default"
+        assert routing.wrote
+
+    @pytest.mark.django_db()
+    @pytest.mark.usefixtures("routing")
+    def test_in_transaction(self):
+        with transaction.atomic():
+            assert router.db_for_read(Post) == "default"
+
+    @pytest.mark.usefixtures("routing", "_replicas")
+    def test_migrate(self):
+        assert router.allow_migrate("replica", "forum") is False
+        assert router.allow_migrate("default", "forum") is True
+
+
+def write_view(request):
+    router.db_for_write(Post)
+    return read_database_view(request)
+
+
+@pytest.mark.usefixtures("_replicas")
+class TestReplicaRoutingMiddleware:
+    def test_safe_request(self):
+        database, cookies = call(read_database_view)
+
+        assert database == "replica"
+        assert not cookies
+
+    def test_unsafe_request(self):
+        database, _ = call(read_database_view, "post")
+
+        assert database == "default"
+
+    def test_write_sets_cookie(self, settings):
+        database, cookies = call(write_view)
+
+        assert database == "default"
+        cookie = cookies[settings.REPLICA_PIN_COOKIE]
+        assert cookie["max-age"] == settings.REPLICA_PIN_SECONDS
+
+    def test_async(self, settings):
+        assert async_call(read_database_view)[0] == "replica"
+
+        database, cookies = async_call(write_view)  # act
+
+        assert database == "default"
+        assert settings.REPLICA_PIN_COOKIE in cookies
+
+    def test_pinned_client(self, settings):
+        database, _ = call(read_database_view, **{settings.REPLICA_PIN_COOKIE: "1"})
+
+        assert database == "default"
+
+    def test_without_replicas(self, settings):
+        settings.DATABASE_REPLICAS = []
+
+        database, _ = call(read_database_view)
+
+        assert database == "default"
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+@pytest.mark.usefixtures("_replicas")
+def test_reads_from_replica():
+    post = PostFactory.create()
+    url = reverse("forum:post-replies", args=[post.pk])
+
+    with CaptureQueriesContext(connections["replica"]) as replica_queries:
+        response = APIClient().get(url)
+
+    assert response.status_code == 200
+    assert len(replica_queries) > 0
+
+
+@pytest.fixture()
+def _replicas(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+
+
+@pytest.fixture()
+def routing():
+    state = RoutingState(replica="replica")
+    token = current_routing.set(state)
+    yield state
+    current_routing.reset(token)
+
+
+def read_database_view(request):
+    """Respond with the database of reads of forum posts."""
+    return HttpResponse(router.db_for_read(Post))
+
+
+def async_call(view):
+    """Call the middleware in async mode, the sync view in a thread like the ORM."""
+
+    async def async_view(request):
+        return await sync_to_async(view)(request)
+
+    response = async_to_sync(ReplicaRoutingMiddleware(async_view))(
+        RequestFactory().get("/")
+    )
+    return response.content.decode(), response.cookies
+
+
+def call(view, method="get", **cookies):
+    request = getattr(RequestFactory(), method)("/")
+    request.COOKIES.update(cookies)
+    response = ReplicaRoutingMiddleware(view)(request)
+    return response.content.decode(), response.cookies
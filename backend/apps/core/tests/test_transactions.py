@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import path
+from django.views import View
+from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+
+from apps.core.transactions import TransactionPolicyMiddleware, atomic_methods
+from apps.users.models import User
+
+
+def raising_view(request):
+    User.objects.create(username="rolled-back")
+    raise RuntimeError("view failed")
+
+
+@api_view(["POST"])
+def invalid_view(request):
+    User.objects.create(username="rolled-back")
+    raise ValidationError("invalid")
+
+
+urlpatterns = [path("raise/", raising_view), path("invalid/", invalid_view)]
+
+
+class ExceptionRecordingMiddleware:
+    """Record the exceptions `process_exception` is called with."""
+
+    exceptions = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def process_exception(self, request, exception):
+        self.exceptions.append(exception)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+
+class DepthView(View):
+    atomic_methods = {"GET"}
+
+    def get(self, request):
+        return depth_view(request)
+
+    def post(self, request):
+        return depth_view(request)
+
+
+@pytest.mark.django_db()
+class TestTransactionPolicyMiddleware:
+    def test_default_methods(self):
+        assert call(depth_view, "get") == 0
+        assert call(depth_view, "head") == 0
+        assert call(depth_view, "post") == 1
+        assert call(depth_view, "delete") == 1
+
+    def test_setting(self, settings):
+        settings.ATOMIC_REQUEST_METHODS = ["GET"]
+
+        assert call(depth_view, "get") == 1
+        assert call(depth_view, "post") == 0
+
+    def test_class_attribute(self):
+        view = DepthView.as_view()
+
+        assert call(view, "get") == 1
+        assert call(view, "post") == 0
+
+    def test_decorator(self):
+        view = atomic_methods("get")(lambda request: depth_view(request))
+
+        assert call(view, "get") == 1
+        assert call(view, "post") == 0
+
+    def test_non_atomic_requests(self):
+        view = transaction.non_atomic_requests(lambda request: depth_view(request))
+
+        assert call(view, "post") == 0
+
+    def test_exception_rolls_back(self):
+        def failing_view(request):
+            User.objects.create(username="rolled-back")
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            call(failing_view, "post")
+
+        assert not User.objects.filter(username="rolled-back").exists()
+
+    def test_exception_middleware(self, settings):
+        settings.ROOT_URLCONF = __name__
+        settings.MIDDLEWARE = [
+            f"{__name__}.ExceptionRecordingMiddleware",
+            *settings.MIDDLEWARE,
+        ]
+        ExceptionRecordingMiddleware.exceptions = []
+
+        response = Client(raise_request_exception=False).post("/raise/")  # act
+
+        assert response.status_code == 500
+        assert len(ExceptionRecordingMiddleware.exceptions) == 1
+        assert not User.objects.filter(username="rolled-back").exists()
+
+    def test_error_response_rolls_back(self, settings):
+        settings.ROOT_URLCONF = __name__
+
+        response = Client().post("/invalid/")  # act
+
+        assert response.status_code == 400
+        assert not User.objects.filter(username="rolled-back").exists()
+
+    def test_async_view(self):
+        async def async_view(request):
+            return HttpResponse()
+
+        assert call(async_view, "post") == 0
+
+    def test_async_mode(self):
+        async def get_response(request):
+            await middleware.process_view(request, depth_view, (), {})
+            return await sync_to_async(depth_view)(request)
+
+        middleware = TransactionPolicyMiddleware(get_response)
+        outside = len(connection.atomic_blocks)
+
+        response = async_to_sync(middleware)(RequestFactory().post("/"))  # act
+
+        assert asyncio.iscoroutinefunction(middleware)
+        assert int(response.content) - outside == 1
+        assert len(connection.atomic_blocks) == outside
+
+    def test_async_view_not_wrapped(self):
+        async def view(request):
+            return depth_view(request)
+
+        assert call(view, "post") == 0
+
+
+def call(view, method="get"):
+    """Return the number of atomic blocks the middleware ran the view in.
+
+    The view is called like by Django, after `process_view` of the middleware.
+    """
+
+    def get_response(request):
+        middleware.process_view(request, view, (), {})
+        if iscoroutinefunction(view):
+            return async_to_sync(view)(request)
+        return view(request)
+
+    request = getattr(RequestFactory(), method)("/")
+    middleware = TransactionPolicyMiddleware(get_response)
+    outside = len(connection.atomic_blocks)
+    response = middleware(request)
+    assert len(connection.atomic_blocks) == outside
+    return int(response.content) - outside
+
+
+def depth_view(request):
+    """Respond with the number of atomic blocks the view runs in."""
+    return HttpResponse(str(len(connection.atomic_blocks)))
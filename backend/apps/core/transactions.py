@@ -0,0 +1,131 @@
+"""Transactions of requests by view and HTTP method, instead of ATOMIC_REQUESTS.
+
+`TransactionPolicyMiddleware` runs a view in a transaction only for the methods
+in its `atomic_methods`, by default those of `ATOMIC_REQUEST_METHODS`, so reads
+run in autocommit mode and do not pay for BEGIN and COMMIT or hold a connection
+in a transaction while they render. Views declare their methods as a class
+attribute, function views with the `atomic_methods` decorator::
+
+    class PostView(APIView):
+        atomic_methods = {"POST", "GET"}
+
+    @atomic_methods("POST")
+    def vote(request): ...
+
+Django's `non_atomic_requests` makes all methods of a view autocommit.
+"""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from apps.core.middleware import AsyncCapableMiddleware
+
+
+def atomic_methods(*methods):
+    """Run requests of the function view with these methods in a transaction."""
+
+    def decorator(view):
+        view.atomic_methods = frozenset(method.upper() for method in methods)
+        return view
+
+    return decorator
+
+
+def view_atomic_methods(view_func):
+    """Return the methods the resolved view runs in a transaction."""
+    if DEFAULT_DB_ALIAS in getattr(view_func, "_non_atomic_requests", set()):
+        return frozenset()
+    view_class = getattr(view_func, "view_class", None)
+    methods = getattr(
+        view_func, "atomic_methods", getattr(view_class, "atomic_methods", None)
+    )
+    if methods is None:
+        methods = settings.ATOMIC_REQUEST_METHODS
+    return frozenset(method.upper() for method in methods)
+
+
+class TransactionPolicyMiddleware(AsyncCapableMiddleware):
+    """Run views in a transaction of the default database for their atomic methods.
+
+    The transaction begins in `process_view`, so the middleware has to come after
+    all other middleware with a `process_view` in `MIDDLEWARE`, and ends when the
+    response reaches it. Django calls the view as usual, its exceptions reach
+    `process_exception` of other middleware within the transaction. It is rolled
+    back when the view raises or responds with an error, a status of 400 or above,
+    e.g. of an exception handled by DRF, whose `set_rollback` only works with
+    ATOMIC_REQUESTS. Async views are never wrapped, like with ATOMIC_REQUESTS they
+    have to manage their transactions themselves.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.is_async:
+            # Django awaits a coroutine `process_view` without switching threads.
+            self.process_view = self.aprocess_view
+
+    @staticmethod
+    def is_atomic(request, view_func):
+        if iscoroutinefunction(view_func):
+            return False
+        return request.method in view_atomic_methods(view_func)
+
+    @staticmethod
+    def call_atomic(request, view_func, view_args, view_kwargs):
+        """Call the view in a transaction, rolled back like by the middleware."""
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            response = view_func(request, *view_args, **view_kwargs)
+            if response.status_code >= 400:
+                transaction.set_rollback(True, using=DEFAULT_DB_ALIAS)
+        return response
+
+    @staticmethod
+    def begin(request):
+        """Begin the transaction of the request, ended by `end`."""
+        atomic = transaction.atomic(using=DEFAULT_DB_ALIAS)
+        atomic.__enter__()
+        request._transaction_policy_atomic = atomic
+
+    @staticmethod
+    def end(request, response, exception=None):
+        """Commit the transaction of the request, or roll it back after an error."""
+        atomic = request.__dict__.pop("_transaction_policy_atomic")
+        if response is not None and response.status_code >= 400:
+            transaction.set_rollback(True, using=DEFAULT_DB_ALIAS)
+        if exception is None:
+            atomic.__exit__(None, None, None)
+        else:
+            atomic.__exit__(type(exception), exception, exception.__traceback__)
+
+    @staticmethod
+    def in_transaction(request):
+        return "_transaction_policy_atomic" in request.__dict__
+
+    def call(self, request):
+        try:
+            response = self.get_response(request)
+        except BaseException as exception:
+            if self.in_transaction(request):
+                self.end(request, None, exception)
+            raise
+        if self.in_transaction(request):
+            self.end(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_atomic(request, view_func):
+            self.begin(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_atomic(request, view_func):
+            await sync_to_async(self.begin)(request)
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        except BaseException as exception:
+            if self.in_transaction(request):
+                await sync_to_async(self.end)(request, None, exception)
+            raise
+        if self.in_transaction(request):
+            await sync_to_async(self.end)(request, response)
+        return response
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from prometheus_client.registry import CollectorRegistry
+
+from apps.core.collectors import CeleryQueueCollector
+from apps.core.metrics import multiprocess_enabled
+from config.celery import app as celery_app
+
+# Shared by all scrapes, so its cached queue lengths are reused.
+celery_queue_collector = CeleryQueueCollector(celery_app)
+
+
+def metrics_registry():
+    """Return a registry of all metrics, aggregated across worker processes."""
+    registry = CollectorRegistry()
+    if multiprocess_enabled():
+        MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(celery_queue_collector)
+    return registry
+
+
+@require_GET
+def metrics(request):
+    """Expose the metrics in the Prometheus text format.
+
+    When METRICS_TOKEN is set, it has to be sent as a bearer token.
+    """
+    if settings.METRICS_TOKEN is not None:
+        authorization = request.headers.get("Authorization", "")
+        if not constant_time_compare(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST
+    )
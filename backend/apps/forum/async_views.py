@@ -0,0 +1,172 @@
+"""Async variants of the read endpoints of `apps.forum.views`, for `config.asgi`.
+
+They answer like their sync counterparts, with the same entity tags and the same
+entries of `post_detail_cache`, but read with the async ORM and the async cache
+API. Under ASGI a request waiting for the database or the cache then holds no
+thread, Django 4.1 runs only the queries themselves in a thread. DRF has no async
+views, so these are Django views rendering with DRF's serializers and renderer,
+which check requests with the authentication, permission and throttle classes of
+their sync counterparts.
+"""
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.conditional import (
+    acategory_etag,
+    apost_etag,
+    conditional_response,
+    set_etag,
+)
+from apps.forum.models import Post, Reply
+from apps.forum.pagination import KeysetPagination
+from apps.forum.serializers import PostDetailSerializer, PostSerializer, ReplySerializer
+from apps.forum.views import make_detail_entry
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def make_api_view(view, request, args, kwargs):
+    """Return a DRF view with the policies of `view`, for the request.
+
+    Its `initial` authenticates the request and checks it against the permission
+    and throttle classes of `view`, the same attributes as of DRF views.
+    """
+    api_view = APIView(
+        authentication_classes=view.authentication_classes,
+        permission_classes=view.permission_classes,
+        throttle_classes=view.throttle_classes,
+        renderer_classes=[JSONRenderer],
+    )
+    api_view.args, api_view.kwargs = args, kwargs
+    api_view.request = api_view.initialize_request(request, *args, **kwargs)
+    api_view.headers = {}
+    return api_view
+
+
+def error_response(api_view, exc):
+    """Return the rendered response of a DRF view of `make_api_view` to the error."""
+    response = api_view.handle_exception(exc)
+    return api_view.finalize_response(api_view.request, response).render()
+
+
+class AsyncConditionalView(ABC, View):
+    """Answer conditional GET and HEAD requests before the response is built.
+
+    Like `ConditionalGetMixin`, views implement `get_etag` and
+    `build_response`, both coroutines. Requests are authenticated and checked
+    against the permission and throttle classes first, by a DRF view with the same
+    policies, see `make_api_view`, and errors are answered like by DRF views.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = [AllowAny]
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    async def get(self, request, *args, **kwargs):
+        api_view = make_api_view(self, request, args, kwargs)
+        self.api_request = api_view.request
+        try:
+            # Authentication and throttles may query the database or the cache.
+            await sync_to_async(api_view.initial)(api_view.request, *args, **kwargs)
+            etag, response = conditional_response(request, await self.get_etag())
+            if response is None:
+                response = await self.build_response()
+        except (Http404, APIException) as exc:
+            return error_response(api_view, exc)
+        return set_etag(response, etag)
+
+    @abstractmethod
+    async def get_etag(self):
+        """Return the entity tag of the resource."""
+
+    @abstractmethod
+    async def build_response(self):
+        """Return the response to a request whose conditions did not answer it."""
+
+
+class AsyncListView(AsyncConditionalView):
+    """List a queryset with `KeysetPagination` in the view's `ordering`."""
+
+    serializer_class = None
+    ordering = None
+
+    @abstractmethod
+    def get_queryset(self):
+        """Return the queryset to list, in any order."""
+
+    async def build_response(self):
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(
+            self.get_queryset(), self.api_request, view=self
+        )
+        data = self.serializer_class(page, many=True).data
+        return json_response(paginator.get_paginated_data(data))
+
+
+class CategoryPostListView(AsyncListView):
+    """List the posts of a category, newest first."""
+
+    serializer_class = PostSerializer
+    ordering = ("-created_at", "-id")
+
+    async def get_etag(self):
+        return await acategory_etag(self.kwargs["category_pk"])
+
+    def get_queryset(self):
+        return Post.objects.filter(
+            category_id=self.kwargs["category_pk"]
+        ).select_related("author")
+
+
+class PostReplyListView(AsyncListView):
+    """List all replies of a post in the order they were written."""
+
+    serializer_class = ReplySerializer
+    ordering = ("created_at", "id")
+
+    async def get_etag(self):
+        return await apost_etag(self.kwargs["post_pk"])
+
+    def get_queryset(self):
+        return Reply.objects.filter(post_id=self.kwargs["post_pk"]).select_related(
+            "author"
+        )
+
+
+class PostDetailView(AsyncConditionalView):
+    """Retrieve a post with its whole reply tree, through `post_detail_cache`."""
+
+    async def get_etag(self):
+        self.entry = await post_detail_cache.aget_or_build(
+            self.kwargs["pk"], self.build_entry
+        )
+        return self.entry["etag"]
+
+    async def build_response(self):
+        return json_response(self.entry["data"])
+
+    async def build_entry(self):
+        queryset = Post.objects.select_related("author", "category")
+        try:
+            post = await queryset.aget(pk=self.kwargs["pk"])
+        except Post.DoesNotExist:
+            raise Http404("No Post matches the given query.") from None
+        thread = Reply.objects.thread(post).select_related("author")
+        data = PostDetailSerializer(
+            post, context={"thread": [reply async for reply in thread]}
+        ).data
+        return make_detail_entry(data)
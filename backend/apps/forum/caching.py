@@ -0,0 +1,161 @@
+import logging
+import time
+
+import redis
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.core.caching import aget_or_build, get_or_build
+
+logger = logging.getLogger(__name__)
+
+
+class PostDetailCache:
+    """Read-through cache of serialized post details in the shared Django cache.
+
+    Entries are keyed by a version of the post and a version of all categories, so
+    invalidation only increments a version and never has to find the entries, which
+    expire by `FORUM_POST_CACHE_TIMEOUT`. A hit costs two cache round trips and no
+    SQL queries.
+
+    Versions start at the current time in nanoseconds rather than at zero, so a
+    version evicted from the cache never comes back with a value of stale entries.
+    Errors of the cache are logged: a version that cannot be read is a new one, so
+    lookups miss and entity tags do not match, and a failed bump leaves entries
+    stale until they expire.
+    """
+
+    categories_version_key = "forum:categories:version"
+
+    @property
+    def cache(self):
+        return caches[settings.FORUM_POST_CACHE_ALIAS]
+
+    @staticmethod
+    def post_version_key(pk):
+        return f"forum:post:{pk}:version"
+
+    @staticmethod
+    def category_version_key(pk):
+        return f"forum:category:{pk}:version"
+
+    def version(self, key):
+        """Return the current value of the version key, e.g. for an entity tag."""
+        return self._versions([key])[key]
+
+    async def aversion(self, key):
+        """Like `version` with the async cache API."""
+        return (await self._aversions([key]))[key]
+
+    def get_or_build(self, pk, build):
+        """Return the cached detail of the post, or build and cache it.
+
+        `build` is called without arguments, exceptions it raises are not cached.
+        """
+        post_version_key = self.post_version_key(pk)
+        versions = self._versions([post_version_key, self.categories_version_key])
+        key = self._detail_key(pk, versions)
+        return get_or_build(
+            self.cache, key, build, settings.FORUM_POST_CACHE_TIMEOUT, "post_detail"
+        )
+
+    async def aget_or_build(self, pk, build):
+        """Like `get_or_build` with the async cache API, `build` is a coroutine function.
+
+        Entries are shared with `get_or_build`.
+        """
+        post_version_key = self.post_version_key(pk)
+        versions = await self._aversions(
+            [post_version_key, self.categories_version_key]
+        )
+        key = self._detail_key(pk, versions)
+        return await aget_or_build(
+            self.cache, key, build, settings.FORUM_POST_CACHE_TIMEOUT, "post_detail"
+        )
+
+    def invalidate_posts(self, pks, category_pks=()):
+        """Invalidate the details of the posts and their categories once the transaction commits.
+
+        Bumping the versions earlier would let a concurrent read cache the
+        uncommitted state under the new version. The categories of the posts are
+        looked up then, `category_pks` adds those of deleted posts and the ones
+        posts moved away from.
+        """
+        pks = set(pks)
+        if pks:
+            transaction.on_commit(lambda: self._bump_posts(pks, category_pks))
+
+    def invalidate_objects(self, model, pks):
+        """Invalidate the details of posts, or of the posts of replies, by their keys.
+
+        For changes made with `update` or `bulk_update`, which send no signals.
+        """
+        if model._meta.label != "forum.Post":
+            pks = model.objects.filter(pk__in=pks).values_list("post_id", flat=True)
+        self.invalidate_posts(pks)
+
+    def invalidate_categories(self):
+        """Invalidate the details of all posts once the transaction commits."""
+        transaction.on_commit(lambda: self._bump([self.categories_version_key]))
+
+    def _detail_key(self, pk, versions):
+        post_version = versions[self.post_version_key(pk)]
+        categories_version = versions[self.categories_version_key]
+        return f"forum:post:{pk}:detail:{post_version}:{categories_version}"
+
+    def _versions(self, keys):
+        try:
+            versions = self.cache.get_many(keys)
+            for key in keys:
+                if key not in versions:
+                    self.cache.add(key, time.time_ns(), timeout=None)
+                    versions[key] = self.cache.get(key)
+        except (redis.RedisError, OSError):
+            logger.exception("Reading post detail versions from the cache failed")
+            return new_versions(keys)
+        return versions
+
+    async def _aversions(self, keys):
+        try:
+            versions = await self.cache.aget_many(keys)
+            for key in keys:
+                if key not in versions:
+                    await self.cache.aadd(key, time.time_ns(), timeout=None)
+                    versions[key] = await self.cache.aget(key)
+        except (redis.RedisError, OSError):
+            logger.exception("Reading post detail versions from the cache failed")
+            return new_versions(keys)
+        return versions
+
+    def _bump_posts(self, pks, category_pks):
+        post_model = apps.get_model("forum", "Post")
+        category_pks = {
+            *category_pks,
+            *post_model.objects.filter(pk__in=pks).values_list(
+                "category_id", flat=True
+            ),
+        }
+        self._bump(
+            [self.post_version_key(pk) for pk in pks]
+            + [self.category_version_key(pk) for pk in category_pks]
+        )
+
+    def _bump(self, keys):
+        try:
+            for key in keys:
+                try:
+                    self.cache.incr(key)
+                except ValueError:
+                    self.cache.add(key, time.time_ns(), timeout=None)
+        except (redis.RedisError, OSError):
+            logger.exception("Bumping post detail versions in the cache failed")
+
+
+def new_versions(keys):
+    version = time.time_ns()
+    return {key: version for key in keys}
+
+
+post_detail_cache = PostDetailCache()
@@ -0,0 +1,137 @@
+import hashlib
+from abc import ABC, abstractmethod
+
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.models import Category, Post, Reply
+from apps.forum.rendering import RENDERER_VERSION
+
+
+def post_etag(post_pk):
+    """Return an entity tag of the state of a post and its replies, with one query.
+
+    The tag covers the last modification times of the post and of its latest
+    reply, the number of replies, the version of the post in `post_detail_cache`,
+    which every write of the post and its replies bumps, compilations and counter
+    updates included, and the renderer version. The latest reply is found by the
+    (post, updated_at) index. The version is read before the query, so a write in
+    between changes the next tag.
+
+    There is no Last-Modified header, those times miss writes which bypass
+    `updated_at` and move backwards when the latest reply is deleted.
+    """
+    version = post_detail_cache.version(post_detail_cache.post_version_key(post_pk))
+    return _post_etag(_post_etag_query(post_pk).first(), version)
+
+
+async def apost_etag(post_pk):
+    """Like `post_etag`, with the async ORM."""
+    version = await post_detail_cache.aversion(
+        post_detail_cache.post_version_key(post_pk)
+    )
+    return _post_etag(await _post_etag_query(post_pk).afirst(), version)
+
+
+def category_etag(category_pk):
+    """Return an entity tag of the state of the posts of a category, with one query.
+
+    The tag covers the version of the category in `post_detail_cache`, which writes
+    of its posts and their replies bump, deletes included, and the last update and
+    activity of its posts, found by the (category, updated_at) and
+    (category, last_activity_at) indexes.
+    """
+    version = post_detail_cache.version(
+        post_detail_cache.category_version_key(category_pk)
+    )
+    return _category_etag(_category_etag_query(category_pk).first(), version)
+
+
+async def acategory_etag(category_pk):
+    """Like `category_etag`, with the async ORM."""
+    version = await post_detail_cache.aversion(
+        post_detail_cache.category_version_key(category_pk)
+    )
+    return _category_etag(await _category_etag_query(category_pk).afirst(), version)
+
+
+def _post_etag_query(post_pk):
+    latest_reply = (
+        Reply.objects.filter(post=OuterRef("pk"))
+        .order_by("-updated_at")
+        .values("updated_at")[:1]
+    )
+    return (
+        Post.objects.filter(pk=post_pk)
+        .annotate(replies_updated_at=Subquery(latest_reply))
+        .values_list("updated_at", "replies_updated_at", "replies_count")
+    )
+
+
+def _post_etag(row, version):
+    if row is None:
+        raise Http404("No Post matches the given query.")
+    return make_etag(*row, version, RENDERER_VERSION)
+
+
+def _category_etag_query(category_pk):
+    posts = Post.objects.filter(category=OuterRef("pk"))
+    latest_update = posts.order_by("-updated_at").values("updated_at")[:1]
+    latest_activity = posts.order_by("-last_activity_at").values("last_activity_at")[:1]
+    return (
+        Category.objects.filter(pk=category_pk)
+        .annotate(
+            posts_updated_at=Subquery(latest_update),
+            posts_last_activity_at=Subquery(latest_activity),
+        )
+        .values_list("posts_updated_at", "posts_last_activity_at")
+    )
+
+
+def _category_etag(row, version):
+    if row is None:
+        raise Http404("No Category matches the given query.")
+    return make_etag(version, *row)
+
+
+def conditional_response(request, etag):
+    """Return the response to a conditional request with the entity tag, if any.
+
+    Returns the quoted entity tag combined with the full path, so every page and
+    filter of a list has its own, and a 304 or 412 response when the request's
+    conditions answer it, otherwise None.
+    """
+    etag = quote_etag(make_etag(request.get_full_path(), etag))
+    return etag, get_conditional_response(request, etag=etag)
+
+
+def make_etag(*parts):
+    """Return an unquoted entity tag of the values."""
+    return hashlib.sha256("\0".join(map(str, parts)).encode()).hexdigest()
+
+
+def set_etag(response, etag):
+    """Set the header of the entity tag returned by `conditional_response`."""
+    response.headers.setdefault("ETag", etag)
+    return response
+
+
+class ConditionalGetMixin(ABC):
+    """Answer conditional GET and HEAD requests before the response is built.
+
+    Views implement `get_etag`, returning an entity tag of the resource, see
+    `conditional_response`. Like the `django.views.decorators.http.condition`
+    decorator, without a Last-Modified header, see `post_etag`.
+    """
+
+    @abstractmethod
+    def get_etag(self):
+        """Return the entity tag of the resource."""
+
+    def get(self, request, *args, **kwargs):
+        etag, response = conditional_response(request, self.get_etag())
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return set_etag(response, etag)
@@ -0,0 +1,210 @@
+import threading
+from collections import defaultdict
+
+from django.db.models import Count, DateTimeField, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest, Length, Substr
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.models import Post, Reply
+
+
+class DeletedReplies(threading.local):
+    """The replies and posts of the delete in progress in this thread.
+
+    Django sends `pre_delete` for every object of a delete, cascades included,
+    before it deletes any, then `post_delete` for each. The replies and posts are
+    collected from the first, and once the last collected reply is deleted their
+    counters are subtracted with `Reply.subtract_deleted`, in the transaction of
+    the delete. Objects collected by a delete which failed are dropped by the next.
+    """
+
+    def __init__(self):
+        self._reset(None)
+
+    def collect(self, instance, origin):
+        """Collect an object about to be deleted by the delete started at `origin`."""
+        if origin is not self.origin:
+            self._reset(origin)
+        if isinstance(instance, Post):
+            self.post_ids.add(instance.pk)
+        else:
+            self.pending.add(instance.pk)
+            self.replies.append(instance)
+
+    def deleted(self, instance, origin):
+        """Subtract the collected replies once the reply deleted last is deleted."""
+        if origin is not self.origin:
+            # Not collected, e.g. deleted without signals, subtract it alone.
+            Reply.subtract_deleted([instance])
+            return
+        self.pending.discard(instance.pk)
+        if not self.pending:
+            replies, post_ids = self.replies, self.post_ids
+            self._reset(None)
+            Reply.subtract_deleted(replies, post_ids)
+
+    def _reset(self, origin):
+        self.origin = origin
+        self.pending = set()
+        self.replies = []
+        self.post_ids = set()
+
+
+deleted_replies = DeletedReplies()
+
+
+def reply_children_count():
+    """Return an expression with the actual number of children of a reply."""
+    return _count(Reply.objects.filter(parent=OuterRef("pk")), "parent")
+
+
+def reply_descendants_count():
+    """Return an expression with the actual size of a reply's subtree without it."""
+    descendants = Reply.objects.filter(
+        post_id=OuterRef("post_id"), path__startswith=OuterRef("path")
+    ).exclude(pk=OuterRef("pk"))
+    return _count(descendants, "post")
+
+
+def post_replies_count():
+    """Return an expression with the actual number of replies of a post."""
+    return _count(Reply.objects.filter(post=OuterRef("pk")), "post")
+
+
+def post_last_activity_at():
+    """Return an expression with the creation time of the latest reply of a post."""
+    latest_reply = Reply.objects.filter(post=OuterRef("pk")).order_by("-created_at")
+    return Greatest(
+        "created_at",
+        Coalesce(
+            Subquery(latest_reply.values("created_at")[:1]),
+            "created_at",
+            output_field=DateTimeField(),
+        ),
+    )
+
+
+def _count(queryset, group_by):
+    """Return a subquery counting the rows of the queryset, or 0 if there are none."""
+    subquery = queryset.order_by().values(group_by).annotate(count=Count("pk"))
+    return Coalesce(Subquery(subquery.values("count")), 0)
+
+
+def reconcile_replies(chunk_size=1000, queryset=None):
+    """Repair `children_count` and `descendants_count` of the replies, or of all."""
+    return _reconcile(
+        Reply.objects.all() if queryset is None else queryset,
+        {
+            "children_count": reply_children_count(),
+            "descendants_count": reply_descendants_count(),
+        },
+        chunk_size,
+        _drifted_replies,
+    )
+
+
+def reconcile_posts(chunk_size=1000, queryset=None):
+    """Repair `replies_count` and `last_activity_at` of the posts, or of all."""
+    return _reconcile(
+        Post.objects.all() if queryset is None else queryset,
+        {
+            "replies_count": post_replies_count(),
+            "last_activity_at": post_last_activity_at(),
+        },
+        chunk_size,
+        _drifted_annotated,
+    )
+
+
+def _reconcile(queryset, expressions, chunk_size, find_drifted):
+    """Repair the drifted counters of the queryset in primary key ordered chunks.
+
+    Every chunk is checked by `find_drifted`, and only the drifted rows are updated,
+    with the counters recomputed inside the UPDATE so that concurrent F-expression
+    increments are not lost. Yields the number of checked and repaired rows per
+    chunk.
+    """
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:chunk_size]
+        )
+        if not pks:
+            return
+        last_pk = pks[-1]
+        drifted = find_drifted(queryset.filter(pk__in=pks), expressions)
+        if drifted:
+            queryset.filter(pk__in=drifted).update(**expressions)
+            post_detail_cache.invalidate_objects(queryset.model, drifted)
+        yield len(pks), len(drifted)
+
+
+def _drifted_annotated(queryset, expressions):
+    """Return the primary keys of the rows whose counters differ from `expressions`."""
+    in_sync = Q(**{field: F(f"actual_{field}") for field in expressions})
+    return list(
+        queryset.annotate(
+            **{
+                f"actual_{field}": expression
+                for field, expression in expressions.items()
+            }
+        )
+        .exclude(in_sync)
+        .values_list("pk", flat=True)
+    )
+
+
+def _drifted_replies(queryset, expressions):
+    """Return the primary keys of the replies whose counters drifted.
+
+    The actual counters are computed with grouped queries for the whole chunk, see
+    `reply_descendants_counts`.
+    """
+    replies = list(
+        queryset.values("pk", "post_id", "path", "children_count", "descendants_count")
+    )
+    children_counts = dict(
+        Reply.objects.filter(parent_id__in=[reply["pk"] for reply in replies])
+        .order_by()
+        .values("parent_id")
+        .annotate(count=Count("pk"))
+        .values_list("parent_id", "count")
+    )
+    descendants_counts = reply_descendants_counts(replies)
+    return [
+        reply["pk"]
+        for reply in replies
+        if reply["children_count"] != children_counts.get(reply["pk"], 0)
+        or reply["descendants_count"] != descendants_counts[reply["pk"]]
+    ]
+
+
+def reply_descendants_counts(replies):
+    """Return the actual subtree sizes of the replies without them, by primary key.
+
+    `replies` are dicts with the pk, post_id and path of each reply. The
+    descendants of a reply are the longer paths of its post starting with its
+    path, so they are counted in one grouped query per path length, by the
+    prefixes of that length, instead of one subquery per reply.
+    """
+    paths_by_length = defaultdict(set)
+    for reply in replies:
+        paths_by_length[len(reply["path"])].add((reply["post_id"], reply["path"]))
+    counts = {}
+    for length, paths in paths_by_length.items():
+        rows = (
+            Reply.objects.filter(post_id__in={post_id for post_id, _ in paths})
+            .annotate(prefix=Substr("path", 1, length), path_length=Length("path"))
+            .filter(prefix__in={path for _, path in paths}, path_length__gt=length)
+            .order_by()
+            .values("post_id", "prefix")
+            .annotate(count=Count("pk"))
+            .values_list("post_id", "prefix", "count")
+        )
+        counts.update({(post_id, prefix): count for post_id, prefix, count in rows})
+    return {
+        reply["pk"]: counts.get((reply["post_id"], reply["path"]), 0)
+        for reply in replies
+    }
@@ -0,0 +1,226 @@
+"""Events of replies of posts, published once and fanned out to every viewer.
+
+Saving a reply publishes a `reply.created` or `reply.updated` event on the
+channel of its post once the transaction commits, see `publish_reply_event`.
+Every process subscribes to a channel once, however many of its clients stream the
+post's events, and hands messages to a bounded queue per client, which
+`apps.forum.streams` sends as server-sent events.
+
+The backend is chosen by `FORUM_EVENTS_BACKEND`, with the keyword arguments of
+`FORUM_EVENTS_OPTIONS`. `MemoryEventBackend` delivers events only within its
+process, for development and tests. `RedisEventBackend` publishes through Redis
+pub/sub, so events of any web or Celery process reach the streams of all others.
+"""
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+
+from apps.forum.serializers import ReplySerializer
+
+logger = logging.getLogger(__name__)
+
+
+def post_channel(post_pk):
+    return f"forum:post:{post_pk}:events"
+
+
+class Subscription:
+    """The queue of messages of one client, ended by None.
+
+    A client which falls `FORUM_EVENTS_QUEUE_SIZE` messages behind is ended
+    instead of buffering more, its EventSource reconnects.
+    """
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=settings.FORUM_EVENTS_QUEUE_SIZE)
+        self.ended = False
+
+    async def get(self):
+        """Return the next message, or None once the subscription ended."""
+        return await self.queue.get()
+
+    def put(self, message):
+        if self.ended:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.end()
+
+    def end(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        self.ended = True
+
+
+class EventBackend(ABC):
+    """Fan out the messages of channels to the subscriptions of this process.
+
+    Subscriptions belong to the event loop they were made in, messages are handed
+    to them in that loop, so `publish` can be called from any thread.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def publish(self, channel, message):
+        """Send the message to the subscriptions of the channel."""
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        """Yield a `Subscription` to the messages of the channel."""
+        subscription = Subscription()
+        with self._lock:
+            first = not self._subscriptions[channel]
+            self._subscriptions[channel][subscription] = asyncio.get_running_loop()
+        try:
+            if first:
+                try:
+                    await self._listen(channel)
+                except BaseException:
+                    # Subscriptions made meanwhile would never receive a message.
+                    self._end_channel(channel)
+                    raise
+            yield subscription
+        finally:
+            with self._lock:
+                subscriptions = self._subscriptions.get(channel, {})
+                # Ended subscriptions were removed already, with their channel.
+                removed = subscriptions.pop(subscription, None) is not None
+                last = removed and not subscriptions
+                if last:
+                    del self._subscriptions[channel]
+            if last:
+                await self._unlisten(channel)
+
+    @abstractmethod
+    async def _listen(self, channel):
+        """Start receiving the messages of the channel."""
+
+    @abstractmethod
+    async def _unlisten(self, channel):
+        """Stop receiving the messages of the channel."""
+
+    def _dispatch(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, {}).items())
+        for subscription, loop in subscriptions:
+            loop.call_soon_threadsafe(subscription.put, message)
+
+    def _end_channel(self, channel):
+        """End the subscriptions of the channel, its next subscriber listens again."""
+        with self._lock:
+            subscriptions = self._subscriptions.pop(channel, {})
+        for subscription, loop in subscriptions.items():
+            loop.call_soon_threadsafe(subscription.end)
+
+    def _end_all(self):
+        """End all subscriptions, the next subscribers listen again."""
+        with self._lock:
+            channels, self._subscriptions = self._subscriptions, defaultdict(dict)
+        for subscriptions in channels.values():
+            for subscription, loop in subscriptions.items():
+                loop.call_soon_threadsafe(subscription.end)
+
+
+class MemoryEventBackend(EventBackend):
+    """Deliver messages to the subscriptions of this process only."""
+
+    def publish(self, channel, message):
+        self._dispatch(channel, message)
+
+    async def _listen(self, channel):
+        # Messages are published in this process, nothing to subscribe to.
+        pass
+
+    async def _unlisten(self, channel):
+        pass
+
+
+class RedisEventBackend(EventBackend):
+    """Publish messages through Redis pub/sub.
+
+    One connection per process publishes, another one, in the event loop of the
+    streams, is subscribed to the channels with viewers in this process. When it
+    fails all streams end and their clients reconnect.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    async def _listen(self, channel):
+        if self._pubsub is None:
+            client = redis.asyncio.Redis.from_url(self.url)
+            self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read(self._pubsub))
+
+    async def _unlisten(self, channel):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(channel)
+
+    async def _read(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._dispatch(
+                        message["channel"].decode(), message["data"].decode()
+                    )
+        except (redis.RedisError, OSError):
+            logger.exception("Reading forum events from Redis failed")
+            self._pubsub = None
+            await pubsub.close()
+            self._end_all()
+
+
+@lru_cache(maxsize=None)
+def get_event_backend():
+    return import_string(settings.FORUM_EVENTS_BACKEND)(**settings.FORUM_EVENTS_OPTIONS)
+
+
+def publish_reply_event(reply, created):
+    """Publish an event of the saved reply once the transaction commits.
+
+    The event holds the reply as the replies of a post are listed. Failing to
+    publish is logged, the write itself succeeded.
+    """
+    event = "reply.created" if created else "reply.updated"
+
+    def publish():
+        message = JSONRenderer().render(
+            {"event": event, "data": ReplySerializer(reply).data}
+        )
+        try:
+            get_event_backend().publish(post_channel(reply.post_id), message.decode())
+        except Exception:
+            logger.exception("Publishing %s of reply %s failed", event, reply.pk)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,90 @@
+"""Streaming export of categories, posts and replies as JSON Lines.
+
+Records have the format of `apps.forum.importers`, in the order it needs, so an
+export can be imported into another instance. Rows are fetched as dictionaries
+with `iterator(chunk_size=...)`, through server-side cursors on PostgreSQL, and
+encoded line by line, so memory stays flat however large the export is::
+
+    for chunk in export_chunks(category_pks=[1], compress=True):
+        file.write(chunk)
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.text import compress_sequence
+
+from apps.forum.models import Category, Post, Reply
+
+# Encoded lines are joined into blocks of about this many bytes, which keeps the
+# writes few and lets gzip compress across records.
+BLOCK_SIZE = 64 * 1024
+
+
+def export_records(category_pks=None, chunk_size=2000):
+    """Yield the records of the categories, all by default, with their posts and replies.
+
+    Replies come in the order of their paths, so parents before their children.
+    """
+    categories = Category.objects.all()
+    posts = Post.objects.all()
+    replies = Reply.objects.all()
+    if category_pks is not None:
+        categories = categories.filter(pk__in=category_pks)
+        posts = posts.filter(category_id__in=category_pks)
+        replies = replies.filter(post__category_id__in=category_pks)
+
+    for category in (
+        categories.order_by("pk").values("id", "name").iterator(chunk_size=chunk_size)
+    ):
+        yield {"type": "category", **category}
+    for post in (
+        posts.order_by("pk")
+        .values(
+            "id", "category_id", "author__username", "title", "markdown", "created_at"
+        )
+        .iterator(chunk_size=chunk_size)
+    ):
+        yield {
+            "type": "post",
+            "id": post["id"],
+            "category": post["category_id"],
+            "author": post["author__username"],
+            "title": post["title"],
+            "markdown": post["markdown"],
+            "created_at": post["created_at"],
+        }
+    for reply in (
+        replies.order_by("post_id", "path")
+        .values(
+            "id", "post_id", "parent_id", "author__username", "markdown", "created_at"
+        )
+        .iterator(chunk_size=chunk_size)
+    ):
+        yield {
+            "type": "reply",
+            "id": reply["id"],
+            "post": reply["post_id"],
+            "parent": reply["parent_id"],
+            "author": reply["author__username"],
+            "markdown": reply["markdown"],
+            "created_at": reply["created_at"],
+        }
+
+
+def export_chunks(category_pks=None, chunk_size=2000, compress=False):
+    """Yield the export as bytes, gzipped on the fly when `compress` is set."""
+    chunks = export_lines(export_records(category_pks, chunk_size))
+    return compress_sequence(chunks) if compress else chunks
+
+
+def export_lines(records):
+    """Yield the records as JSON Lines, in blocks of about `BLOCK_SIZE` bytes."""
+    encoder = DjangoJSONEncoder()
+    block, size = [], 0
+    for record in records:
+        line = (encoder.encode(record) + "\n").encode()
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield b"".join(block)
+            block, size = [], 0
+    if block:
+        yield b"".join(block)
@@ -0,0 +1,280 @@
+"""Bulk import of a whole forum from JSON Lines or CSV files.
+
+Every record is a flat object with a `type` and an `id` unique per type within the
+source, records have to come in the order categories, posts, replies, and parents
+before their children::
+
+    {"type": "category", "id": "1", "name": "Books"}
+    {"type": "post", "id": "1", "category": "1", "author": "jane", "title": "Hello",
+     "markdown": "...", "created_at": "2022-12-30T01:00:00+00:00"}
+    {"type": "reply", "id": "1", "post": "1", "parent": null, "author": "john",
+     "markdown": "...", "created_at": "2022-12-30T02:00:00+00:00"}
+
+Authors are usernames of existing users. Markdown is compiled in a process pool
+and every batch is inserted with `bulk_create` in one transaction together with its
+`ImportedRecord` rows, so an interrupted import continues after the last committed
+batch when it is run again with the same source.
+"""
+import csv
+import datetime
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby, islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.forum.counters import reconcile_posts, reconcile_replies
+from apps.forum.models import Category, ImportedRecord, Post, Reply, path_step
+from apps.forum.rendering import RENDERER_VERSION, render_markdown
+from apps.forum.search import post_search_vector
+from apps.forum.slugs import allocate_slugs, build_slug
+
+User = get_user_model()
+
+
+class ForumImportError(Exception):
+    pass
+
+
+def read_records(path):
+    """Yield the records of a JSON Lines or, for a .csv suffix, a CSV file."""
+    path = Path(path)
+    with path.open(newline="") as file:
+        if path.suffix == ".csv":
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ForumImporter:
+    """Import categories, posts and replies of one source in batches.
+
+    Args:
+        source: The name of the import, used to resume it.
+        batch_size: The number of records inserted per transaction.
+        workers: The number of processes compiling markdown, 0 compiles in this
+            process.
+        progress: A callable receiving the record type and the numbers of imported
+            and skipped records of that type after every batch.
+    """
+
+    def __init__(self, source, batch_size=1000, workers=0, progress=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+        self.ids = {kind: {} for kind in ImportedRecord.Kind.values}
+        self.imported = Counter()
+        self.skipped = Counter()
+        self._authors = {}
+        self._executor = None
+
+    @staticmethod
+    def _parse_datetime(value):
+        if not value:
+            return timezone.now()
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ForumImportError(f"Invalid datetime {value!r}")
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed, datetime.timezone.utc)
+        return parsed
+
+    def run(self, records):
+        """Import the records and repair the reply counters of the imported posts."""
+        self._load_imported()
+        executor = ProcessPoolExecutor(self.workers) if self.workers else nullcontext()
+        with executor as self._executor:
+            for kind, group in groupby(records, key=lambda record: record["type"]):
+                if kind not in self.ids:
+                    raise ForumImportError(f"Unknown record type {kind!r}")
+                while chunk := list(islice(group, self.batch_size)):
+                    if batch := self._new_records(kind, chunk):
+                        getattr(self, f"_import_{kind}_batch")(batch)
+        self._reconcile_counters()
+        return self.imported
+
+    def _load_imported(self):
+        """Load the mapping of already imported records of the source."""
+        imported = ImportedRecord.objects.filter(source=self.source).values_list(
+            "kind", "external_id", "object_id"
+        )
+        for kind, external_id, object_id in imported.iterator(chunk_size=10000):
+            self.ids[kind][external_id] = object_id
+
+    def _new_records(self, kind, records):
+        """Return the records which were not imported yet, with string ids."""
+        batch, skipped = [], 0
+        for record in records:
+            record["id"] = str(record["id"])
+            if record["id"] in self.ids[kind]:
+                skipped += 1
+            else:
+                batch.append(record)
+        if skipped:
+            self.skipped[kind] += skipped
+            self._report(kind)
+        return batch
+
+    def _import_category_batch(self, records):
+        with transaction.atomic():
+            categories = [
+                Category.objects.get_or_create(name=record["name"].capitalize())[0]
+                for record in records
+            ]
+            self._record(ImportedRecord.Kind.CATEGORY, records, categories)
+
+    def _import_post_batch(self, records):
+        authors = self._authors_of(records)
+        posts = []
+        for record, html in zip(records, self._compile(records)):
+            created_at = self._parse_datetime(record.get("created_at"))
+            title = record["title"].capitalize()
+            posts.append(
+                Post(
+                    title=title,
+                    markdown=record["markdown"],
+                    compiled_html=html,
+                    renderer_version=RENDERER_VERSION,
+                    search_vector=post_search_vector(title, record["markdown"]),
+                    created_at=created_at,
+                    last_activity_at=created_at,
+                    category_id=self._lookup("category", record["category"]),
+                    author_id=authors[record["author"]],
+                )
+            )
+        max_length = Post._meta.get_field("slug").max_length
+        with transaction.atomic():
+            slugs = allocate_slugs(
+                Post.objects.all(),
+                "slug",
+                [build_slug(post.created_at, post.title, max_length) for post in posts],
+                max_length,
+            )
+            for post, slug in zip(posts, slugs):
+                post.slug = slug
+            Post.objects.bulk_create(posts)
+            self._record(ImportedRecord.Kind.POST, records, posts)
+
+    def _import_reply_batch(self, records):
+        """Insert the replies, then link them to their parents and build their paths.
+
+        Parents from this batch are known only after the insert, so the parent links
+        and the paths are written by one `bulk_update` afterwards. Like `Reply.save`,
+        a reply has to be in the post of its parent and at most `Reply.MAX_DEPTH`
+        levels deep, else the batch is rolled back.
+        """
+        authors = self._authors_of(records)
+        replies = []
+        for record, html in zip(records, self._compile(records)):
+            replies.append(
+                Reply(
+                    markdown=record["markdown"],
+                    compiled_html=html,
+                    renderer_version=RENDERER_VERSION,
+                    created_at=self._parse_datetime(record.get("created_at")),
+                    post_id=self._lookup("post", record["post"]),
+                    author_id=authors[record["author"]],
+                )
+            )
+        with transaction.atomic():
+            Reply.objects.bulk_create(replies)
+            earlier_parents = [
+                self.ids["reply"][str(record["parent"])]
+                for record in records
+                if record.get("parent") and str(record["parent"]) in self.ids["reply"]
+            ]
+            parents = Reply.objects.only("post_id", "path").in_bulk(earlier_parents)
+            batch_replies = {}
+            for record, reply in zip(records, replies):
+                parent = str(record["parent"]) if record.get("parent") else None
+                if parent in batch_replies:
+                    parent_reply = batch_replies[parent]
+                elif parent is not None:
+                    parent_reply = parents[self._lookup("reply", parent)]
+                else:
+                    parent_reply = None
+                parent_path = ""
+                if parent_reply is not None:
+                    if parent_reply.post_id != reply.post_id:
+                        message = (
+                            f"Reply {record['id']!r} is not in the post of its parent"
+                        )
+                        raise ForumImportError(message)
+                    reply.parent_id = parent_reply.pk
+                    parent_path = parent_reply.path
+                reply.path = parent_path + path_step(reply.pk)
+                if reply.depth > Reply.MAX_DEPTH:
+                    message = f"Reply {record['id']!r} is nested too deep"
+                    raise ForumImportError(message)
+                batch_replies[record["id"]] = reply
+            Reply.objects.bulk_update(replies, ["parent", "path"])
+            self._record(ImportedRecord.Kind.REPLY, records, replies)
+
+    def _compile(self, records):
+        """Return the compiled markdown of the records, in the process pool if any."""
+        texts = [record["markdown"] for record in records]
+        if not self.workers:
+            return map(render_markdown, texts)
+        chunksize = max(1, len(texts) // (self.workers * 4))
+        return self._executor.map(render_markdown, texts, chunksize=chunksize)
+
+    def _authors_of(self, records):
+        """Return primary keys of the authors of the records by their usernames."""
+        usernames = {record["author"] for record in records} - self._authors.keys()
+        if usernames:
+            self._authors.update(
+                User.objects.filter(username__in=usernames).values_list(
+                    "username", "pk"
+                )
+            )
+            missing = usernames - self._authors.keys()
+            if missing:
+                raise ForumImportError(f"Unknown authors: {', '.join(sorted(missing))}")
+        return self._authors
+
+    def _lookup(self, kind, external_id):
+        try:
+            return self.ids[kind][str(external_id)]
+        except KeyError:
+            raise ForumImportError(f"Unknown {kind} {external_id!r}") from None
+
+    def _record(self, kind, records, objects):
+        """Store the mapping of the records to the created objects."""
+        ImportedRecord.objects.bulk_create(
+            ImportedRecord(
+                source=self.source,
+                kind=kind,
+                external_id=record["id"],
+                object_id=obj.pk,
+            )
+            for record, obj in zip(records, objects)
+        )
+        for record, obj in zip(records, objects):
+            self.ids[kind][record["id"]] = obj.pk
+        self.imported[kind] += len(objects)
+        self._report(kind)
+
+    def _report(self, kind):
+        if self.progress is not None:
+            self.progress(kind, self.imported[kind], self.skipped[kind])
+
+    def _reconcile_counters(self):
+        """Compute the reply counters of the imported posts and their replies."""
+        imported_posts = ImportedRecord.objects.filter(
+            source=self.source, kind=ImportedRecord.Kind.POST
+        ).values("object_id")
+        for _ in reconcile_replies(
+            queryset=Reply.objects.filter(post__in=imported_posts)
+        ):
+            pass
+        for _ in reconcile_posts(queryset=Post.objects.filter(pk__in=imported_posts)):
+            pass
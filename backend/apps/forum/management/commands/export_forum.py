@@ -0,0 +1,56 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.forum.exporters import export_chunks
+
+
+class Command(BaseCommand):
+    help = "Export categories, posts and replies as JSON Lines for import_forum, streaming rows in constant memory."
+
+    @staticmethod
+    def write_chunks(chunks, output):
+        """Write the chunks to the binary file and return the number of bytes."""
+        written = 0
+        for chunk in chunks:
+            output.write(chunk)
+            written += len(chunk)
+        return written
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="Path of the file, gzipped for a .gz suffix, - for stdout."
+        )
+        parser.add_argument(
+            "--category",
+            type=int,
+            action="append",
+            dest="categories",
+            help="Primary key of a category to export, can be repeated. All categories by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of rows fetched from the database at a time.",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Compress the output, implied by a .gz suffix.",
+        )
+
+    def handle(self, *args, path, categories, chunk_size, gzip, **options):
+        chunks = export_chunks(
+            categories, chunk_size=chunk_size, compress=gzip or path.endswith(".gz")
+        )
+        try:
+            if path == "-":
+                written = self.write_chunks(chunks, sys.stdout.buffer)
+            else:
+                with open(path, "wb") as output:
+                    written = self.write_chunks(chunks, output)
+        except OSError as error:
+            raise CommandError(f"Export failed: {error!r}") from error
+        if path != "-":
+            self.stdout.write(self.style.SUCCESS(f"Exported {written} bytes to {path}"))
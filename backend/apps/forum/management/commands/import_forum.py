@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.forum.importers import ForumImporter, ForumImportError, read_records
+
+
+class Command(BaseCommand):
+    help = "Import categories, posts and replies from a JSON Lines or CSV file, resumable with the same source."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of a .jsonl or .csv file.")
+        parser.add_argument(
+            "--source",
+            required=True,
+            help="Name of the import, e.g. of the migrated community.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of records inserted per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Number of processes compiling markdown, 0 compiles in-process.",
+        )
+
+    def handle(self, *args, path, source, batch_size, workers, **options):
+        started_at = time.monotonic()
+
+        def progress(kind, imported, skipped):
+            rate = imported / max(time.monotonic() - started_at, 1e-9)
+            self.stdout.write(
+                f"{kind}: imported {imported}, skipped {skipped} ({rate:.0f}/s)"
+            )
+
+        importer = ForumImporter(
+            source,
+            batch_size=batch_size,
+            workers=workers,
+            progress=progress if options["verbosity"] > 0 else None,
+        )
+        try:
+            imported = importer.run(read_records(path))
+        except (ForumImportError, OSError, ValueError, KeyError) as error:
+            raise CommandError(f"Import failed: {error!r}") from error
+        summary = ", ".join(f"{count} {kind}" for kind, count in imported.items())
+        self.stdout.write(self.style.SUCCESS(f"Imported {summary or 'nothing'}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.forum.counters import reconcile_posts, reconcile_replies
+
+
+class Command(BaseCommand):
+    help = "Repair drifted reply counters of posts and replies, e.g. after raw SQL updates, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows checked per query.",
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        for name, reconcile in (
+            ("replies", reconcile_replies),
+            ("posts", reconcile_posts),
+        ):
+            checked = repaired = 0
+            for chunk_checked, chunk_repaired in reconcile(chunk_size=chunk_size):
+                checked += chunk_checked
+                repaired += chunk_repaired
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{name}: checked {checked}, repaired {repaired}")
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: checked {checked}, repaired {repaired}")
+            )
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+
+from apps.forum.models import Post, Reply
+from apps.forum.rendering import RENDERER_VERSION
+from apps.forum.rerendering import rerender_chunk, stale_chunks
+from apps.forum.tasks import rerender_markdown_chunk
+
+MODELS = {"post": Post, "reply": Reply}
+
+
+class Command(BaseCommand):
+    help = "Compile markdown rendered by an older renderer again, without changing updated_at. Can be restarted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            choices=MODELS,
+            default=list(MODELS),
+            help="Models to re-render.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of objects re-rendered per transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Number of processes compiling markdown, 0 compiles in-process.",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Queue every chunk as a Celery task instead of re-rendering it here.",
+        )
+
+    def handle(self, *args, models, chunk_size, workers, celery, **options):
+        self.stdout.write(f"Re-rendering with {RENDERER_VERSION}")
+        executor = ProcessPoolExecutor(workers) if workers else nullcontext()
+        with executor:
+            for name in models:
+                model = MODELS[name]
+                started_at, done = time.monotonic(), 0
+                for pks in stale_chunks(model, chunk_size):
+                    if celery:
+                        rerender_markdown_chunk.delay(model._meta.label, pks)
+                        done += len(pks)
+                    else:
+                        done += rerender_chunk(
+                            model, pks, executor if workers else None
+                        )
+                    elapsed = max(time.monotonic() - started_at, 1e-9)
+                    self.stdout.write(f"{name}: {done} ({done / elapsed:.0f}/s)")
+                verb = "queued" if celery else "re-rendered"
+                self.stdout.write(self.style.SUCCESS(f"{name}: {verb} {done}"))
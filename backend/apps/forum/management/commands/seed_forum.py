@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.forum.models import Reply
+from apps.forum.seeding import ForumSeeder, ForumSeedError
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic forum for benchmark and staging databases, reproducible with the same seed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=10)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument(
+            "--replies",
+            type=int,
+            default=100000,
+            help="Total number of replies, spread randomly over the posts.",
+        )
+        parser.add_argument(
+            "--fan-out",
+            type=float,
+            default=1.5,
+            help="Mean number of children of a reply.",
+        )
+        parser.add_argument(
+            "--max-depth",
+            type=int,
+            default=5,
+            help="Depth of the deepest replies, top level replies have depth 0.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows inserted per query.",
+        )
+        parser.add_argument(
+            "--password",
+            default="lem",
+            help="Password of all created users.",
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options["max_depth"] <= Reply.MAX_DEPTH:
+            raise CommandError(f"--max-depth must be between 0 and {Reply.MAX_DEPTH}")
+        started_at = time.monotonic()
+
+        def progress(kind, created):
+            rate = created / max(time.monotonic() - started_at, 1e-9)
+            self.stdout.write(f"{kind}: created {created} ({rate:.0f}/s)")
+
+        seeder = ForumSeeder(
+            users=options["users"],
+            categories=options["categories"],
+            posts=options["posts"],
+            replies=options["replies"],
+            fan_out=options["fan_out"],
+            max_depth=options["max_depth"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            password=options["password"],
+            progress=progress if options["verbosity"] > 1 else None,
+        )
+        try:
+            created = seeder.run()
+        except ForumSeedError as error:
+            raise CommandError(f"Seeding failed: {error}") from error
+        summary = ", ".join(f"{count} {kind}" for kind, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}"))
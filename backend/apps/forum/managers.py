@@ -10,4 +10,47 @@ class PostManager(models.Manager):
 
 
 class ReplyManager(models.Manager):
-    pass
+    def thread(self, post):
+        """Return all replies of the post in depth-first order."""
+        return self.filter(post=post).order_by("path")
+
+    def subtree(self, reply, include_self=True):
+        """Return the reply and all its descendants in depth-first order."""
+        queryset = self.filter(post_id=reply.post_id, path__startswith=reply.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=reply.pk)
+        return queryset.order_by("path")
+
+    def get_thread(self, post):
+        """Load the whole reply tree of the post with a single query.
+
+        Returns the list of top level replies, the children of every reply are
+        available in its `thread_children` attribute.
+        """
+        return build_tree(self.thread(post))
+
+    def get_subtree(self, reply):
+        """Load the subtree of the reply with a single query and return its root."""
+        roots = build_tree(self.subtree(reply))
+        return roots[0] if roots else None
+
+
+def build_tree(replies):
+    """Link an iterable of replies into trees in O(n).
+
+    Every reply gets a `thread_children` list with its children, in the order they
+    appear in `replies`. Replies whose parent is not part of the iterable are
+    returned as roots. Parents have to come before their children, which is the case
+    for querysets ordered by `path`.
+    """
+    nodes = {}
+    roots = []
+    for reply in replies:
+        reply.thread_children = []
+        nodes[reply.pk] = reply
+        parent = nodes.get(reply.parent_id)
+        if parent is None:
+            roots.append(reply)
+        else:
+            parent.thread_children.append(reply)
+    return roots
@@ -0,0 +1,52 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:22
+
+from django.db import migrations, models
+
+PATH_STEP_LENGTH = 8
+BATCH_SIZE = 1000
+
+
+def path_step(pk):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    step = ""
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        step = digits[remainder] + step
+    return step.rjust(PATH_STEP_LENGTH, "0")
+
+
+def populate_paths(apps, schema_editor):
+    """Build the paths level by level, starting from the top level replies."""
+    Reply = apps.get_model("forum", "Reply")
+    parent_paths = {None: ""}
+    level = Reply.objects.filter(parent__isnull=True)
+    while replies := list(level.only("id", "parent_id")):
+        for reply in replies:
+            reply.path = parent_paths[reply.parent_id] + path_step(reply.pk)
+        Reply.objects.bulk_update(replies, ["path"], batch_size=BATCH_SIZE)
+        parent_paths = {reply.pk: reply.path for reply in replies}
+        level = Reply.objects.filter(parent_id__in=list(parent_paths))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0002_alter_post_slug_alter_post_title"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reply",
+            name="path",
+            field=models.CharField(
+                blank=True, editable=False, max_length=1024, verbose_name="Tree path"
+            ),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(
+                fields=["post", "path"], name="forum_reply_post_path_idx"
+            ),
+        ),
+    ]
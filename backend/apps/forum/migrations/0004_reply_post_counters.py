@@ -0,0 +1,85 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:24
+
+from django.db import migrations, models
+from django.db.models import Count, DateTimeField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+import django.utils.timezone
+
+
+def count(queryset, group_by):
+    subquery = queryset.order_by().values(group_by).annotate(count=Count("pk"))
+    return Coalesce(Subquery(subquery.values("count")), 0)
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("forum", "Post")
+    Reply = apps.get_model("forum", "Reply")
+    descendants = Reply.objects.filter(
+        post_id=OuterRef("post_id"), path__startswith=OuterRef("path")
+    ).exclude(pk=OuterRef("pk"))
+    Reply.objects.update(
+        children_count=count(Reply.objects.filter(parent=OuterRef("pk")), "parent"),
+        descendants_count=count(descendants, "post"),
+    )
+    latest_reply = Reply.objects.filter(post=OuterRef("pk")).order_by("-created_at")
+    Post.objects.update(
+        replies_count=count(Reply.objects.filter(post=OuterRef("pk")), "post"),
+        last_activity_at=Greatest(
+            "created_at",
+            Coalesce(
+                Subquery(latest_reply.values("created_at")[:1]),
+                "created_at",
+                output_field=DateTimeField(),
+            ),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0003_reply_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="last_activity_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Last activity at",
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="replies_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Replies count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="children_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Children count"
+            ),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="descendants_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Descendants count"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="post",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Created at",
+            ),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0004_reply_post_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="compile_status",
+            field=models.CharField(
+                choices=[("compiled", "Compiled"), ("pending", "Pending")],
+                default="compiled",
+                editable=False,
+                max_length=8,
+                verbose_name="Compile status",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="compile_status",
+            field=models.CharField(
+                choices=[("compiled", "Compiled"), ("pending", "Pending")],
+                default="compiled",
+                editable=False,
+                max_length=8,
+                verbose_name="Compile status",
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0005_compile_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportedRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=100, verbose_name="Source")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("category", "Category"),
+                            ("post", "Post"),
+                            ("reply", "Reply"),
+                        ],
+                        max_length=8,
+                        verbose_name="Kind",
+                    ),
+                ),
+                (
+                    "external_id",
+                    models.CharField(max_length=100, verbose_name="External ID"),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Object ID")),
+            ],
+            options={
+                "verbose_name": "Imported record",
+                "verbose_name_plural": "Imported records",
+            },
+        ),
+        migrations.AlterField(
+            model_name="reply",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                verbose_name="Created at",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="importedrecord",
+            constraint=models.UniqueConstraint(
+                fields=("source", "kind", "external_id"),
+                name="forum_importedrecord_unique_external_id",
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0006_imported_record"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="renderer_version",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="Renderer version",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reply",
+            name="renderer_version",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=64,
+                verbose_name="Renderer version",
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0007_renderer_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="forum_post_category_new_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(
+                fields=["post", "created_at", "id"], name="forum_reply_post_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.4 on 2026-10-18 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0009_post_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(
+                fields=["post", "-updated_at"], name="forum_reply_post_updated_idx"
+            ),
+        ),
+    ]
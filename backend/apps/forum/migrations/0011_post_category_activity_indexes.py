@@ -0,0 +1,26 @@
+# Generated by Django 4.1.4 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0010_reply_updated_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "-updated_at"], name="forum_post_cat_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "-last_activity_at"],
+                name="forum_post_cat_activity_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.1.4 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("forum", "0011_post_category_activity_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("compile_status", "pending")),
+                fields=["id"],
+                name="forum_post_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reply",
+            index=models.Index(
+                condition=models.Q(("compile_status", "pending")),
+                fields=["id"],
+                name="forum_reply_pending_idx",
+            ),
+        ),
+    ]
@@ -1,11 +1,25 @@
-import markdown2
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Max, Value, When
+from django.db.models.functions import Concat, Greatest, Length, Substr
+from django.utils import timezone
+from django.utils.html import linebreaks
 from django_extensions.db.fields import AutoSlugField
 from martor.models import MartorField
 
 from apps.forum.managers import CategoryManager, PostManager, ReplyManager
+from apps.forum.rendering import RENDERER_VERSION, compile_cache, compile_markdown
+from apps.forum.search import post_search_vector
+from apps.forum.slugs import allocate_slug, build_slug
+from apps.forum.tasks import schedule_compile
 
 # Create your models here.
 User = get_user_model()
@@ -17,11 +31,20 @@ class CompilableMarkdownBase(models.Model):
     Fields:
         markdown (MartorField (TextField)): Markdown text.
         compiled_html (TextField): Compiled Markdown to html, is auto created and not editable.
+        compile_status (CharField): Whether compiled_html is up to date with markdown, or
+            is pending compilation by a Celery task.
+        renderer_version (CharField): The version of the renderer which compiled
+            compiled_html, outdated html is compiled again on the next save or by the
+            rerender_markdown command.
     """
 
     class Meta:
         abstract = True
 
+    class CompileStatus(models.TextChoices):
+        COMPILED = "compiled", "Compiled"
+        PENDING = "pending", "Pending"
+
     markdown = MartorField(
         max_length=1000,
         verbose_name="Markdown content",
@@ -32,11 +55,87 @@ class CompilableMarkdownBase(models.Model):
         auto_created=True,
         blank=True,
     )
+    compile_status = models.CharField(
+        max_length=8,
+        choices=CompileStatus.choices,
+        default=CompileStatus.COMPILED,
+        editable=False,
+        verbose_name="Compile status",
+    )
+    renderer_version = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name="Renderer version",
+    )
 
     def save(self, *args, **kwargs):
-        """When the model is saved, the markdown field is converted to HTML and saved in the compiled_html field."""
-        self.compiled_html = markdown2.markdown(self.markdown)
-        return super().save(*args, **kwargs)
+        """When the model is saved, the markdown field is converted to HTML and saved in the compiled_html field.
+
+        The markdown is compiled only when it changed since it was loaded or compiled,
+        or was compiled by another renderer version, and the result is memoized by
+        `apps.forum.rendering.compile_cache`. Markdown which should be compiled
+        asynchronously and is not in the cache yet is saved as pending, and a Celery
+        task compiles it after the transaction commits.
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "markdown" not in update_fields:
+            return super().save(*args, **kwargs)
+        pending = False
+        if self.needs_compile():
+            html = None
+            if self.should_compile_async():
+                html = compile_cache.get(self.markdown)
+                pending = html is None
+            if not pending:
+                self.compiled_html = html or compile_markdown(self.markdown)
+                self.renderer_version = RENDERER_VERSION
+            self.compile_status = (
+                self.CompileStatus.PENDING if pending else self.CompileStatus.COMPILED
+            )
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "compiled_html",
+                    "compile_status",
+                    "renderer_version",
+                }
+        self._compiled_markdown = self.markdown
+        result = super().save(*args, **kwargs)
+        if pending:
+            transaction.on_commit(partial(schedule_compile, self))
+        return result
+
+    @property
+    def display_html(self):
+        """Return the html to display, the escaped markdown text while it is pending."""
+        if self.compile_status == self.CompileStatus.PENDING:
+            return linebreaks(self.markdown, autoescape=True)
+        return self.compiled_html
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded markdown, to know later if it needs to be compiled."""
+        instance = super().from_db(db, field_names, values)
+        instance._compiled_markdown = instance.__dict__.get("markdown")
+        return instance
+
+    def needs_compile(self):
+        """Return `True` if compiled_html is missing or outdated."""
+        return (
+            self.markdown != getattr(self, "_compiled_markdown", None)
+            or not getattr(self, "compiled_html", None)
+            or getattr(self, "renderer_version", None) != RENDERER_VERSION
+        )
+
+    def should_compile_async(self):
+        """Return `True` if the markdown is long enough to be compiled by a Celery task.
+
+        Asynchronous compilation is opt-in, it is enabled by setting
+        FORUM_MARKDOWN_ASYNC_MIN_LENGTH.
+        """
+        min_length = settings.FORUM_MARKDOWN_ASYNC_MIN_LENGTH
+        return min_length is not None and len(self.markdown) >= min_length
 
 
 class Category(models.Model):
@@ -93,11 +192,37 @@ class Post(CompilableMarkdownBase):
             object that the Post belongs to is deleted, the Post will also be deleted.
         author (ForeignKey): The user who wrote the Post. If the user who wrote the
             Post is deleted, the Post will also be deleted.
+        replies_count (PositiveIntegerField): The number of replies of the Post, is
+            maintained by Reply and not editable.
+        last_activity_at (DateTimeField): The datetime of the latest reply, or of the
+            creation of the Post when it has no replies yet.
+        search_vector (SearchVectorField): The full text search vector of the title
+            and markdown, is updated on save and not editable.
     """
 
     class Meta:
         verbose_name = "Post"
         verbose_name_plural = "Posts"
+        indexes = [
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                name="forum_post_category_new_idx",
+            ),
+            models.Index(
+                fields=["category", "-updated_at"],
+                name="forum_post_cat_updated_idx",
+            ),
+            models.Index(
+                fields=["category", "-last_activity_at"],
+                name="forum_post_cat_activity_idx",
+            ),
+            GinIndex(fields=["search_vector"], name="forum_post_search_idx"),
+            models.Index(
+                fields=["id"],
+                name="forum_post_pending_idx",
+                condition=models.Q(compile_status="pending"),
+            ),
+        ]
 
     objects = PostManager()
 
@@ -114,16 +239,33 @@ class Post(CompilableMarkdownBase):
 
     slug = AutoSlugField(
         populate_from=["slug_datetime", "title"],
+        overwrite_on_add=False,
         verbose_name="Post slug",
     )
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Created at",
     )
     updated_at = models.DateTimeField(
         auto_now=True,
         verbose_name="Updated at",
     )
+    replies_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Replies count",
+    )
+    last_activity_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name="Last activity at",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Search vector",
+    )
     category = models.ForeignKey(
         Category,
         on_delete=models.CASCADE,
@@ -140,16 +282,67 @@ class Post(CompilableMarkdownBase):
         return self.title
 
     def save(self, *args, **kwargs):
-        """If the title is not None, capitalize it and then save the post"""
+        """If the title is not None, capitalize it and then save the post
+
+        The search vector is computed in the same query, whenever the title or the
+        markdown are saved. The slug of a new post is allocated by
+        `apps.forum.slugs.allocate_slug` with a constant number of queries, instead of
+        the AutoSlugField probing one suffix per query.
+        """
         if self.title is not None:
             self.title = self.title.capitalize()
+        if self._state.adding:
+            self.last_activity_at = self.created_at
+            if not self.slug:
+                max_length = self._meta.get_field("slug").max_length
+                self.slug = allocate_slug(
+                    Post.objects.all(),
+                    "slug",
+                    build_slug(self.created_at, self.title, max_length),
+                    max_length,
+                )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or {"title", "markdown"} & set(update_fields):
+            self.search_vector = post_search_vector(self.title, self.markdown)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "search_vector"}
         super(Post, self).save(*args, **kwargs)
+        self._loaded_category_id = self.category_id
 
     @property
     def slug_datetime(self):
         """Takes the date time of the post and converts it into a string."""
         return str(self.created_at.strftime("%d-%m-%Y"))
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded category, whose posts change when the post moves."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        return instance
+
+
+def path_step(pk):
+    """Encode a primary key as a fixed-width base36 segment of `Reply.path`.
+
+    Fixed width keeps the lexicographic order of paths equal to the depth-first
+    order of the tree, with siblings sorted by primary key.
+    """
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    step = ""
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        step = digits[remainder] + step
+    return step.rjust(Reply.PATH_STEP_LENGTH, "0")
+
+
+def _group_by_value(mapping):
+    """Return the keys of the mapping grouped by their values."""
+    groups = defaultdict(list)
+    for key, value in mapping.items():
+        groups[value].append(key)
+    return groups
+
 
 class Reply(CompilableMarkdownBase):
     """A model representing a reply model.
@@ -165,22 +358,68 @@ class Reply(CompilableMarkdownBase):
         author (ForeignKey): A foreign key to the user model representing the author
             of the reply.
         post (ForeignKey): A foreign key to the Post.
+        path (CharField): Materialized path of the reply in the thread, the encoded
+            primary keys of all ancestors followed by its own. Is maintained on save
+            and not editable.
+        children_count (PositiveIntegerField): The number of direct children, is
+            maintained on save and delete and not editable.
+        descendants_count (PositiveIntegerField): The number of replies in the subtree
+            without the reply itself, is maintained on save and delete and not
+            editable.
     """
 
     class Meta:
         verbose_name = "reply"
         verbose_name_plural = "replies"
+        indexes = [
+            models.Index(fields=["post", "path"], name="forum_reply_post_path_idx"),
+            models.Index(
+                fields=["post", "created_at", "id"],
+                name="forum_reply_post_created_idx",
+            ),
+            models.Index(
+                fields=["post", "-updated_at"],
+                name="forum_reply_post_updated_idx",
+            ),
+            models.Index(
+                fields=["id"],
+                name="forum_reply_pending_idx",
+                condition=models.Q(compile_status="pending"),
+            ),
+        ]
+
+    PATH_STEP_LENGTH = 8
+    PATH_MAX_LENGTH = 1024
+    # Top level replies have depth 0, the path holds one step per level.
+    MAX_DEPTH = PATH_MAX_LENGTH // PATH_STEP_LENGTH - 1
 
     objects = ReplyManager()
 
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Created at",
     )
     updated_at = models.DateTimeField(
         auto_now=True,
         verbose_name="Updated at",
     )
+    path = models.CharField(
+        max_length=PATH_MAX_LENGTH,
+        editable=False,
+        blank=True,
+        verbose_name="Tree path",
+    )
+    children_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Children count",
+    )
+    descendants_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Descendants count",
+    )
     parent = models.ForeignKey(
         "self",
         on_delete=models.CASCADE,
@@ -203,14 +442,273 @@ class Reply(CompilableMarkdownBase):
         """Return the string representation of the model."""
         return "Reply"
 
+    def save(self, *args, **kwargs):
+        """Save the reply and keep the materialized path and the counters in sync.
+
+        The path contains the reply's own primary key, so it can only be built after
+        the first insert. The parent row is locked and its path read in the
+        transaction, a reply always belongs to the post of its parent. When the reply
+        is moved to another parent or post, its row is locked as well and the paths
+        and posts of all its descendants are rewritten in a single query. Counters of
+        the ancestors and of the post are changed with F-expressions in the same
+        transaction.
+
+        Raises ValidationError if the reply would become its own ancestor or be
+        nested deeper than `MAX_DEPTH`.
+        """
+        with transaction.atomic():
+            adding = self._state.adding
+            moved = not adding and self._moved()
+            if adding or moved:
+                parent_path = self._lock_parent()
+            if moved:
+                old = self._lock_for_move(parent_path)
+                self.path = parent_path + path_step(self.pk)
+            elif adding:
+                self._check_depth(len(parent_path) + self.PATH_STEP_LENGTH)
+            super().save(*args, **kwargs)
+            self._loaded_post_id = self.post_id
+            if adding:
+                self.path = parent_path + path_step(self.pk)
+                Reply.objects.filter(pk=self.pk).update(path=self.path)
+                self._update_ancestors_counters(
+                    self.post_id, self.path, self.parent_id, 1
+                )
+                self._update_post_counters(self.post_id, 1, self.created_at)
+            elif moved:
+                self._move_descendants(old["path"], old["post_id"])
+                self._move_counters(old)
+
+    @property
+    def depth(self):
+        """Return the nesting level of the reply, top level replies have depth 0."""
+        return len(self.path) // self.PATH_STEP_LENGTH - 1
+
     @property
     def has_parent(self):
         """Return `True` if instance is a parent."""
-        if self.parent is not None:
-            return True
-        return False
+        return self.parent_id is not None
 
     @property
     def replies_amount(self):
         """It returns the amount of replies a reply has as children."""
-        return self.children.count()
+        return self.children_count
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded post, to know later if the reply moved to another."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_post_id = instance.__dict__.get("post_id")
+        return instance
+
+    @classmethod
+    def subtract_deleted(cls, replies, deleted_post_ids=()):
+        """Remove deleted replies from the counters of their ancestors and posts.
+
+        Called once per delete with all its replies, see `DeletedReplies`, so
+        counters stay in sync with deletes of replies, querysets and cascades, e.g.
+        of authors. Ancestors and posts deleted together with the replies are not
+        updated. The surviving rows are updated with one query per distinct change
+        of their counters, not per deleted reply.
+        """
+        deleted_paths = {(reply.post_id, reply.path) for reply in replies}
+        # The (children, descendants) deleted below every surviving ancestor.
+        ancestors = defaultdict(lambda: (0, 0))
+        posts = defaultdict(int)
+        for reply in replies:
+            if reply.post_id in deleted_post_ids:
+                continue
+            posts[reply.post_id] += 1
+            parent_id = reply._parent_id_from_path(reply.path)
+            for path in cls._ancestor_paths(reply.path):
+                if (reply.post_id, path) in deleted_paths:
+                    continue
+                step_start = len(path) - cls.PATH_STEP_LENGTH
+                pk = int(path[step_start:], 36)
+                children, descendants = ancestors[pk]
+                ancestors[pk] = (children + (pk == parent_id), descendants + 1)
+        for (children, descendants), pks in _group_by_value(ancestors).items():
+            Reply.objects.filter(pk__in=pks).update(
+                children_count=F("children_count") - children,
+                descendants_count=F("descendants_count") - descendants,
+            )
+        for size, pks in _group_by_value(posts).items():
+            Post.objects.filter(pk__in=pks).update(
+                replies_count=F("replies_count") - size
+            )
+
+    @classmethod
+    def _ancestor_paths(cls, path):
+        """Return the paths of the ancestors, the prefixes of the path."""
+        return [
+            path[:end]
+            for end in range(cls.PATH_STEP_LENGTH, len(path), cls.PATH_STEP_LENGTH)
+        ]
+
+    def _parent_id_from_path(self, path):
+        """Return the primary key of the parent encoded in the path, if any."""
+        if len(path) <= self.PATH_STEP_LENGTH:
+            return None
+        end = len(path) - self.PATH_STEP_LENGTH
+        start = end - self.PATH_STEP_LENGTH
+        return int(path[start:end], 36)
+
+    def _moved(self):
+        """Return `True` if the parent or the post changed since the reply was saved."""
+        old_parent_id = self._parent_id_from_path(self.path)
+        old_post_id = getattr(self, "_loaded_post_id", self.post_id)
+        return self.parent_id != old_parent_id or self.post_id != old_post_id
+
+    def _lock_parent(self):
+        """Lock the parent row and return its path, or "" for a top level reply.
+
+        The reply is moved to the post of its parent.
+        """
+        if self.parent_id is None:
+            return ""
+        parent = (
+            Reply.objects.select_for_update()
+            .values("post_id", "path")
+            .get(pk=self.parent_id)
+        )
+        self.post_id = parent["post_id"]
+        return parent["path"]
+
+    def _lock_for_move(self, parent_path):
+        """Lock the row of the moved reply and return its stored state.
+
+        Returns the path, post and size of the subtree, the length of its deepest
+        path and the creation time of its latest reply.
+        Checks that the new parent is not in the reply's subtree and that the
+        deepest descendant stays within `MAX_DEPTH`.
+        """
+        old = (
+            Reply.objects.select_for_update()
+            .values("path", "post_id", "descendants_count")
+            .get(pk=self.pk)
+        )
+        if parent_path.startswith(old["path"]):
+            raise ValidationError("A reply cannot be moved below itself.")
+        old.update(
+            Reply.objects.filter(
+                post_id=old["post_id"], path__startswith=old["path"]
+            ).aggregate(deepest=Max(Length("path")), last_created_at=Max("created_at"))
+        )
+        self._check_depth(
+            len(parent_path) + self.PATH_STEP_LENGTH + old["deepest"] - len(old["path"])
+        )
+        return old
+
+    def _check_depth(self, path_length):
+        if path_length // self.PATH_STEP_LENGTH - 1 > self.MAX_DEPTH:
+            raise ValidationError(
+                f"Replies can be nested at most {self.MAX_DEPTH} levels deep."
+            )
+
+    def _move_descendants(self, old_path, old_post_id):
+        """Rewrite the paths of the descendants and carry them to the reply's post."""
+        Reply.objects.filter(post_id=old_post_id, path__startswith=old_path).exclude(
+            pk=self.pk
+        ).update(
+            path=Concat(Value(self.path), Substr("path", len(old_path) + 1)),
+            post_id=self.post_id,
+        )
+
+    def _move_counters(self, old):
+        """Move the subtree's replies from the counters of the old ancestors and post."""
+        size = old["descendants_count"] + 1
+        old_parent_id = self._parent_id_from_path(old["path"])
+        self._update_ancestors_counters(
+            old["post_id"], old["path"], old_parent_id, -size
+        )
+        self._update_ancestors_counters(self.post_id, self.path, self.parent_id, size)
+        if old["post_id"] != self.post_id:
+            self._update_post_counters(old["post_id"], -size)
+            self._update_post_counters(self.post_id, size, old["last_created_at"])
+
+    def _update_ancestors_counters(self, post_id, path, parent_id, size):
+        """Add `size` replies to the subtree counters of the ancestors in the path.
+
+        The ancestors' paths are the prefixes of the path, so all of them are updated
+        with one query. The loaded parent instance is updated as well.
+        """
+        ancestor_paths = self._ancestor_paths(path)
+        if not ancestor_paths:
+            return
+        children_delta = 1 if size > 0 else -1
+        Reply.objects.filter(post_id=post_id, path__in=ancestor_paths).update(
+            descendants_count=F("descendants_count") + size,
+            children_count=Case(
+                When(pk=parent_id, then=F("children_count") + children_delta),
+                default=F("children_count"),
+                output_field=models.PositiveIntegerField(),
+            ),
+        )
+        if parent_id == self.parent_id and Reply.parent.is_cached(self):
+            self.parent.children_count += children_delta
+            self.parent.descendants_count += size
+
+    def _update_post_counters(self, post_id, size, last_activity_at=None):
+        """Add `size` replies to the counter of the post and bump its activity."""
+        fields = {"replies_count": F("replies_count") + size}
+        if last_activity_at is not None:
+            fields["last_activity_at"] = Greatest(
+                "last_activity_at", Value(last_activity_at)
+            )
+        Post.objects.filter(pk=post_id).update(**fields)
+        if post_id == self.post_id and Reply.post.is_cached(self):
+            self.post.replies_count += size
+            if last_activity_at is not None:
+                self.post.last_activity_at = max(
+                    self.post.last_activity_at, last_activity_at
+                )
+
+
+class ImportedRecord(models.Model):
+    """A model mapping a record of an imported forum to the object created from it.
+
+    Is written in the same transaction as the imported objects, so an interrupted
+    import can be resumed from the last committed batch.
+
+    Fields:
+        source (CharField): The name of the import, e.g. the migrated community.
+        kind (CharField): The kind of the imported record.
+        external_id (CharField): The identifier of the record in the source.
+        object_id (BigIntegerField): The primary key of the created object.
+    """
+
+    class Meta:
+        verbose_name = "Imported record"
+        verbose_name_plural = "Imported records"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["source", "kind", "external_id"],
+                name="forum_importedrecord_unique_external_id",
+            ),
+        ]
+
+    class Kind(models.TextChoices):
+        CATEGORY = "category", "Category"
+        POST = "post", "Post"
+        REPLY = "reply", "Reply"
+
+    source = models.CharField(
+        max_length=100,
+        verbose_name="Source",
+    )
+    kind = models.CharField(
+        max_length=8,
+        choices=Kind.choices,
+        verbose_name="Kind",
+    )
+    external_id = models.CharField(
+        max_length=100,
+        verbose_name="External ID",
+    )
+    object_id = models.BigIntegerField(
+        verbose_name="Object ID",
+    )
+
+    def __str__(self):
+        """Return the string representation of the model."""
+        return f"{self.source}: {self.kind} {self.external_id}"
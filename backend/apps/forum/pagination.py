@@ -0,0 +1,201 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """Return the planner's estimate of the number of rows of the queryset.
+
+    Costs the same for every queryset, unlike COUNT(*) which scans all matching
+    rows. Only PostgreSQL is supported, None is returned for other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only cursor pagination on a unique combination of fields.
+
+    The cursor holds the values of the ordering fields of the last row of a page,
+    and the next page is filtered to rows after it, so every page is one indexed
+    range scan no matter how deep it is. The ordering is taken from the view's
+    `ordering`, and has to end with a unique field. An estimated total count is
+    included only when requested with `?count=true`.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 25
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.setup(request, view)
+        if self.count_requested:
+            self.count = estimate_count(queryset)
+        return self.cut_page(list(self.page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Like `paginate_queryset`, with the async ORM."""
+        self.setup(request, view)
+        if self.count_requested:
+            self.count = await sync_to_async(estimate_count)(queryset)
+        return self.cut_page([obj async for obj in self.page_queryset(queryset)])
+
+    def setup(self, request, view):
+        self.request = request
+        self.ordering = getattr(view, "ordering", self.ordering)
+        self.count = None
+        self.count_requested = (
+            request.query_params.get(self.count_query_param) == "true"
+        )
+        self.cursor = self.decode_cursor(request)
+        self.current_page_size = self.get_page_size(request)
+
+    def page_queryset(self, queryset):
+        """Return the queryset of the page and one more row, which tells if it is last."""
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                self.rows_after(self.clean_cursor(queryset, self.cursor))
+            )
+        return queryset[: self.current_page_size + 1]
+
+    def cut_page(self, page):
+        self.next_cursor = None
+        if len(page) > self.current_page_size:
+            page = page[: self.current_page_size]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def rows_after(self, values):
+        """Return a filter of the rows following the values in the ordering.
+
+        The leading bound on the first field lets the database start the index scan
+        at the cursor, the rest breaks ties field by field.
+        """
+        fields = [(field.lstrip("-"), field.startswith("-")) for field in self.ordering]
+        first_field, first_descending = fields[0]
+        bound = Q(
+            **{f"{first_field}__{'lte' if first_descending else 'gte'}": values[0]}
+        )
+        after = Q()
+        for index, (field, descending) in enumerate(fields):
+            condition = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[index]})
+            for (previous_field, _), value in zip(fields[:index], values):
+                condition &= Q(**{previous_field: value})
+            after |= condition
+        return bound & after
+
+    def encode_cursor(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip("-"))
+            values.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode()))
+        except (BinasciiError, ValueError):
+            raise NotFound(self.invalid_cursor_message) from None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def clean_cursor(self, queryset, values):
+        """Return the cursor values converted by the fields of the ordering.
+
+        Fields are the model's, or the output fields of annotations like a search
+        rank. A value the field does not accept, or a null, makes the cursor invalid.
+        """
+        annotations = queryset.query.annotations
+        cleaned = []
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip("-")
+            if name in annotations:
+                model_field = annotations[name].output_field
+            else:
+                model_field = queryset.model._meta.get_field(name)
+            try:
+                value = model_field.to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message) from None
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        paginated = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            paginated["count"] = self.count
+        return paginated
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer", "description": "Estimated total count."},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "schema": {"type": "boolean"},
+            },
+        ]
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import markdown2
+import redis
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Part of every cache key, bump it whenever the output of `render_markdown` changes.
+RENDERER_VERSION = f"markdown2-{markdown2.__version__}"
+
+
+def render_markdown(markdown):
+    """Convert markdown to html without any caching."""
+    return markdown2.markdown(markdown)
+
+
+class CompileCache:
+    """Memoization of compiled markdown keyed by a hash of the text and renderer.
+
+    Lookups go through a bounded in-process LRU first, then through the Django cache
+    configured by `FORUM_MARKDOWN_CACHE_ALIAS`, which is shared between processes,
+    and only then compile the markdown. Errors of the shared cache are logged and
+    treated as misses, so an outage of it does not block saving posts and replies.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        return settings.FORUM_MARKDOWN_CACHE_SIZE
+
+    @property
+    def shared_cache(self):
+        return caches[settings.FORUM_MARKDOWN_CACHE_ALIAS]
+
+    @staticmethod
+    def make_key(markdown):
+        """Return the cache key of the markdown for the current renderer."""
+        digest = hashlib.sha256(f"{RENDERER_VERSION}\0{markdown}".encode()).hexdigest()
+        return f"forum:markdown:{digest}"
+
+    def get(self, markdown):
+        """Return the memoized html of the markdown, or None if it is not cached."""
+        key = self.make_key(markdown)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache("markdown", hit=True)
+                return html
+        try:
+            html = self.shared_cache.get(key)
+        except (redis.RedisError, OSError):
+            logger.exception("Reading compiled markdown from the shared cache failed")
+            html = None
+        if html is not None:
+            self._remember(key, html, "shared_hits")
+        record_cache("markdown", hit=html is not None)
+        return html
+
+    def compile(self, markdown):
+        """Return the html of the markdown, compiling it only on a cache miss."""
+        html = self.get(markdown)
+        if html is None:
+            html = render_markdown(markdown)
+            key = self.make_key(markdown)
+            try:
+                self.shared_cache.set(
+                    key, html, timeout=settings.FORUM_MARKDOWN_CACHE_TIMEOUT
+                )
+            except (redis.RedisError, OSError):
+                logger.exception("Writing compiled markdown to the shared cache failed")
+            self._remember(key, html, "misses")
+        return html
+
+    def stats(self):
+        """Return the hit and miss counters of this process."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        """Drop the in-process entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def _remember(self, key, html, counter):
+        """Add the entry and count it in `counter`, under the lock like all counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+compile_cache = CompileCache()
+
+
+def compile_markdown(markdown):
+    """Convert markdown to html through the process wide `compile_cache`."""
+    return compile_cache.compile(markdown)
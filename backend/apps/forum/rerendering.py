@@ -0,0 +1,53 @@
+from django.db import transaction
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.rendering import RENDERER_VERSION, render_markdown
+
+
+def stale(model):
+    """Return the objects of the model compiled by another renderer version."""
+    return model.objects.exclude(renderer_version=RENDERER_VERSION)
+
+
+def stale_chunks(model, chunk_size):
+    """Yield primary keys of stale objects in chunks, ordered by primary key.
+
+    Objects are re-rendered from the chunk with the lowest keys, and re-rendered
+    objects are no longer stale, so an interrupted run resumes where it stopped.
+    """
+    last_pk = 0
+    while pks := list(
+        stale(model)
+        .filter(pk__gt=last_pk)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:chunk_size]
+    ):
+        last_pk = pks[-1]
+        yield pks
+
+
+def rerender_chunk(model, pks, executor=None):
+    """Compile the markdown of the stale objects again and return their number.
+
+    The rows are locked while they are compiled, and rows locked by a concurrent
+    save are skipped, since that save compiles them with the current renderer.
+    `bulk_update` leaves `updated_at` untouched.
+    """
+    with transaction.atomic():
+        objects = list(
+            stale(model)
+            .filter(pk__in=pks)
+            .select_for_update(skip_locked=True)
+            .only("pk", "markdown")
+        )
+        markdowns = [obj.markdown for obj in objects]
+        htmls = (executor.map if executor else map)(render_markdown, markdowns)
+        for obj, html in zip(objects, htmls):
+            obj.compiled_html = html
+            obj.compile_status = model.CompileStatus.COMPILED
+            obj.renderer_version = RENDERER_VERSION
+        model.objects.bulk_update(
+            objects, ["compiled_html", "compile_status", "renderer_version"]
+        )
+        post_detail_cache.invalidate_objects(model, [obj.pk for obj in objects])
+    return len(objects)
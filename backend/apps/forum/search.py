@@ -0,0 +1,37 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, TextField, Value
+from django.db.models.functions import Cast
+
+# Text search configuration of the stored vectors and the queries against them.
+SEARCH_CONFIG = "english"
+
+# The search vector of a post computed from its columns, for bulk updates.
+POST_SEARCH_VECTOR = SearchVector(
+    "title", weight="A", config=SEARCH_CONFIG
+) + SearchVector("markdown", weight="B", config=SEARCH_CONFIG)
+
+
+def post_search_vector(title, markdown):
+    """Return the search vector of a post from its values, usable in inserts.
+
+    The title is weighted above the content, so posts matching by their title rank
+    higher.
+    """
+    return SearchVector(
+        Value(title, output_field=TextField()), weight="A", config=SEARCH_CONFIG
+    ) + SearchVector(
+        Value(markdown, output_field=TextField()), weight="B", config=SEARCH_CONFIG
+    )
+
+
+def search_posts(queryset, text):
+    """Filter the posts to the ones matching the text, annotated with their `rank`.
+
+    The text uses the web search syntax, quoted phrases, `or` and `-` to exclude a
+    word. The rank is cast to double precision, so that it survives a round trip
+    through a pagination cursor unchanged.
+    """
+    query = SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=query).annotate(
+        rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+    )
@@ -0,0 +1,337 @@
+"""Fast generation of a synthetic forum for benchmark and staging databases.
+
+Generates the same shapes as the test factories, users, categories, posts and reply
+trees, but inserts them with `bulk_create` in batches: users share one precomputed
+password hash, markdown is taken from a pool compiled once, and primary keys of
+posts and replies are reserved from their sequences up front, so materialized
+paths and counters are computed before the insert instead of updated after it.
+Replies, by far the most rows, are inserted with COPY.
+
+The same seed generates the same forum on an empty database.
+"""
+import csv
+import io
+import math
+import random
+from collections import deque
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from faker import Faker
+
+from apps.forum.models import Category, Post, Reply, path_step
+from apps.forum.rendering import RENDERER_VERSION, render_markdown
+from apps.forum.search import post_search_vector
+from apps.forum.slugs import allocate_slugs, build_slug
+
+User = get_user_model()
+
+# Generated posts are spread over two years after this date.
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+POSTS_SPAN = timedelta(days=730)
+# The longest time between a post or reply and a reply to it.
+REPLY_DELAY = timedelta(days=2)
+
+
+@dataclass
+class ReplyRow:
+    """A generated reply, inserted with COPY as the values of its fields in order.
+
+    `post`, `parent` and `author` hold primary keys.
+    """
+
+    id: int
+    post: int
+    parent: int
+    author: int
+    path: str
+    markdown: str
+    compiled_html: str
+    compile_status: str
+    renderer_version: str
+    created_at: datetime
+    updated_at: datetime
+    children_count: int = 0
+    descendants_count: int = 0
+
+
+# Replies are inserted with COPY, as the values of these fields.
+REPLY_FIELDS = [field.name for field in fields(ReplyRow)]
+reply_values = attrgetter(*REPLY_FIELDS)
+
+
+class ForumSeedError(Exception):
+    pass
+
+
+def poisson(rng, mean):
+    """Draw a Poisson distributed number with Knuth's method, meant for small means."""
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def reply_tree(rng, size, fan_out, max_depth):
+    """Return the parent index and depth of each of `size` replies of one post.
+
+    Replies are generated breadth first, so parents come before their children.
+    Every reply gets a Poisson distributed number of children with the mean
+    `fan_out`, replies at `max_depth` get none, and a new top level reply is
+    started whenever all branches ended.
+    """
+    replies = []
+    queue = deque()
+    while len(replies) < size:
+        if not queue:
+            replies.append((None, 0))
+            queue.append(len(replies) - 1)
+            continue
+        parent = queue.popleft()
+        depth = replies[parent][1] + 1
+        if depth > max_depth:
+            continue
+        for _ in range(min(poisson(rng, fan_out), size - len(replies))):
+            replies.append((parent, depth))
+            queue.append(len(replies) - 1)
+    return replies
+
+
+def copy_rows(model, fields, rows):
+    """Insert the rows with COPY, which is much faster than INSERT for many rows.
+
+    The rows hold the values of the fields in their order, None is stored as NULL.
+    No `pre_save` or signals run, every value has to be given.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    columns = ", ".join(
+        connection.ops.quote_name(model._meta.get_field(field).column)
+        for field in fields
+    )
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def reserve_pks(model, count):
+    """Return `count` primary keys taken from the sequence of the model's table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [pk for pk, in cursor.fetchall()]
+
+
+class ForumSeeder:
+    """Generate users, categories, posts and reply trees.
+
+    Args:
+        users: The number of users to create, 0 makes existing users the authors.
+        categories: The number of categories to create, 0 uses existing ones.
+        posts: The number of posts to create.
+        replies: The number of replies, spread randomly over the posts.
+        fan_out: The mean number of children of a reply.
+        max_depth: The depth of the deepest replies, top level replies have depth 0.
+        seed: The seed of all random choices.
+        batch_size: The number of rows inserted per query.
+        password: The password of all created users.
+        progress: A callable receiving the kind of rows and the number created so
+            far after every batch.
+    """
+
+    markdown_pool_size = 200
+    word_pool_size = 1000
+
+    def __init__(
+        self,
+        users=1000,
+        categories=10,
+        posts=10000,
+        replies=100000,
+        fan_out=1.5,
+        max_depth=5,
+        seed=0,
+        batch_size=5000,
+        password="lem",
+        progress=None,
+    ):
+        self.users = users
+        self.categories = categories
+        self.posts = posts
+        self.replies = replies
+        self.fan_out = fan_out
+        self.max_depth = max_depth
+        self.seed = seed
+        self.batch_size = batch_size
+        self.password = password
+        self.progress = progress
+        self.rng = random.Random(seed)  # noqa: DUO102, seeded for a reproducible forum
+        self.faker = Faker()
+        self.faker.seed_instance(seed)
+        self.created = {"users": 0, "categories": 0, "posts": 0, "replies": 0}
+
+    def run(self):
+        """Create the forum and return the numbers of created rows."""
+        self._build_pools()
+        author_pks = self._create_users()
+        category_pks = self._create_categories()
+        if self.posts and not (author_pks and category_pks):
+            raise ForumSeedError("Posts need at least one user and one category")
+        sizes = [0] * self.posts
+        for _ in range(self.replies if self.posts else 0):
+            sizes[self.rng.randrange(self.posts)] += 1
+        # Posts of a batch are inserted with their replies, about batch_size rows.
+        replies_per_post = self.replies // max(1, self.posts)
+        posts_per_batch = max(1, self.batch_size // (1 + replies_per_post))
+        for start in range(0, self.posts, posts_per_batch):
+            end = start + posts_per_batch
+            self._create_posts(sizes[start:end], author_pks, category_pks)
+        return self.created
+
+    def _build_pools(self):
+        """Generate the words of titles, names of users and markdown, compiled once."""
+        words = self.faker.words(self.word_pool_size * 2)
+        self.words = sorted({word for word in words if word.isalpha()})
+        self.first_names = [self.faker.first_name() for _ in range(200)]
+        self.last_names = [self.faker.last_name() for _ in range(200)]
+        self.markdowns = []
+        for _ in range(self.markdown_pool_size):
+            items = "\n".join(f"- {sentence}" for sentence in self.faker.sentences(3))
+            markdown = "\n\n".join(
+                [
+                    self.faker.paragraph(),
+                    items,
+                    f"**{self.faker.word()}** {self.faker.paragraph()}",
+                ]
+            )
+            self.markdowns.append(markdown[:1000])
+        self.htmls = [render_markdown(markdown) for markdown in self.markdowns]
+
+    def _markdown(self):
+        """Return a random markdown from the pool and its html."""
+        index = self.rng.randrange(len(self.markdowns))
+        return self.markdowns[index], self.htmls[index]
+
+    def _create_users(self):
+        """Create the users and return primary keys of all users."""
+        prefix = f"seed-{self.seed}-"
+        if self.users and User.objects.filter(username__startswith=prefix).exists():
+            raise ForumSeedError(f"Users of seed {self.seed} already exist")
+        password = make_password(self.password)
+        for start in range(0, self.users, self.batch_size):
+            numbers = range(start, min(start + self.batch_size, self.users))
+            User.objects.bulk_create(
+                User(
+                    username=f"{prefix}{number}",
+                    email=f"{prefix}{number}@example.com",
+                    first_name=self.first_names[number % len(self.first_names)],
+                    last_name=self.last_names[number // 7 % len(self.last_names)],
+                    password=password,
+                )
+                for number in numbers
+            )
+            self._report("users", len(numbers))
+        return list(User.objects.order_by("pk").values_list("pk", flat=True))
+
+    def _create_categories(self):
+        """Create the categories and return primary keys of all categories."""
+        names = self.rng.sample(self.words, min(self.categories, len(self.words)))
+        created = sum(
+            Category.objects.get_or_create(name=name.capitalize())[1] for name in names
+        )
+        self._report("categories", created)
+        return list(Category.objects.order_by("pk").values_list("pk", flat=True))
+
+    def _create_posts(self, sizes, author_pks, category_pks):
+        """Create posts with the given numbers of replies in one transaction."""
+        max_length = Post._meta.get_field("slug").max_length
+        posts, replies = [], []
+        with transaction.atomic():
+            reply_pks = iter(reserve_pks(Reply, sum(sizes)))
+            for pk, size in zip(reserve_pks(Post, len(sizes)), sizes):
+                post = self._build_post(pk, author_pks, category_pks)
+                replies += self._build_replies(post, size, reply_pks, author_pks)
+                posts.append(post)
+            slugs = allocate_slugs(
+                Post.objects.all(),
+                "slug",
+                [build_slug(post.created_at, post.title, max_length) for post in posts],
+                max_length,
+            )
+            for post, slug in zip(posts, slugs):
+                post.slug = slug
+            Post.objects.bulk_create(posts, batch_size=self.batch_size)
+            copy_rows(Reply, REPLY_FIELDS, map(reply_values, replies))
+        self._report("posts", len(posts))
+        self._report("replies", len(replies))
+
+    def _build_post(self, pk, author_pks, category_pks):
+        title = " ".join(self.rng.choices(self.words, k=self.rng.randint(2, 6)))
+        title = title.capitalize()
+        markdown, html = self._markdown()
+        return Post(
+            pk=pk,
+            title=title,
+            markdown=markdown,
+            compiled_html=html,
+            renderer_version=RENDERER_VERSION,
+            search_vector=post_search_vector(title, markdown),
+            created_at=EPOCH + self.rng.random() * POSTS_SPAN,
+            category_id=self.rng.choice(category_pks),
+            author_id=self.rng.choice(author_pks),
+        )
+
+    def _build_replies(self, post, size, pks, author_pks):
+        """Return the `ReplyRow` of a reply tree of the post, parents first.
+
+        Paths and counters are computed here, the counters of the post are set on
+        it.
+        """
+        tree = reply_tree(self.rng, size, self.fan_out, self.max_depth)
+        rows = []
+        for parent_index, _ in tree:
+            parent = rows[parent_index] if parent_index is not None else None
+            pk = next(pks)
+            markdown, html = self._markdown()
+            created_at = (parent.created_at if parent else post.created_at) + (
+                self.rng.random() * REPLY_DELAY
+            )
+            rows.append(
+                ReplyRow(
+                    id=pk,
+                    post=post.pk,
+                    parent=parent and parent.id,
+                    author=self.rng.choice(author_pks),
+                    path=(parent.path if parent else "") + path_step(pk),
+                    markdown=markdown,
+                    compiled_html=html,
+                    compile_status=Reply.CompileStatus.COMPILED.value,
+                    renderer_version=RENDERER_VERSION,
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+            )
+        for row, (parent_index, _) in reversed(list(zip(rows, tree))):
+            if parent_index is not None:
+                rows[parent_index].children_count += 1
+                rows[parent_index].descendants_count += row.descendants_count + 1
+        post.replies_count = len(rows)
+        post.last_activity_at = max(
+            [post.created_at, *(row.created_at for row in rows)]
+        )
+        return rows
+
+    def _report(self, kind, created):
+        self.created[kind] += created
+        if self.progress is not None:
+            self.progress(kind, self.created[kind])
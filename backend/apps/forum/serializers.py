@@ -0,0 +1,93 @@
+from rest_framework import serializers
+
+from apps.forum.models import Post, Reply
+
+
+class PostSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "category",
+            "author",
+            "created_at",
+            "updated_at",
+            "replies_count",
+            "last_activity_at",
+        ]
+        read_only_fields = fields
+
+    author = serializers.CharField(source="author.username", read_only=True)
+
+
+class ReplySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Reply
+        fields = [
+            "id",
+            "parent",
+            "author",
+            "html",
+            "created_at",
+            "updated_at",
+            "depth",
+            "children_count",
+        ]
+        read_only_fields = fields
+
+    author = serializers.CharField(source="author.username", read_only=True)
+    html = serializers.CharField(source="display_html", read_only=True)
+
+
+class PostSearchSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = [*PostSerializer.Meta.fields, "rank"]
+        read_only_fields = fields
+
+    rank = serializers.FloatField(read_only=True)
+
+
+class PostDetailSerializer(PostSerializer):
+    class Meta(PostSerializer.Meta):
+        fields = [*PostSerializer.Meta.fields, "category_name", "html", "replies"]
+        read_only_fields = fields
+
+    category_name = serializers.CharField(source="category.name", read_only=True)
+    html = serializers.CharField(source="display_html", read_only=True)
+    replies = serializers.SerializerMethodField()
+
+    def get_replies(self, post):
+        """Return the reply tree of the post, loaded with one query.
+
+        Replies loaded already, in the order of `Reply.objects.thread`, are taken
+        from the `thread` of the context instead.
+        """
+        replies = self.context.get("thread")
+        if replies is None:
+            replies = Reply.objects.thread(post).select_related("author")
+        return nest_replies(
+            ReplySerializer(replies, many=True, context=self.context).data
+        )
+
+
+def nest_replies(replies):
+    """Link serialized replies into trees in O(n), without recursion.
+
+    Every reply gets a `replies` list with its children, in the order they appear in
+    `replies`, so threads nest up to `Reply.MAX_DEPTH` levels. Replies whose parent
+    is not part of `replies` are returned as roots. Parents have to come before
+    their children, like in `Reply.objects.thread`.
+    """
+    nodes = {}
+    roots = []
+    for reply in replies:
+        reply["replies"] = []
+        nodes[reply["id"]] = reply
+        parent = nodes.get(reply["parent"])
+        if parent is None:
+            roots.append(reply)
+        else:
+            parent["replies"].append(reply)
+    return roots
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.counters import deleted_replies
+from apps.forum.events import publish_reply_event
+from apps.forum.models import Category, Post, Reply
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    loaded_category_id = getattr(instance, "_loaded_category_id", None)
+    post_detail_cache.invalidate_posts(
+        [instance.pk], category_pks={instance.category_id, loaded_category_id} - {None}
+    )
+
+
+@receiver(post_save, sender=Reply)
+@receiver(post_delete, sender=Reply)
+def invalidate_reply_post(sender, instance, **kwargs):
+    loaded_post_id = getattr(instance, "_loaded_post_id", None)
+    post_detail_cache.invalidate_posts({instance.post_id, loaded_post_id} - {None})
+
+
+@receiver(pre_delete, sender=Post)
+@receiver(pre_delete, sender=Reply)
+def collect_deleted(sender, instance, origin, **kwargs):
+    deleted_replies.collect(instance, origin)
+
+
+@receiver(post_delete, sender=Reply)
+def subtract_deleted_reply(sender, instance, origin, **kwargs):
+    deleted_replies.deleted(instance, origin)
+
+
+@receiver(post_save, sender=Reply)
+def publish_reply(sender, instance, created, **kwargs):
+    publish_reply_event(instance, created)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_categories(sender, instance, **kwargs):
+    post_detail_cache.invalidate_categories()
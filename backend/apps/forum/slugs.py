@@ -0,0 +1,102 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, CharField, F, Func, IntegerField, Max, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils.text import slugify
+
+SEPARATOR = "-"
+
+
+def build_slug(created_at, title, max_length):
+    """Return the slug of a post without any suffix, like `Post.slug` builds it."""
+    slug = SEPARATOR.join([slugify(created_at.strftime("%d-%m-%Y")), slugify(title)])
+    return _strip(slug[:max_length])
+
+
+def with_suffix(slug, number, max_length):
+    """Return the slug with a numeric suffix, shortened to fit into max_length."""
+    end = f"{SEPARATOR}{number}"
+    if len(slug) + len(end) > max_length:
+        slug = _strip(slug[: max_length - len(end)])
+    return f"{slug}{end}"
+
+
+def _suffix_number(field):
+    """Return an expression with the numeric suffix of the field, or NULL."""
+    return Cast(
+        Func(F(field), Value(f"{SEPARATOR}([0-9]{{1,9}})$"), function="substring"),
+        IntegerField(),
+    )
+
+
+def allocate_slug(queryset, field, slug, max_length):
+    """Return a unique slug for one new object, see `allocate_slugs`."""
+    return allocate_slugs(queryset, field, [slug], max_length)[0]
+
+
+def allocate_slugs(queryset, field, slugs, max_length):
+    """Return unique slugs for a batch of new objects with two queries.
+
+    `slugs` are the slugs the objects would get without a suffix. A slug is used
+    as it is when it is free, duplicates get a numeric suffix above the highest one
+    taken among slugs with the same prefix, also within the batch. The queries
+    return a row per distinct slug and prefix at most, instead of a row per
+    existing duplicate, so the cost does not grow with the number of collisions.
+    """
+    if not slugs:
+        return []
+    taken = set(
+        queryset.filter(**{f"{field}__in": set(slugs)}).values_list(field, flat=True)
+    )
+    # Suffixed variants of a slug which is not truncated have to match it exactly.
+    # Patterns of the longest prefix come first, so every slug is counted for the
+    # closest prefix.
+    patterns = {}
+    for slug in sorted(slugs, key=len, reverse=True):
+        prefix = _prefix(slug, max_length)
+        rest = "" if prefix == slug else ".*"
+        patterns.setdefault(prefix, f"^{re.escape(prefix)}{rest}{SEPARATOR}[0-9]+$")
+    suffixed = queryset.filter(
+        reduce(or_, (Q(**{f"{field}__startswith": prefix}) for prefix in patterns)),
+        **{f"{field}__regex": f"{SEPARATOR}[0-9]+$"},
+    )
+    numbers = dict(
+        suffixed.annotate(
+            prefix=Case(
+                *(
+                    When(**{f"{field}__regex": pattern}, then=Value(prefix))
+                    for prefix, pattern in patterns.items()
+                ),
+                output_field=CharField(),
+            )
+        )
+        .order_by()
+        .values("prefix")
+        .annotate(number=Max(_suffix_number(field)))
+        .values_list("prefix", "number")
+    )
+    allocated = []
+    for slug in slugs:
+        if slug not in taken:
+            taken.add(slug)
+            allocated.append(slug)
+            continue
+        prefix = _prefix(slug, max_length)
+        numbers[prefix] = (numbers.get(prefix) or 1) + 1
+        allocated.append(with_suffix(slug, numbers[prefix], max_length))
+    return allocated
+
+
+def _prefix(slug, max_length):
+    """Return the common prefix of the slug and its suffixed variants below 10**7."""
+    if len(slug) + 8 <= max_length:
+        return slug
+    return _strip(slug[: max_length - 8])
+
+
+def _strip(slug):
+    """Collapse repeated separators and remove them from both ends of the slug."""
+    slug = re.sub(f"{SEPARATOR}+", SEPARATOR, slug)
+    return slug.strip(SEPARATOR)
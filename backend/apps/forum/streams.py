@@ -0,0 +1,141 @@
+"""Server-sent events of the replies of a post, an ASGI application.
+
+`GET /api/forum/posts/<pk>/events/`, the URL named `forum:post-events`, streams the
+events of `apps.forum.events` of the post as they happen::
+
+    event: reply.created
+    data: {"id": 7, "parent": 3, "author": "jane", "html": "...", ...}
+
+Django 4.1 cannot stream from an async iterator, a streaming response would block
+the event loop, so `ReplyEventStream` wraps the Django application in
+`config.asgi` and answers the paths resolving to this URL itself, without
+Django's middleware, but with the authentication, permission and throttle classes
+of the post detail. Under WSGI, where Django answers the URL, it is not found. A
+comment is sent every `FORUM_EVENTS_KEEPALIVE` seconds so proxies keep idle streams
+open.
+"""
+import asyncio
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import Http404
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotFound
+
+from apps.core.asgi import resolve_scope
+from apps.forum import views
+from apps.forum.async_views import error_response, make_api_view
+from apps.forum.events import get_event_backend, post_channel
+from apps.forum.models import Post
+
+STREAM_VIEW_NAME = "forum:post-events"
+STREAM_HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    # Stops nginx from buffering the stream.
+    (b"x-accel-buffering", b"no"),
+]
+
+
+def format_event(message):
+    """Return the server-sent event of a published message."""
+    message = json.loads(message)
+    data = json.dumps(message["data"], separators=(",", ":"))
+    return f"event: {message['event']}\ndata: {data}\n\n".encode()
+
+
+def post_events(request, pk):
+    """The URL of the stream, which only `ReplyEventStream` answers."""
+    raise Http404("Reply events are streamed under ASGI only.")
+
+
+def check_request(api_view, pk):
+    """Check the request like the post detail does, and that the post exists."""
+    try:
+        api_view.initial(api_view.request, pk=pk)
+        if not Post.objects.filter(pk=pk).exists():
+            raise NotFound
+    finally:
+        # Outside of Django's handler nothing else closes the connection.
+        close_old_connections()
+
+
+async def send_response(send, response):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in response.items()
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": response.content})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class ReplyEventStream:
+    """Answer requests of reply event streams, pass all others to `application`."""
+
+    def __init__(self, application):
+        self.application = application
+
+    @staticmethod
+    async def send_events(subscription, disconnect, send):
+        while True:
+            message = asyncio.ensure_future(subscription.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect},
+                timeout=settings.FORUM_EVENTS_KEEPALIVE,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                message.cancel()
+                return
+            if message not in done:
+                message.cancel()
+                body = b": keepalive\n\n"
+            elif message.result() is None:
+                break
+            else:
+                body = format_event(message.result())
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def stream(self, pk, receive, send):
+        disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            async with get_event_backend().subscribe(post_channel(pk)) as subscription:
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": STREAM_HEADERS,
+                    }
+                )
+                await self.send_events(subscription, disconnect, send)
+        finally:
+            disconnect.cancel()
+
+    async def __call__(self, scope, receive, send):
+        match = resolve_scope(scope)
+        if match is None or match.view_name != STREAM_VIEW_NAME:
+            return await self.application(scope, receive, send)
+        kwargs = match.kwargs
+        request = ASGIRequest(scope, io.BytesIO())
+        api_view = make_api_view(views.PostDetailView, request, (), kwargs)
+        try:
+            if request.method != "GET":
+                raise MethodNotAllowed(request.method)
+            await sync_to_async(check_request)(api_view, kwargs["pk"])
+        except APIException as exc:
+            return await send_response(send, error_response(api_view, exc))
+        await self.stream(kwargs["pk"], receive, send)
@@ -0,0 +1,99 @@
+import logging
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.rendering import RENDERER_VERSION, compile_cache
+from apps.forum.rerendering import rerender_chunk
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def requeue_pending_markdown():
+    """Queue compilation of all pending posts and replies whose task was lost.
+
+    Run periodically by Celery beat, for instances whose task could not be queued or
+    was lost by the broker. Instances with a queued task hold the lock of
+    `schedule_compile` and are skipped, a lost task's lock expires after
+    FORUM_MARKDOWN_COMPILE_LOCK_TIMEOUT.
+    """
+    for model_label in ("forum.Post", "forum.Reply"):
+        model = apps.get_model(model_label)
+        pending = model.objects.filter(compile_status=model.CompileStatus.PENDING)
+        for instance in pending.only("pk").iterator():
+            schedule_compile(instance)
+
+
+def schedule_compile(instance):
+    """Queue compilation of the instance's markdown unless it is already queued.
+
+    A lock in the shared cache coalesces rapid edits into one task: it is taken when
+    the task is queued and released when the task starts, and the task compiles the
+    markdown that is current at that time. It is released right away when queueing
+    fails, so the next edit queues the task again.
+
+    Runs after the transaction committed, so errors are logged instead of failing
+    the request, and `requeue_pending_markdown` queues the instance again later.
+    """
+    model_label = instance._meta.label
+    lock_key = _compile_lock_key(model_label, instance.pk)
+    cache = caches[settings.FORUM_MARKDOWN_CACHE_ALIAS]
+    try:
+        if cache.add(
+            lock_key, True, timeout=settings.FORUM_MARKDOWN_COMPILE_LOCK_TIMEOUT
+        ):
+            try:
+                compile_pending_markdown.delay(model_label, instance.pk)
+            except Exception:
+                cache.delete(lock_key)
+                raise
+    except Exception:
+        logger.exception(
+            "Queueing compilation of %s %s failed", model_label, instance.pk
+        )
+
+
+@shared_task
+def compile_pending_markdown(model_label, pk):
+    """Compile the markdown of a pending instance and store its html.
+
+    The update is conditional on the markdown compiled, so an edit made meanwhile
+    is never overwritten with stale html, it has queued its own task instead. A
+    compiled reply is published as a `reply.updated` event.
+    """
+    from apps.forum.events import publish_reply_event
+
+    caches[settings.FORUM_MARKDOWN_CACHE_ALIAS].delete(
+        _compile_lock_key(model_label, pk)
+    )
+    model = apps.get_model(model_label)
+    markdown = (
+        model.objects.filter(pk=pk, compile_status=model.CompileStatus.PENDING)
+        .values_list("markdown", flat=True)
+        .first()
+    )
+    if markdown is None:
+        return
+    updated = model.objects.filter(pk=pk, markdown=markdown).update(
+        compiled_html=compile_cache.compile(markdown),
+        compile_status=model.CompileStatus.COMPILED,
+        renderer_version=RENDERER_VERSION,
+    )
+    if updated:
+        post_detail_cache.invalidate_objects(model, [pk])
+        if model._meta.label == "forum.Reply":
+            publish_reply_event(model.objects.get(pk=pk), created=False)
+
+
+@shared_task
+def rerender_markdown_chunk(model_label, pks):
+    """Compile stale markdown of the objects with the current renderer."""
+    return rerender_chunk(apps.get_model(model_label), pks)
+
+
+def _compile_lock_key(model_label, pk):
+    return f"forum:markdown:compile:{model_label}:{pk}"
@@ -0,0 +1,57 @@
+"""Compare two files of benchmark results and report the changes.
+
+Usage::
+
+    python -m apps.forum.tests.benchmarks.compare OLD NEW [--threshold 0.1]
+
+Exits with status 1 when the median of any benchmark grew by more than the
+threshold, or when it runs more queries than before.
+"""
+import argparse
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative growth of a median reported as a regression.",
+    )
+    args = parser.parse_args(argv)
+    regressions = 0
+    for line, regressed in compare(load(args.old), load(args.new), args.threshold):
+        regressions += regressed
+        sys.stdout.write(f"{'REGRESSION ' if regressed else ''}{line}\n")
+    return 1 if regressions else 0
+
+
+def load(path):
+    """Return the results of a file keyed by their name and parameters."""
+    with open(path) as file:
+        results = json.load(file)["results"]
+    return {
+        (result["name"], tuple(sorted(result["params"].items()))): result
+        for result in results
+    }
+
+
+def compare(old, new, threshold):
+    """Yield a report line per benchmark in both results and if it regressed."""
+    for key in sorted(old.keys() & new.keys(), key=str):
+        before, after = old[key], new[key]
+        change = after["median"] / before["median"] - 1 if before["median"] else 0
+        regressed = change > threshold or after["queries"] > before["queries"]
+        name, params = key
+        label = " ".join([name, *(f"{param}={value}" for param, value in params)])
+        medians = f"{before['median'] * 1000:9.2f} ms -> {after['median'] * 1000:9.2f} ms ({change:+.0%})"
+        queries = f"{before['queries']} -> {after['queries']} queries"
+        yield f"{label:<60} {medians}, {queries}", regressed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
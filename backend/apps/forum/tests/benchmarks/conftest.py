@@ -0,0 +1,110 @@
+"""Timing of the benchmarks and the file their results are written to.
+
+Benchmarks are marked `benchmark` and deselected by default, run them with::
+
+    pytest -m benchmark
+
+The results are written as JSON to the path in the BENCHMARK_JSON environment
+variable, by default to `.benchmarks/<commit>.json`, and two such files are
+compared with `python -m apps.forum.tests.benchmarks.compare OLD NEW`.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+import django
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+results_key = pytest.StashKey[list]()
+
+
+def pytest_configure(config):
+    config.stash[results_key] = []
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = config.stash.get(results_key, [])
+    if not results:
+        return
+    terminalreporter.section("benchmarks")
+    for result in results:
+        median, minimum = result["median"] * 1000, result["min"] * 1000
+        terminalreporter.line(
+            f"{result['name']:<60} median {median:9.2f} ms  min {minimum:9.2f} ms  {result['queries']:>5} queries"
+        )
+    commit = _commit()
+    path = results_path(commit)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        json.dumps(
+            {
+                "commit": commit,
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    terminalreporter.line(f"results written to {path}")
+
+
+@pytest.fixture()
+def measure(request):
+    """Return a function timing a callable over several rounds after a warm-up.
+
+    The number of queries is counted during the warm-up, with an execute wrapper
+    rather than the query log, which the test client resets on every request.
+    `params` describe the dataset, e.g. its size, and are stored with the result.
+    The timings are reported at the end of the session and returned as a dict.
+    """
+
+    def measure(name, func, rounds=5, **params):
+        queries = []
+        with connection.execute_wrapper(
+            lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)
+        ):
+            func()
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        result = {
+            "name": name,
+            "params": params,
+            "median": statistics.median(timings),
+            "mean": statistics.mean(timings),
+            "min": min(timings),
+            "max": max(timings),
+            "rounds": rounds,
+            "queries": len(queries),
+        }
+        request.config.stash[results_key].append(result)
+        return result
+
+    return measure
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def results_path(commit):
+    default = Path(".benchmarks") / f"{commit or 'results'}.json"
+    return Path(os.environ.get("BENCHMARK_JSON", default))
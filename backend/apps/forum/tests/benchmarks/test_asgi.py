@@ -0,0 +1,132 @@
+"""Throughput of the post detail under WSGI and ASGI with many slow clients.
+
+No server is part of the dependencies, so the handlers are driven the way servers
+drive them. WSGI requests are served by a fixed pool of threads, like gunicorn's
+gthread workers, and a thread stays busy until the slow client has read the
+response. ASGI requests are served in one event loop, which awaits slow clients
+without holding a thread. Clients take `delay` seconds to read a response.
+
+Without a delay ASGI is slower: under ASGI Django 4.1 runs every hook of the
+middleware based on `MiddlewareMixin` in a thread, dozens of switches per request.
+It wins once clients hold WSGI threads for longer than that costs.
+
+The post detail is cached before the load, so requests measure the stack rather
+than the database, and concurrent misses do not open a connection per client.
+Requests run in threads of their own, which see committed data only, hence the
+transactional database.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import RequestFactory
+from django.urls import reverse
+
+from apps.forum.models import Post
+from apps.forum.seeding import ForumSeeder
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db(transaction=True)]
+
+CLIENTS = 100
+WSGI_THREADS = 8
+
+
+@pytest.mark.parametrize("delay", [0, 0.2])
+@pytest.mark.parametrize(
+    ("server", "view"),
+    [
+        ("wsgi", "forum:post-detail"),
+        ("asgi", "forum:post-detail"),
+        ("asgi", "forum:async-post-detail"),
+    ],
+)
+def test_slow_clients(post, measure, server, view, delay):
+    url = reverse(view, args=[post.pk])
+    if server == "wsgi":
+        load = lambda: wsgi_load(url, CLIENTS, WSGI_THREADS, delay)  # noqa: E731
+    else:
+        load = lambda: asgi_load(url, CLIENTS, delay)  # noqa: E731
+    assert wsgi_load(url, 1, 1) == [200]
+    assert set(load()) == {200}
+
+    result = measure(
+        f"{server.upper()} GET {view}, {CLIENTS} clients reading for {delay}s",
+        load,
+        rounds=3,
+        server=server,
+        clients=CLIENTS,
+        delay=delay,
+        threads=WSGI_THREADS if server == "wsgi" else None,
+    )
+
+    result["params"]["requests_per_second"] = round(CLIENTS / result["median"])
+
+
+@pytest.fixture()
+def post():
+    ForumSeeder(users=10, categories=1, posts=1, replies=100).run()
+    return Post.objects.get()
+
+
+def wsgi_load(url, clients, threads, delay=0):
+    """Serve the clients with a pool of threads and return the response statuses."""
+    handler = WSGIHandler()
+    environ = RequestFactory().get(url).environ
+
+    def serve(_):
+        statuses = []
+        response = handler(
+            dict(environ),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        try:
+            for _ in response:
+                time.sleep(delay)
+        finally:
+            response.close()
+        return int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(threads) as pool:
+        return list(pool.map(serve, range(clients)))
+
+
+def asgi_load(url, clients, delay=0):
+    """Serve the clients in one event loop and return the response statuses."""
+    handler = ASGIHandler()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": url,
+        "raw_path": url.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+
+    async def serve():
+        statuses = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            else:
+                await asyncio.sleep(delay)
+
+        await handler(dict(scope), receive, send)
+        return statuses[0]
+
+    async def serve_all():
+        return await asyncio.gather(*(serve() for _ in range(clients)))
+
+    return asyncio.run(serve_all())
@@ -0,0 +1,39 @@
+"""Time and peak memory of the JSON Lines export at growing sizes.
+
+The peak of Python allocations, traced with `tracemalloc`, is stored with the
+results. It should stay about the same however many rows are exported.
+"""
+import tracemalloc
+
+import pytest
+
+from apps.forum.exporters import export_chunks
+from apps.forum.seeding import ForumSeeder
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("replies", [2000, 20000])
+def test_export(measure, replies, compress):
+    ForumSeeder(users=50, categories=5, posts=replies // 20, replies=replies).run()
+    tracemalloc.start()
+    try:
+        size = export(compress)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    measure(
+        f"export {replies} replies{' gzipped' if compress else ''}",
+        lambda: export(compress),
+        rounds=3,
+        replies=replies,
+        compress=compress,
+        bytes=size,
+        peak_memory=peak,
+    )
+
+
+def export(compress):
+    return sum(len(chunk) for chunk in export_chunks(compress=compress))
@@ -0,0 +1,85 @@
+import datetime
+import itertools
+
+import pytest
+
+from apps.forum.models import Post, Reply
+from apps.forum.rendering import compile_cache
+from apps.forum.seeding import ForumSeeder
+from apps.forum.tests.factories import CategoryFactory, PostFactory
+from apps.users.tests.factories import UserFactory
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+PARAGRAPH = "Some *markdown* with a [link](https://example.com) and `code`.\n\n"
+
+
+@pytest.fixture()
+def post():
+    return PostFactory.create()
+
+
+@pytest.mark.parametrize("length", [100, 1000, 10000])
+def test_save_compiles_markdown(post, measure, length):
+    markdown = (PARAGRAPH * (length // len(PARAGRAPH) + 1))[:length]
+    numbers = itertools.count()
+
+    def save_new_markdown():
+        post.markdown = f"{next(numbers)} {markdown}"
+        post.save()
+
+    def save_cached_markdown():
+        post.markdown = markdown if post.markdown != markdown else f"{markdown} "
+        post.save()
+
+    compile_cache.clear()
+    measure("save post, markdown compiled", save_new_markdown, length=length)
+    measure("save post, markdown cached", save_cached_markdown, length=length)
+
+
+@pytest.mark.parametrize("same_title_posts", [0, 100, 1000])
+def test_create_post(measure, same_title_posts):
+    created_at = datetime.datetime(2022, 12, 30, tzinfo=datetime.timezone.utc)
+    category, author = CategoryFactory.create(), UserFactory.create()
+    fields = {
+        "title": "Hello world",
+        "markdown": PARAGRAPH,
+        "created_at": created_at,
+        "category": category,
+        "author": author,
+    }
+    Post.objects.bulk_create(
+        Post(slug=f"30-12-2022-hello-world-{number + 2}", **fields)
+        for number in range(same_title_posts)
+    )
+
+    measure(
+        "create post",
+        lambda: Post.objects.create(**fields),
+        same_title_posts=same_title_posts,
+    )
+
+
+@pytest.fixture(params=[100, 1000, 10000], ids=lambda replies: f"{replies} replies")
+def thread(request):
+    ForumSeeder(users=10, categories=1, posts=1, replies=request.param).run()
+    return Post.objects.get(), request.param
+
+
+def test_load_thread(thread, measure):
+    post, replies = thread
+
+    measure("load reply tree", lambda: Reply.objects.get_thread(post), replies=replies)
+
+
+def test_replies_amount(thread, measure):
+    post, replies = thread
+    thread_replies = list(Reply.objects.thread(post))
+
+    result = measure(
+        "replies_amount of all replies",
+        lambda: sum(reply.replies_amount for reply in thread_replies),
+        replies=replies,
+    )
+
+    assert result["queries"] == 0
@@ -0,0 +1,69 @@
+import os
+import random
+
+import pytest
+from django.db import connection
+from django.db.models import Q
+
+from apps.forum.models import Post
+from apps.forum.search import POST_SEARCH_VECTOR, search_posts
+from apps.forum.tests.factories import CategoryFactory
+from apps.users.tests.factories import UserFactory
+
+POSTS = int(os.environ.get("BENCHMARK_POSTS", 20000))
+WORDS = [
+    "apple",
+    "river",
+    "stone",
+    "cloud",
+    "forest",
+    "quiet",
+    "paper",
+    "light",
+    "metal",
+    "green",
+]
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+
+@pytest.fixture()
+def _posts():
+    """Create posts of random words, one in a hundred mentions dragons."""
+    rng = random.Random(0)  # noqa: DUO102, seeded for the same posts on every run
+    category, author = CategoryFactory.create(), UserFactory.create()
+    posts = []
+    for number in range(POSTS):
+        words = rng.choices(WORDS, k=60)
+        if number % 100 == 0:
+            words[rng.randrange(len(words))] = "dragons"
+        posts.append(
+            Post(
+                title=" ".join(rng.choices(WORDS, k=4)).capitalize(),
+                markdown=" ".join(words),
+                slug=f"benchmark-{number}",
+                category=category,
+                author=author,
+            )
+        )
+    Post.objects.bulk_create(posts, batch_size=1000)
+    Post.objects.update(search_vector=POST_SEARCH_VECTOR)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE forum_post")
+
+
+@pytest.mark.usefixtures("_posts")
+def test_search(measure):
+    def icontains():
+        queryset = Post.objects.filter(
+            Q(title__icontains="dragon") | Q(markdown__icontains="dragon")
+        )
+        return list(queryset.order_by("-created_at", "-id")[:25])
+
+    def full_text():
+        queryset = search_posts(Post.objects.all(), "dragon")
+        return list(queryset.order_by("-rank", "-id")[:25])
+
+    assert len(icontains()) == len(full_text()) == 25
+    measure("search icontains", icontains, posts=POSTS)
+    measure("search full text", full_text, posts=POSTS)
@@ -0,0 +1,54 @@
+import datetime
+import os
+
+import pytest
+
+from apps.forum.models import Post
+from apps.forum.slugs import allocate_slug, build_slug, with_suffix
+from apps.forum.tests.factories import CategoryFactory
+from apps.users.tests.factories import UserFactory
+
+POSTS = int(os.environ.get("BENCHMARK_SAME_TITLE_POSTS", 500))
+CREATED_AT = datetime.datetime(2022, 12, 30, tzinfo=datetime.timezone.utc)
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+
+@pytest.fixture()
+def posts():
+    """Create posts with the same title on the same day."""
+    category, author = CategoryFactory.create(), UserFactory.create()
+    slug = build_slug(CREATED_AT, "Hello world", 50)
+    Post.objects.bulk_create(
+        Post(
+            title="Hello world",
+            markdown="Hello",
+            slug=with_suffix(slug, number, 50) if number > 1 else slug,
+            created_at=CREATED_AT,
+            category=category,
+            author=author,
+        )
+        for number in range(1, POSTS + 1)
+    )
+    return Post(title="Hello world", created_at=CREATED_AT)
+
+
+def test_slug(posts, measure, monkeypatch):
+    field = Post._meta.get_field("slug")
+    # AutoSlugField gives up after 100 probes by default.
+    monkeypatch.setattr(field, "max_unique_query_attempts", POSTS + 2)
+
+    def auto_slug_field():
+        posts.slug = ""
+        return field.create_slug(posts, add=True)
+
+    def allocator():
+        slug = build_slug(CREATED_AT, posts.title, 50)
+        return allocate_slug(Post.objects.all(), "slug", slug, 50)
+
+    for name, allocate in [
+        ("AutoSlugField", auto_slug_field),
+        ("allocator", allocator),
+    ]:
+        assert allocate() == f"30-12-2022-hello-world-{POSTS + 1}"
+        measure(f"slug {name}", allocate, same_title_posts=POSTS)
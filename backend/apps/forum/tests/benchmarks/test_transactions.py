@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.forum.models import Post
+from apps.forum.seeding import ForumSeeder
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+POLICY_MIDDLEWARE = "apps.core.transactions.TransactionPolicyMiddleware"
+
+
+@pytest.fixture()
+def post():
+    ForumSeeder(users=10, categories=1, posts=1, replies=100).run()
+    return Post.objects.get()
+
+
+@pytest.fixture(params=["ATOMIC_REQUESTS", "transaction policy"])
+def api_client(request, settings, monkeypatch):
+    """Return a client of a stack with one of the two ways of wrapping views.
+
+    Within the transaction of the test, transactions of requests are savepoints,
+    which cost the same round trips as BEGIN and COMMIT.
+    """
+    if request.param == "ATOMIC_REQUESTS":
+        monkeypatch.setitem(connection.settings_dict, "ATOMIC_REQUESTS", True)
+        settings.MIDDLEWARE = [
+            middleware
+            for middleware in settings.MIDDLEWARE
+            if middleware != POLICY_MIDDLEWARE
+        ]
+    client = APIClient()
+    client.wrapping = request.param
+    return client
+
+
+@pytest.mark.parametrize(
+    "view", ["forum:post-detail", "forum:post-replies"], ids=["detail", "replies"]
+)
+def test_read_requests(api_client, post, measure, view):
+    url = reverse(view, args=[post.pk])
+    api_client.get(url)
+
+    measure(f"GET {view}", lambda: api_client.get(url), wrapping=api_client.wrapping)
+    etag = api_client.get(url)["ETag"]
+    measure(
+        f"GET {view}, not modified",
+        lambda: api_client.get(url, HTTP_IF_NONE_MATCH=etag),
+        wrapping=api_client.wrapping,
+    )
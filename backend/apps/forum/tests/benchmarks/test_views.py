@@ -0,0 +1,61 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.forum.models import Category, Post, Reply
+from apps.forum.pagination import KeysetPagination
+from apps.forum.seeding import ForumSeeder
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db()]
+
+
+@pytest.fixture(params=[1000, 10000, 100000], ids=lambda rows: f"{rows} rows")
+def forum(request):
+    """Create one category with the rows as posts and one post with them as replies."""
+    ForumSeeder(users=10, categories=1, posts=request.param, replies=0).run()
+    ForumSeeder(users=0, categories=0, posts=1, replies=request.param, seed=1).run()
+    return request.param
+
+
+def test_list_posts(forum, measure):
+    client = APIClient()
+    category = Category.objects.get()
+    url = reverse("forum:category-posts", args=[category.pk])
+    cursor = deep_cursor(("-created_at", "-id"), category.posts.all())
+
+    measure("list posts, first page", lambda: client.get(url), rows=forum)
+    measure(
+        "list posts, deep page",
+        lambda: client.get(url, {"cursor": cursor}),
+        rows=forum,
+    )
+    measure(
+        "list posts, estimated count",
+        lambda: client.get(url, {"count": "true"}),
+        rows=forum,
+    )
+
+
+def test_list_replies(forum, measure):
+    client = APIClient()
+    post = Post.objects.order_by("-replies_count").first()
+    url = reverse("forum:post-replies", args=[post.pk])
+    cursor = deep_cursor(("created_at", "id"), Reply.objects.filter(post=post))
+
+    measure("list replies, first page", lambda: client.get(url), rows=forum)
+    measure(
+        "list replies, deep page",
+        lambda: client.get(url, {"cursor": cursor}),
+        rows=forum,
+    )
+
+
+def deep_cursor(view_ordering, queryset):
+    """Return the cursor of the second to last page."""
+    pagination = KeysetPagination()
+    pagination.ordering = view_ordering
+    reversed_ordering = [
+        field[1:] if field.startswith("-") else f"-{field}" for field in view_ordering
+    ]
+    last = queryset.order_by(*reversed_ordering)[pagination.page_size * 2]
+    return pagination.encode_cursor(last)
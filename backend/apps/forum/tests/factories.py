@@ -1,5 +1,14 @@
+from datetime import timezone
+
 import markdown2
-from factory import LazyAttribute, LazyFunction, Sequence, SubFactory
+from factory import (
+    LazyAttribute,
+    LazyFunction,
+    Maybe,
+    SelfAttribute,
+    Sequence,
+    SubFactory,
+)
 from factory.django import DjangoModelFactory
 from faker import Faker
 from mdgen import MarkdownPostProvider
@@ -33,11 +42,11 @@ class PostFactory(CompilableMarkdownBaseFactory):
         model = Post
 
     title = LazyFunction(lambda: faker.name())
-
-    slug = LazyFunction(lambda: faker.slug())
-    created_at = LazyFunction(lambda: faker.date_time())
+    created_at = LazyFunction(lambda: faker.date_time(tzinfo=timezone.utc))
     updated_at = LazyAttribute(
-        lambda obj: faker.date_time_between_dates(datetime_start=obj.created_at)
+        lambda obj: faker.date_time_between_dates(
+            datetime_start=obj.created_at, tzinfo=timezone.utc
+        )
     )
     category = SubFactory(CategoryFactory)
     author = SubFactory(UserFactory)
@@ -47,10 +56,16 @@ class ReplyFactory(CompilableMarkdownBaseFactory):
     class Meta:
         model = Reply
 
-    created_at = LazyFunction(lambda: faker.date_time())
+    created_at = LazyFunction(lambda: faker.date_time(tzinfo=timezone.utc))
     updated_at = LazyAttribute(
-        lambda obj: faker.date_time_between_dates(datetime_start=obj.created_at)
+        lambda obj: faker.date_time_between_dates(
+            datetime_start=obj.created_at, tzinfo=timezone.utc
+        )
     )
     parent = SubFactory("apps.forum.tests.factories.ReplyFactory", parent=None)
     author = SubFactory(UserFactory)
-    post = SubFactory(PostFactory)
+    post = Maybe(
+        "parent",
+        yes_declaration=SelfAttribute("parent.post"),
+        no_declaration=SubFactory(PostFactory),
+    )
@@ -0,0 +1,236 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.test import AsyncClient
+from django.urls import resolve, reverse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.forum import async_views
+from apps.forum.models import Reply
+from apps.forum.tests.factories import CategoryFactory, PostFactory, ReplyFactory
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture()
+def thread():
+    post = PostFactory.create()
+    root = ReplyFactory.create(post=post, parent=None)
+    ReplyFactory.create_batch(2, post=post, parent=root)
+    ReplyFactory.create(post=post, parent=None, markdown="*pending*")
+    Reply.objects.filter(markdown="*pending*").update(
+        compile_status=Reply.CompileStatus.PENDING
+    )
+    return post
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "forum:async-post-detail",
+        "forum:async-post-replies",
+        "forum:async-category-posts",
+    ],
+)
+def test_views_are_async(name):
+    view = resolve(reverse(name, args=[1])).func
+
+    assert asyncio.iscoroutinefunction(view)
+
+
+def test_list_view_without_queryset():
+    class View(async_views.AsyncListView):
+        async def get_etag(self):
+            return ""
+
+    with pytest.raises(TypeError, match="get_queryset"):
+        View()
+
+
+@pytest.mark.django_db()
+class TestPostDetailView:
+    def test_same_as_sync(self, thread):
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+
+        response = fetch(url)  # act
+
+        sync_response = APIClient().get(reverse("forum:post-detail", args=[thread.pk]))
+        same_response(response, sync_response)
+        assert len(json.loads(response.content)["replies"]) == 2
+
+    def test_cache_shared_with_sync(self, thread, django_assert_num_queries):
+        APIClient().get(reverse("forum:post-detail", args=[thread.pk]))
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+
+        with django_assert_num_queries(0):
+            response = fetch(url)  # act
+
+        assert response.status_code == 200
+
+    def test_not_modified(self, thread):
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+        etag = fetch(url)["ETag"]
+
+        response = fetch(url, **{"If-None-Match": etag})  # act
+
+        assert response.status_code == 304
+
+    def test_head(self, thread):
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+
+        response = fetch(url, method="head")  # act
+
+        assert response.status_code == 200
+        assert response.content == b""
+
+    def test_unknown_post(self):
+        response = fetch(reverse("forum:async-post-detail", args=[0]))  # act
+
+        assert response.status_code == 404
+        assert json.loads(response.content) == {"detail": "Not found."}
+
+    def test_method_not_allowed(self, thread):
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+
+        response = fetch(url, method="post")  # act
+
+        assert response.status_code == 405
+
+
+@pytest.mark.django_db()
+class TestPostReplyListView:
+    def test_same_as_sync(self, thread):
+        url = reverse("forum:async-post-replies", args=[thread.pk]) + "?page_size=2"
+
+        response = fetch(url)  # act
+
+        sync_url = reverse("forum:post-replies", args=[thread.pk]) + "?page_size=2"
+        same_response(response, APIClient().get(sync_url))
+        assert json.loads(response.content)["next"]
+
+    def test_pages(self, thread):
+        url = reverse("forum:async-post-replies", args=[thread.pk]) + "?page_size=3"
+        ids = []
+        while url:
+            data = json.loads(fetch(url).content)
+            ids += [reply["id"] for reply in data["results"]]
+            url = data["next"]
+
+        replies = Reply.objects.filter(post=thread).order_by("created_at", "id")
+        assert ids == [reply.pk for reply in replies]
+
+    def test_unknown_post(self):
+        response = fetch(reverse("forum:async-post-replies", args=[0]))  # act
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db()
+class TestCategoryPostListView:
+    def test_same_as_sync(self):
+        category = CategoryFactory.create()
+        PostFactory.create_batch(3, category=category)
+        params = "?page_size=2&count=true"
+        url = reverse("forum:async-category-posts", args=[category.pk]) + params
+
+        response = fetch(url)  # act
+
+        sync_url = reverse("forum:category-posts", args=[category.pk]) + params
+        same_response(response, APIClient().get(sync_url))
+        assert isinstance(json.loads(response.content)["count"], int)
+
+    def test_invalid_cursor(self):
+        category = CategoryFactory.create()
+        url = reverse("forum:async-category-posts", args=[category.pk])
+
+        response = fetch(url, data={"cursor": "not a cursor"})  # act
+
+        assert response.status_code == 404
+        assert json.loads(response.content) == {"detail": "Invalid cursor"}
+
+    def test_unknown_category(self):
+        response = fetch(reverse("forum:async-category-posts", args=[0]))  # act
+
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db()
+class TestRequestChecks:
+    def test_invalid_token_as_sync(self, thread, settings):
+        cookies = {settings.JWT_AUTH_COOKIE: "invalid"}
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+
+        response = fetch(url, cookies=cookies)  # act
+
+        sync_client = APIClient()
+        sync_client.cookies.load(cookies)
+        sync_url = reverse("forum:post-detail", args=[thread.pk])
+        same_response(response, sync_client.get(sync_url))
+        assert response.status_code == 403
+
+    def test_permissions(self, thread, user, monkeypatch):
+        monkeypatch.setattr(
+            async_views.PostDetailView, "permission_classes", [IsAuthenticated]
+        )
+        url = reverse("forum:async-post-detail", args=[thread.pk])
+        token = AccessToken.for_user(user)
+
+        anonymous = fetch(url)
+        response = fetch(url, cookies={settings.JWT_AUTH_COOKIE: str(token)})
+
+        assert anonymous.status_code == 403
+        assert response.status_code == 200
+
+    def test_throttles(self, thread, monkeypatch):
+        monkeypatch.setattr(
+            async_views.PostReplyListView, "throttle_classes", [DenyingThrottle]
+        )
+
+        response = fetch(reverse("forum:async-post-replies", args=[thread.pk]))
+
+        assert response.status_code == 429
+        assert response["Retry-After"] == "60"
+
+
+class DenyingThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 60
+
+
+def fetch(url, method="get", cookies=None, **extra):
+    """Make a request through Django's async handler and return the response.
+
+    The sync code of the request, the queries, runs in the test's thread, so it
+    sees the data of the test's transaction.
+    """
+
+    client = AsyncClient()
+    client.cookies.load(cookies or {})
+
+    async def request():
+        return await getattr(client, method)(url, **extra)
+
+    return async_to_sync(request)()
+
+
+def same_response(async_response, sync_response):
+    assert async_response.status_code == sync_response.status_code
+    assert async_response["Content-Type"] == sync_response["Content-Type"]
+    # Links of the next pages differ only by their path.
+    content = async_response.content.replace(b"/forum/async/", b"/forum/")
+    assert json.loads(content) == json.loads(sync_response.content)
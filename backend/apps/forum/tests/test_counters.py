@@ -0,0 +1,63 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from apps.forum.counters import reconcile_replies
+from apps.forum.models import Post, Reply
+from apps.forum.tests.factories import PostFactory, ReplyFactory
+
+
+@pytest.mark.django_db()
+class TestReconcileForumCounters:
+    @pytest.fixture()
+    def thread(self):
+        post = PostFactory.create()
+        root = ReplyFactory.create(post=post, parent=None)
+        child = ReplyFactory.create(post=post, parent=root)
+        ReplyFactory.create(post=post, parent=child)
+        return post, root, child
+
+    def test_repairs_drift(self, thread):
+        post, root, child = thread
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM forum_reply WHERE path LIKE %s", [f"{child.path}%"]
+            )
+        Reply.objects.filter(pk=root.pk).update(children_count=7)
+        Post.objects.filter(pk=post.pk).update(replies_count=0)
+
+        call_command("reconcile_forum_counters", chunk_size=1)  # act
+
+        root.refresh_from_db()
+        post.refresh_from_db()
+        assert (root.children_count, root.descendants_count) == (0, 0)
+        assert post.replies_count == 1
+        assert post.last_activity_at == max(post.created_at, root.created_at)
+
+    def test_output(self, thread, capsys):
+        post, root, _ = thread
+        Reply.objects.filter(pk=root.pk).update(descendants_count=0)
+
+        call_command("reconcile_forum_counters")  # act
+
+        output = capsys.readouterr().out
+        assert "replies: checked 3, repaired 1" in output
+        assert "posts: checked 1, repaired 0" in output
+
+    def test_queries_bounded(self, django_assert_num_queries):
+        post = PostFactory.create()
+        roots = ReplyFactory.create_batch(3, post=post, parent=None)
+        children = [ReplyFactory.create(post=post, parent=root) for root in roots * 2]
+        for child in children:
+            ReplyFactory.create(post=post, parent=child)
+        root = roots[0]
+        Reply.objects.filter(pk=root.pk).update(descendants_count=0)
+
+        # The chunk, its replies and children, one count per depth, the repair, the
+        # posts to invalidate and the end of the replies.
+        with django_assert_num_queries(9):
+            results = list(reconcile_replies())  # act
+
+        assert results == [(15, 1)]
+        root.refresh_from_db()
+        assert root.descendants_count == 4
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+import redis
+import redis.asyncio
+
+from apps.forum import events
+from apps.forum.events import MemoryEventBackend, RedisEventBackend, post_channel
+from apps.forum.tests.factories import PostFactory, ReplyFactory
+
+
+class RecordingBackend(MemoryEventBackend):
+    def __init__(self):
+        super().__init__()
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+
+
+class ListenRecordingBackend(MemoryEventBackend):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.calls = []
+
+    async def _listen(self, channel):
+        self.calls.append(("listen", channel))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise redis.ConnectionError
+
+    async def _unlisten(self, channel):
+        self.calls.append(("unlisten", channel))
+
+
+@pytest.fixture()
+def _fake_redis(monkeypatch):
+    """Make `RedisEventBackend` connect to one in-memory Redis server."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server)
+    )
+    monkeypatch.setattr(
+        redis.asyncio.Redis,
+        "from_url",
+        lambda url: fakeredis.aioredis.FakeRedis(server=server),
+    )
+
+
+def test_backend_without_publish():
+    class Backend(events.EventBackend):
+        pass
+
+    with pytest.raises(TypeError, match="publish"):
+        Backend()
+
+
+class TestMemoryEventBackend:
+    def test_fan_out(self):
+        backend = MemoryEventBackend()
+
+        async def receive():
+            async with backend.subscribe("a") as first:
+                async with backend.subscribe("a") as second:
+                    publish_in_thread(backend, "b", "other")
+                    publish_in_thread(backend, "a", "message")  # act
+                    return await first.get(), await second.get()
+
+        assert asyncio.run(receive()) == ("message", "message")
+
+    def test_unsubscribe(self):
+        backend = MemoryEventBackend()
+
+        async def subscribe():
+            async with backend.subscribe("a"):
+                assert backend._subscriptions["a"]
+
+        asyncio.run(subscribe())  # act
+
+        assert not backend._subscriptions
+        backend.publish("a", "message")
+
+    def test_slow_subscription_ended(self, settings):
+        settings.FORUM_EVENTS_QUEUE_SIZE = 2
+        backend = MemoryEventBackend()
+
+        async def receive():
+            async with backend.subscribe("a") as subscription:
+                for number in range(3):
+                    backend.publish("a", str(number))  # act
+                return await subscription.get()
+
+        assert asyncio.run(receive()) is None
+
+    def test_failed_listen_ends_waiting_subscriptions(self):
+        backend = ListenRecordingBackend(fail=True)
+
+        async def subscribe():
+            async def first():
+                async with backend.subscribe("a"):
+                    pass
+
+            task = asyncio.ensure_future(first())
+            await asyncio.sleep(0)
+            async with backend.subscribe("a") as second:
+                message = await asyncio.wait_for(second.get(), timeout=5)  # act
+            with pytest.raises(redis.ConnectionError):
+                await task
+            return message
+
+        assert asyncio.run(subscribe()) is None
+        assert not backend._subscriptions
+        assert backend.calls == [("listen", "a")]
+
+    def test_listens_again_after_end_all(self):
+        backend = ListenRecordingBackend()
+
+        async def subscribe():
+            async with backend.subscribe("a") as first:
+                backend._end_all()  # act
+                assert await asyncio.wait_for(first.get(), timeout=5) is None
+                async with backend.subscribe("a"):
+                    pass
+
+        asyncio.run(subscribe())
+
+        assert not backend._subscriptions
+        assert backend.calls == [("listen", "a"), ("listen", "a"), ("unlisten", "a")]
+
+
+@pytest.mark.usefixtures("_fake_redis")
+class TestRedisEventBackend:
+    def test_publish(self):
+        publisher = RedisEventBackend("redis://")
+        subscriber = RedisEventBackend("redis://")
+
+        async def receive():
+            async with subscriber.subscribe("a") as subscription:
+                publisher.publish("a", "message")  # act
+                return await asyncio.wait_for(subscription.get(), timeout=5)
+
+        assert asyncio.run(receive()) == "message"
+
+    def test_one_redis_subscription_per_channel(self):
+        backend = RedisEventBackend("redis://")
+
+        async def subscribe():
+            async with backend.subscribe("a"), backend.subscribe("a"):
+                return backend.client.pubsub_numsub("a")
+
+        assert dict(asyncio.run(subscribe()))[b"a"] == 1
+
+
+@pytest.mark.django_db()
+class TestPublishReplyEvent:
+    @pytest.fixture()
+    def backend(self, monkeypatch):
+        backend = RecordingBackend()
+        monkeypatch.setattr(events, "get_event_backend", lambda: backend)
+        return backend
+
+    def test_created_and_updated(self, backend, django_capture_on_commit_callbacks):
+        post = PostFactory.create()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            reply = ReplyFactory.create(post=post, parent=None)
+        with django_capture_on_commit_callbacks(execute=True):
+            reply.save()
+
+        (created_channel, created), (updated_channel, updated) = backend.published
+        assert created_channel == updated_channel == post_channel(post.pk)
+        assert created["event"] == "reply.created"
+        assert created["data"]["id"] == reply.pk
+        assert created["data"]["author"] == reply.author.username
+        assert updated["event"] == "reply.updated"
+
+    def test_published_on_commit(self, backend, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            ReplyFactory.create()
+
+        assert callbacks
+        assert backend.published == []
+
+    def test_failure_logged(
+        self, monkeypatch, django_capture_on_commit_callbacks, caplog
+    ):
+        def fail(channel, message):
+            raise redis.ConnectionError
+
+        backend = MemoryEventBackend()
+        monkeypatch.setattr(backend, "publish", fail)
+        monkeypatch.setattr(events, "get_event_backend", lambda: backend)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ReplyFactory.create()  # act
+
+        assert "Publishing reply.created" in caplog.text
+
+
+def publish_in_thread(backend, channel, message):
+    thread = threading.Thread(target=backend.publish, args=(channel, message))
+    thread.start()
+    thread.join()
@@ -0,0 +1,170 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.forum import exporters
+from apps.forum.exporters import export_chunks, export_lines, export_records
+from apps.forum.importers import ForumImporter
+from apps.forum.models import Post, Reply
+from apps.forum.tests.factories import CategoryFactory, PostFactory, ReplyFactory
+
+
+@pytest.fixture()
+def forum():
+    """Two categories, the first with a post with a thread of three replies."""
+    post = PostFactory.create()
+    other = PostFactory.create()
+    root = ReplyFactory.create(post=post, parent=None)
+    sibling = ReplyFactory.create(post=post, parent=None)
+    child = ReplyFactory.create(post=post, parent=root)
+    return post, other, [root, child, sibling]
+
+
+@pytest.mark.django_db()
+class TestExportRecords:
+    def test_records(self, forum):
+        post, other, replies = forum
+
+        records = list(export_records())  # act
+
+        assert [record["type"] for record in records] == [
+            "category",
+            "category",
+            "post",
+            "post",
+            "reply",
+            "reply",
+            "reply",
+        ]
+        assert records[0] == {
+            "type": "category",
+            "id": post.category_id,
+            "name": post.category.name,
+        }
+        assert records[2] == {
+            "type": "post",
+            "id": post.pk,
+            "category": post.category_id,
+            "author": post.author.username,
+            "title": post.title,
+            "markdown": post.markdown,
+            "created_at": post.created_at,
+        }
+        # Parents come before their children.
+        assert [record["id"] for record in records[4:]] == [
+            reply.pk for reply in replies
+        ]
+        assert records[5]["parent"] == replies[0].pk
+
+    def test_categories(self, forum):
+        post, other, _ = forum
+
+        records = list(export_records(category_pks=[other.category_id]))  # act
+
+        assert [(record["type"], record["id"]) for record in records] == [
+            ("category", other.category_id),
+            ("post", other.pk),
+        ]
+
+    def test_round_trip(self, forum):
+        post, _, _ = forum
+        records = read_lines(b"".join(export_chunks([post.category_id])))
+
+        ForumImporter("export").run(records)  # act
+
+        imported = Post.objects.exclude(pk__in=[post.pk, forum[1].pk]).get()
+        assert imported.markdown == post.markdown
+        assert imported.replies_count == 3
+        assert Reply.objects.filter(post=imported, parent__isnull=False).count() == 1
+
+
+def test_export_lines_in_blocks(monkeypatch):
+    monkeypatch.setattr(exporters, "BLOCK_SIZE", 20)
+    records = [{"id": number} for number in range(5)]
+
+    blocks = list(export_lines(records))  # act
+
+    assert 1 < len(blocks) < 5
+    assert read_lines(b"".join(blocks)) == records
+
+
+@pytest.mark.django_db()
+def test_export_compressed(forum):
+    content = b"".join(export_chunks(compress=True))  # act
+
+    assert gzip.decompress(content) == b"".join(export_chunks())
+
+
+@pytest.mark.django_db()
+class TestForumExportView:
+    @pytest.fixture()
+    def api_client(self, admin_user):
+        client = APIClient()
+        client.force_authenticate(admin_user)
+        return client
+
+    def test_export(self, api_client, forum):
+        response = api_client.get(reverse("forum:export"))  # act
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response["Content-Type"] == "application/jsonl"
+        assert len(read_lines(b"".join(response.streaming_content))) == 7
+
+    def test_gzip(self, api_client, forum):
+        response = api_client.get(
+            reverse("forum:export"),
+            {"category": forum[1].category_id},
+            HTTP_ACCEPT_ENCODING="gzip, deflate",
+        )  # act
+
+        assert response["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in response["Vary"]
+        content = gzip.decompress(b"".join(response.streaming_content))
+        assert len(read_lines(content)) == 2
+
+    def test_invalid_category(self, api_client):
+        response = api_client.get(reverse("forum:export"), {"category": "x"})
+
+        assert response.status_code == 400
+
+    def test_admins_only(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get(reverse("forum:export"))  # act
+
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db()
+class TestExportForumCommand:
+    def test_jsonl(self, forum, tmp_path, capsys):
+        path = tmp_path / "forum.jsonl"
+
+        call_command("export_forum", str(path), chunk_size=1)  # act
+
+        assert "Exported" in capsys.readouterr().out
+        assert len(read_lines(path.read_bytes())) == 7
+
+    def test_gzip(self, forum, tmp_path):
+        path = tmp_path / "forum.jsonl.gz"
+        category = CategoryFactory.create()
+
+        call_command("export_forum", str(path), categories=[category.pk])  # act
+
+        assert read_lines(gzip.decompress(path.read_bytes())) == [
+            {"type": "category", "id": category.pk, "name": category.name}
+        ]
+
+    def test_error(self, tmp_path):
+        with pytest.raises(CommandError, match="Export failed"):
+            call_command("export_forum", str(tmp_path / "missing" / "forum.jsonl"))
+
+
+def read_lines(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
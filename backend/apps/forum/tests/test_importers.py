@@ -0,0 +1,150 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from apps.forum.importers import ForumImporter, ForumImportError
+from apps.forum.models import Category, ImportedRecord, Post, Reply
+
+RECORDS = [
+    {"type": "category", "id": 1, "name": "books"},
+    {
+        "type": "post",
+        "id": 1,
+        "category": 1,
+        "author": "jane",
+        "title": "hello",
+        "markdown": "**boom!**",
+        "created_at": "1996-03-20T07:46:39+00:00",
+    },
+    {
+        "type": "post",
+        "id": 2,
+        "category": 1,
+        "author": "jane",
+        "title": "hello",
+        "markdown": "*boom!*",
+        "created_at": "1996-03-20T08:00:00",
+    },
+    {"type": "reply", "id": 1, "post": 1, "parent": None, "author": "jane"},
+    {"type": "reply", "id": 2, "post": 1, "parent": 1, "author": "jane"},
+    {"type": "reply", "id": 3, "post": 1, "parent": 2, "author": "jane"},
+    {"type": "reply", "id": 4, "post": 1, "parent": 1, "author": "jane"},
+]
+
+
+@pytest.fixture()
+def records(user):
+    user.username = "jane"
+    user.save()
+    return [
+        {"markdown": f"reply {record['id']}", **record}
+        if record["type"] == "reply"
+        else dict(record)
+        for record in RECORDS
+    ]
+
+
+@pytest.mark.django_db()
+class TestForumImporter:
+    def test_import(self, records):
+        imported = ForumImporter("old", batch_size=2).run(records)  # act
+
+        assert imported == {"category": 1, "post": 2, "reply": 4}
+        assert Category.objects.get().name == "Books"
+        first, second = Post.objects.order_by("pk")
+        assert first.title == "Hello"
+        assert first.compiled_html == "<p><strong>boom!</strong></p>\n"
+        assert (first.slug, second.slug) == (
+            "20-03-1996-hello",
+            "20-03-1996-hello-2",
+        )
+        assert first.created_at.isoformat() == "1996-03-20T07:46:39+00:00"
+        assert Post.objects.filter(search_vector="boom").count() == 2
+
+    def test_threads_and_counters(self, records):
+        ForumImporter("old", batch_size=2).run(records)
+
+        post = Post.objects.order_by("pk").first()
+        roots = Reply.objects.get_thread(post)
+        assert [reply.markdown for reply in roots] == ["reply 1"]
+        assert [reply.markdown for reply in roots[0].thread_children] == [
+            "reply 2",
+            "reply 4",
+        ]
+        assert roots[0].thread_children[0].thread_children[0].markdown == "reply 3"
+        assert (roots[0].children_count, roots[0].descendants_count) == (2, 3)
+        assert post.replies_count == 4
+
+    def test_resume(self, records):
+        with pytest.raises(ForumImportError, match="Unknown reply '9'"):
+            ForumImporter("old", batch_size=2).run(
+                [*records, {**records[-1], "id": 5, "parent": 9}]
+            )
+        assert Reply.objects.count() == 4
+
+        imported = ForumImporter("old").run(records)  # act
+
+        assert imported == {}
+        assert ImportedRecord.objects.count() == 7
+        assert Post.objects.count() == 2
+
+    def test_parent_in_other_post(self, records):
+        records.append({**records[-1], "id": 5, "post": 2, "parent": 1})
+
+        with pytest.raises(ForumImportError, match="Reply '5' is not in the post"):
+            ForumImporter("old", batch_size=2).run(records)  # act
+
+        assert Reply.objects.count() == 4
+
+    def test_max_depth(self, records, monkeypatch):
+        monkeypatch.setattr(Reply, "MAX_DEPTH", 1)
+
+        with pytest.raises(ForumImportError, match="Reply '3' is nested too deep"):
+            ForumImporter("old").run(records)  # act
+
+        assert not Reply.objects.exists()
+
+    def test_unknown_author(self, records):
+        records[1]["author"] = "nobody"
+
+        with pytest.raises(ForumImportError, match="Unknown authors: nobody"):
+            ForumImporter("old").run(records)  # act
+
+    def test_process_pool(self, records):
+        ForumImporter("old", workers=1).run(records)  # act
+
+        assert Post.objects.filter(compiled_html="<p><em>boom!</em></p>\n").exists()
+
+
+@pytest.mark.django_db()
+class TestImportForumCommand:
+    def test_jsonl(self, records, tmp_path, capsys):
+        path = tmp_path / "forum.jsonl"
+        path.write_text("\n".join(json.dumps(record) for record in records))
+
+        call_command("import_forum", str(path), source="old")  # act
+
+        assert "Imported 1 category, 2 post, 4 reply" in capsys.readouterr().out
+        assert Reply.objects.count() == 4
+
+    def test_csv(self, records, tmp_path):
+        path = tmp_path / "forum.csv"
+        path.write_text(
+            "\n".join(
+                [
+                    "type,id,name,category,author,title,markdown,created_at",
+                    "category,1,books,,,,,",
+                    "post,1,,1,jane,hello,**boom!**,1996-03-20T07:46:39Z",
+                    "",
+                ]
+            )
+        )
+
+        call_command("import_forum", str(path), source="old")  # act
+
+        assert Post.objects.get().slug == "20-03-1996-hello"
+
+    def test_error(self, tmp_path):
+        with pytest.raises(CommandError, match="Import failed"):
+            call_command("import_forum", str(tmp_path / "missing.jsonl"), source="old")
@@ -4,8 +4,10 @@ from unittest import mock
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from apps.forum.models import Category, CompilableMarkdownBase, Post, Reply
+from apps.forum.models import Category, CompilableMarkdownBase, Post, Reply, path_step
 from apps.forum.tests.factories import CategoryFactory, PostFactory, ReplyFactory
 
 User = get_user_model()
@@ -116,9 +118,29 @@ class TestPostModel:
         assert post.slug != post2.slug
         assert post2.slug.endswith("-2")
 
+    def test_slug_queries_bounded(self, post, post2, django_assert_num_queries):
+        created_at = datetime.datetime(1996, 3, 20, tzinfo=datetime.timezone.utc)
+        PostFactory.create_batch(5, title="some title", created_at=created_at)
+        new_post = PostFactory.build(title="some title", created_at=created_at)
+        new_post.category.save()
+        new_post.author.save()
+
+        # Two slug queries and the insert.
+        with django_assert_num_queries(3):
+            new_post.save()  # act
+
+        assert new_post.slug == "20-03-1996-some-title-8"
+
     def test_str(self, post):
         assert str(post) == post.title  # act
 
+    def test_search_vector(self, post):
+        post.title = "dragons"
+        post.save(update_fields=["title"])
+
+        assert Post.objects.filter(search_vector="dragon").get() == post
+        assert not Post.objects.filter(search_vector="title").exists()
+
 
 @pytest.mark.django_db()
 class TestReplyModel:
@@ -155,13 +177,231 @@ class TestReplyModel:
         assert reply_models[0].has_parent is False
         assert reply_models[1].has_parent is True
 
+    def test_has_parent_without_query(self, reply_models, django_assert_num_queries):
+        reply = Reply.objects.get(pk=reply_models[1].pk)
+
+        with django_assert_num_queries(0):
+            assert reply.has_parent is True
+
+    def test_path(self, reply_models):
+        first_reply, second_reply = reply_models
+
+        assert len(first_reply.path) == Reply.PATH_STEP_LENGTH
+        assert second_reply.path.startswith(first_reply.path)
+        assert first_reply.depth == 0
+        assert second_reply.depth == 1
+
+    @pytest.fixture()
+    def thread(self):
+        post = PostFactory.create()
+        root = ReplyFactory.create(post=post, parent=None)
+        child = ReplyFactory.create(post=post, parent=root)
+        grandchild = ReplyFactory.create(post=post, parent=child)
+        sibling = ReplyFactory.create(post=post, parent=root)
+        other_root = ReplyFactory.create(post=post, parent=None)
+        return post, [root, child, grandchild, sibling, other_root]
+
+    def test_get_thread(self, thread, django_assert_num_queries):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        with django_assert_num_queries(1):
+            roots = Reply.objects.get_thread(post)  # act
+
+        assert roots == [root, other_root]
+        assert roots[0].thread_children == [child, sibling]
+        assert roots[0].thread_children[0].thread_children == [grandchild]
+        assert roots[1].thread_children == []
+
+    def test_get_subtree(self, thread, django_assert_num_queries):
+        _, (root, child, grandchild, sibling, _) = thread
+
+        with django_assert_num_queries(1):
+            subtree = Reply.objects.get_subtree(child)  # act
+
+        assert subtree == child
+        assert subtree.thread_children == [grandchild]
+        assert list(Reply.objects.subtree(root, include_self=False)) == [
+            child,
+            grandchild,
+            sibling,
+        ]
+
+    def test_move_subtree(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        child.parent = other_root
+        child.save()  # act
+
+        grandchild.refresh_from_db()
+        assert child.path.startswith(other_root.path)
+        assert grandchild.path.startswith(child.path)
+        assert grandchild.depth == 2
+        assert [reply.thread_children for reply in Reply.objects.get_thread(post)] == [
+            [sibling],
+            [child],
+        ]
+
+    def test_move_subtree_to_other_post(self, thread):
+        _, (root, child, grandchild, sibling, _) = thread
+        other_root = ReplyFactory.create(parent=None)
+
+        child.parent = other_root
+        child.save()  # act
+
+        assert list(Reply.objects.thread(other_root.post)) == [
+            other_root,
+            child,
+            grandchild,
+        ]
+        grandchild.refresh_from_db()
+        assert grandchild.path == child.path + path_step(grandchild.pk)
+
+    def test_move_below_itself(self, thread):
+        _, (root, child, grandchild, _, _) = thread
+        root.parent = grandchild
+
+        with pytest.raises(ValidationError, match="below itself"):
+            root.save()  # act
+
+        root.refresh_from_db()
+        assert root.parent is None
+
+    def test_max_depth(self, thread, monkeypatch):
+        _, (root, child, grandchild, sibling, other_root) = thread
+        monkeypatch.setattr(Reply, "MAX_DEPTH", 2)
+
+        with pytest.raises(ValidationError, match="at most 2 levels"):
+            ReplyFactory.create(parent=grandchild)
+        other_root.parent = sibling
+        other_root.save()
+        child.parent = other_root
+        with pytest.raises(ValidationError, match="at most 2 levels"):
+            child.save()  # act
+
+    def test_parent_path_read_from_database(self, thread):
+        _, (root, child, _, _, _) = thread
+        child.path = "stale"
+
+        reply = ReplyFactory.create(parent=child)  # act
+
+        assert reply.path.startswith(root.path + path_step(child.pk))
+
     def test_replies_amount(self, reply_models):
         assert reply_models[0].replies_amount == 1
         assert reply_models[1].replies_amount == 0
 
+    def test_replies_amount_without_query(
+        self, reply_models, django_assert_num_queries
+    ):
+        reply = Reply.objects.get(pk=reply_models[0].pk)
+
+        with django_assert_num_queries(0):
+            assert reply.replies_amount == 1
+
+    def test_counters(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        for reply in [post, root, child, other_root]:
+            reply.refresh_from_db()
+        assert post.replies_count == 5
+        assert post.last_activity_at == max(
+            reply.created_at for reply in [post, *thread[1]]
+        )
+        assert (root.children_count, root.descendants_count) == (2, 3)
+        assert (child.children_count, child.descendants_count) == (1, 1)
+        assert (other_root.children_count, other_root.descendants_count) == (0, 0)
+
+    def test_counters_after_delete(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        child.delete()  # act
+
+        for reply in [post, root]:
+            reply.refresh_from_db()
+        assert post.replies_count == 3
+        assert (root.children_count, root.descendants_count) == (1, 1)
+
+    def test_counters_after_move(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        child.parent = other_root
+        child.save()  # act
+
+        for reply in [root, other_root]:
+            reply.refresh_from_db()
+        assert (root.children_count, root.descendants_count) == (1, 1)
+        assert (other_root.children_count, other_root.descendants_count) == (1, 2)
+
+    def test_counters_after_move_to_other_post(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+        target = ReplyFactory.create(parent=None)
+
+        child.parent = target
+        child.save()  # act
+
+        for reply in [post, root, target, target.post]:
+            reply.refresh_from_db()
+        assert post.replies_count == 3
+        assert (root.children_count, root.descendants_count) == (1, 1)
+        assert target.post.replies_count == 3
+        assert target.post.last_activity_at >= grandchild.created_at
+        assert (target.children_count, target.descendants_count) == (1, 2)
+
+    def test_counters_after_author_delete(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        child.author.delete()  # act
+
+        for reply in [post, root]:
+            reply.refresh_from_db()
+        assert post.replies_count == 3
+        assert (root.children_count, root.descendants_count) == (1, 1)
+
+    def test_counters_after_queryset_delete(self, thread):
+        post, (root, child, grandchild, sibling, other_root) = thread
+
+        Reply.objects.filter(pk__in=[grandchild.pk, sibling.pk]).delete()  # act
+
+        for reply in [post, root, child]:
+            reply.refresh_from_db()
+        assert post.replies_count == 3
+        assert (root.children_count, root.descendants_count) == (1, 1)
+        assert (child.children_count, child.descendants_count) == (0, 0)
+
+    def test_post_delete_skips_counters(self, thread):
+        post, _ = thread
+
+        with CaptureQueriesContext(connection) as context:
+            post.delete()  # act
+
+        assert counter_updates(context) == []
+
+    def test_author_delete_groups_counters(self, thread):
+        post, (root, *_) = thread
+        author = ReplyFactory.create(post=post, parent=root).author
+        ReplyFactory.create_batch(2, post=post, parent=root, author=author)
+
+        with CaptureQueriesContext(connection) as context:
+            author.delete()  # act
+
+        # One update for the ancestors and one for the post, not two per reply.
+        assert len(counter_updates(context)) == 2
+        for reply in [post, root]:
+            reply.refresh_from_db()
+        assert post.replies_count == 5
+        assert (root.children_count, root.descendants_count) == (2, 3)
+
     def test_str(self, reply_models):
         assert str(reply_models[0]) == "Reply"
 
 
+def counter_updates(context):
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith(('UPDATE "forum_reply"', 'UPDATE "forum_post"'))
+    ]
+
+
 def get_field(model, field):
     return getattr(model, field).field
@@ -0,0 +1,115 @@
+from unittest import mock
+
+import pytest
+import redis
+from django.core.cache import cache
+
+from apps.forum.models import Post
+from apps.forum.rendering import CompileCache, compile_cache
+from apps.forum.tests.factories import PostFactory
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    cache.clear()
+    compile_cache.clear()
+    yield
+    compile_cache.clear()
+
+
+class TestCompileCache:
+    def test_compile(self):
+        assert compile_cache.compile("**boom!**") == "<p><strong>boom!</strong></p>\n"
+
+    def test_stats(self):
+        compile_cache.compile("**boom!**")
+        compile_cache.compile("**boom!**")
+
+        assert compile_cache.stats() == {
+            "hits": 1,
+            "shared_hits": 0,
+            "misses": 1,
+            "size": 1,
+        }
+
+    def test_shared_cache(self):
+        compile_cache.compile("**boom!**")
+        other_process_cache = CompileCache()
+
+        with mock.patch("apps.forum.rendering.render_markdown") as render_markdown:
+            html = other_process_cache.compile("**boom!**")  # act
+
+        render_markdown.assert_not_called()
+        assert html == "<p><strong>boom!</strong></p>\n"
+        assert other_process_cache.stats()["shared_hits"] == 1
+
+    def test_lru_eviction(self, settings):
+        settings.FORUM_MARKDOWN_CACHE_SIZE = 2
+        for markdown in ["a", "b", "a", "c"]:
+            compile_cache.compile(markdown)
+
+        assert compile_cache.stats()["size"] == 2
+        assert list(compile_cache._entries) == [
+            CompileCache.make_key("a"),
+            CompileCache.make_key("c"),
+        ]
+
+    def test_shared_cache_errors(self):
+        shared_cache = mock.Mock()
+        shared_cache.get.side_effect = redis.ConnectionError
+        shared_cache.set.side_effect = redis.ConnectionError
+
+        with mock.patch.object(
+            CompileCache, "shared_cache", new_callable=mock.PropertyMock
+        ) as property_mock:
+            property_mock.return_value = shared_cache
+            html = compile_cache.compile("**boom!**")  # act
+
+        assert html == "<p><strong>boom!</strong></p>\n"
+        assert compile_cache.stats()["misses"] == 1
+
+    def test_key_depends_on_renderer_version(self):
+        key = CompileCache.make_key("**boom!**")
+
+        with mock.patch("apps.forum.rendering.RENDERER_VERSION", "other"):
+            assert CompileCache.make_key("**boom!**") != key
+
+
+@pytest.mark.django_db()
+class TestCompileOnSave:
+    @pytest.fixture()
+    def post(self):
+        return PostFactory.create(markdown="**boom!**")
+
+    def test_title_change_skips_compile(self, post):
+        post = Post.objects.get(pk=post.pk)
+        post.title = "other title"
+
+        with mock.patch("apps.forum.models.compile_markdown") as compile_markdown:
+            post.save()  # act
+
+        compile_markdown.assert_not_called()
+        assert post.compiled_html == "<p><strong>boom!</strong></p>\n"
+
+    def test_markdown_change_compiles(self, post):
+        post = Post.objects.get(pk=post.pk)
+        post.markdown = "*boom!*"
+
+        post.save(update_fields=["markdown"])  # act
+
+        post.refresh_from_db()
+        assert post.compiled_html == "<p><em>boom!</em></p>\n"
+
+    def test_save_while_shared_cache_is_down(self, post):
+        post = Post.objects.get(pk=post.pk)
+        post.markdown = "*boom!*"
+
+        with mock.patch.object(
+            CompileCache, "shared_cache", new_callable=mock.PropertyMock
+        ) as property_mock:
+            property_mock.return_value.get.side_effect = redis.ConnectionError
+            property_mock.return_value.set.side_effect = redis.ConnectionError
+            post.save()  # act
+
+        post.refresh_from_db()
+        assert post.compiled_html == "<p><em>boom!</em></p>\n"
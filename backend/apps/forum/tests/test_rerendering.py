@@ -0,0 +1,61 @@
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+
+from apps.forum.models import Post, Reply
+from apps.forum.rendering import RENDERER_VERSION
+from apps.forum.tests.factories import PostFactory, ReplyFactory
+
+
+@pytest.mark.django_db()
+class TestRerenderMarkdownCommand:
+    @pytest.fixture()
+    def stale_posts(self):
+        posts = PostFactory.create_batch(3, markdown="**boom!**")
+        Post.objects.update(compiled_html="old", renderer_version="markdown2-old")
+        return posts
+
+    def test_rerender(self, stale_posts, capsys):
+        updated_at = {post.pk: post.updated_at for post in Post.objects.all()}
+
+        call_command("rerender_markdown", chunk_size=2)  # act
+
+        for post in Post.objects.all():
+            assert post.compiled_html == "<p><strong>boom!</strong></p>\n"
+            assert post.renderer_version == RENDERER_VERSION
+            assert post.updated_at == updated_at[post.pk]
+        output = capsys.readouterr().out
+        assert "post: re-rendered 3" in output
+        assert "reply: re-rendered 0" in output
+
+    def test_skips_current(self, stale_posts, capsys):
+        Post.objects.filter(pk=stale_posts[0].pk).update(
+            renderer_version=RENDERER_VERSION
+        )
+
+        call_command("rerender_markdown", models=["post"])  # act
+
+        assert Post.objects.get(pk=stale_posts[0].pk).compiled_html == "old"
+        assert "post: re-rendered 2" in capsys.readouterr().out
+
+    def test_celery(self, stale_posts):
+        ReplyFactory.create(markdown="*a*", parent=None)
+        Reply.objects.update(renderer_version="")
+
+        with mock.patch(
+            "apps.forum.management.commands.rerender_markdown.rerender_markdown_chunk.delay"
+        ) as delay:
+            call_command("rerender_markdown", celery=True, chunk_size=2)  # act
+
+        assert [call.args[0] for call in delay.call_args_list] == [
+            "forum.Post",
+            "forum.Post",
+            "forum.Reply",
+        ]
+        assert sum(len(call.args[1]) for call in delay.call_args_list) == 4
+
+    def test_process_pool(self, stale_posts):
+        call_command("rerender_markdown", workers=1)  # act
+
+        assert not Post.objects.filter(compiled_html="old").exists()
@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from apps.forum.counters import reconcile_posts, reconcile_replies
+from apps.forum.models import Category, Post, Reply
+from apps.forum.seeding import ForumSeeder, reply_tree
+
+User = get_user_model()
+
+
+def test_reply_tree():
+    rng = random.Random(0)  # noqa: DUO102, seeded tree
+
+    tree = reply_tree(rng, 200, fan_out=1.2, max_depth=3)  # act
+
+    assert len(tree) == 200
+    assert {depth for _, depth in tree} <= {0, 1, 2, 3}
+    for index, (parent, depth) in enumerate(tree):
+        if parent is None:
+            assert depth == 0
+        else:
+            assert parent < index
+            assert tree[parent][1] == depth - 1
+
+
+@pytest.mark.django_db()
+class TestForumSeeder:
+    @pytest.fixture()
+    def seeder(self):
+        return ForumSeeder(
+            users=5, categories=2, posts=7, replies=60, max_depth=3, batch_size=10
+        )
+
+    def test_run(self, seeder):
+        created = seeder.run()  # act
+
+        assert created == {"users": 5, "categories": 2, "posts": 7, "replies": 60}
+        assert User.objects.get(username="seed-0-0").check_password("lem")
+        assert Category.objects.count() == 2
+        assert Post.objects.filter(search_vector__isnull=False).count() == 7
+        assert max(reply.depth for reply in Reply.objects.all()) <= 3
+
+    def test_consistent_trees(self, seeder):
+        seeder.run()
+
+        repaired = sum(repaired for _, repaired in reconcile_replies())
+        repaired += sum(repaired for _, repaired in reconcile_posts())
+        assert repaired == 0
+        for reply in Reply.objects.select_related("parent"):
+            parent_path = reply.parent.path if reply.parent else ""
+            assert reply.path == parent_path + reply.path[-8:]
+            assert reply.created_at >= (reply.parent or reply.post).created_at
+
+    def test_deterministic(self, seeder):
+        seeder.run()
+        first = list(Post.objects.order_by("pk").values_list("title", "replies_count"))
+        Post.objects.all().delete()
+
+        ForumSeeder(users=0, categories=2, posts=7, replies=60, max_depth=3).run()
+
+        second = list(Post.objects.order_by("pk").values_list("title", "replies_count"))
+        assert first == second
+
+    def test_command(self, capsys):
+        call_command("seed_forum", users=2, categories=1, posts=3, replies=10)
+
+        assert "Created 2 users, 1 categories, 3 posts, 10 replies" in (
+            capsys.readouterr().out
+        )
+
+    def test_command_seed_exists(self):
+        call_command("seed_forum", users=1, posts=0, replies=0)
+
+        with pytest.raises(CommandError, match="Users of seed 0 already exist"):
+            call_command("seed_forum", users=1, posts=0, replies=0)
+
+    def test_command_max_depth(self):
+        with pytest.raises(CommandError, match="--max-depth"):
+            call_command("seed_forum", max_depth=Reply.MAX_DEPTH + 1)
@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from apps.forum.models import Post
+from apps.forum.slugs import allocate_slugs, build_slug, with_suffix
+from apps.forum.tests.factories import PostFactory
+
+
+def test_build_slug():
+    created_at = datetime.datetime(1996, 3, 20, tzinfo=datetime.timezone.utc)
+
+    assert build_slug(created_at, "Some  title!", 50) == "20-03-1996-some-title"
+    assert build_slug(created_at, "Some title", 15) == "20-03-1996-some"
+
+
+def test_with_suffix():
+    assert with_suffix("some-title", 2, 50) == "some-title-2"
+    assert with_suffix("some-title", 12, 10) == "some-ti-12"
+    assert with_suffix("some-title", 2, 7) == "some-2"
+
+
+@pytest.mark.django_db()
+class TestAllocateSlugs:
+    def test_free_slugs(self):
+        assert allocate_slugs(Post.objects.all(), "slug", ["a", "b"], 50) == ["a", "b"]
+
+    def test_duplicates_in_batch(self):
+        slugs = allocate_slugs(Post.objects.all(), "slug", ["a", "b", "a", "a"], 50)
+
+        assert slugs == ["a", "b", "a-2", "a-3"]
+
+    def test_after_highest_suffix(self, django_assert_num_queries):
+        for slug in ["title", "title-2", "title-7", "title-other", "titles-9"]:
+            PostFactory.create(slug=slug)
+
+        with django_assert_num_queries(2):
+            slugs = allocate_slugs(
+                Post.objects.all(), "slug", ["title", "title-other", "new"], 50
+            )
+
+        assert slugs == ["title-8", "title-other-2", "new"]
+
+    def test_free_slug_with_taken_suffixes(self):
+        PostFactory.create(slug="title-2")
+
+        assert allocate_slugs(Post.objects.all(), "slug", ["title"], 50) == ["title"]
+
+    def test_truncated(self):
+        slug = "a" * 20
+        PostFactory.create(slug=slug)
+        PostFactory.create(slug=with_suffix(slug, 9, 20))
+
+        slugs = allocate_slugs(Post.objects.all(), "slug", [slug, slug], 20)
+
+        assert slugs == [with_suffix(slug, 10, 20), with_suffix(slug, 11, 20)]
+        assert slugs[0] == "a" * 17 + "-10"
@@ -0,0 +1,186 @@
+import asyncio
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.urls import reverse
+
+from apps.forum import views
+from apps.forum.events import get_event_backend
+from apps.forum.streams import ReplyEventStream, format_event
+from apps.forum.tests.factories import PostFactory, ReplyFactory
+from apps.forum.tests.test_async_views import DenyingThrottle
+
+
+@pytest.fixture(autouse=True)
+def _event_backend():
+    get_event_backend.cache_clear()
+    yield
+    get_event_backend.cache_clear()
+
+
+class StreamClient:
+    """An ASGI client of `ReplyEventStream` which stays connected until `close`."""
+
+    def __init__(self, path, method="GET", headers=()):
+        self.scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "headers": list(headers),
+        }
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.task = asyncio.ensure_future(
+            ReplyEventStream(self.application)(self.scope, self.receive, self.send)
+        )
+
+    @staticmethod
+    async def application(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"django"})
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        await self.messages.put(message)
+
+    async def next(self):
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+# Connections are closed by the stream, so data has to be committed.
+@pytest.mark.django_db(transaction=True)
+class TestReplyEventStream:
+    def test_reply_events(self):
+        post = PostFactory.create()
+
+        async def stream():
+            client = StreamClient(stream_path(post.pk))
+            start = await client.next()
+            reply = await sync_to_async(ReplyFactory.create)(post=post, parent=None)
+            event = await client.next()
+            await client.close()
+            return start, reply, event
+
+        start, reply, event = run(stream)  # act
+
+        assert start["status"] == 200
+        assert (b"content-type", b"text/event-stream") in start["headers"]
+        name, data = event["body"].decode().split("\n")[:2]
+        assert name == "event: reply.created"
+        assert json.loads(data.removeprefix("data: "))["id"] == reply.pk
+        assert event["more_body"]
+
+    def test_keepalive(self, settings):
+        settings.FORUM_EVENTS_KEEPALIVE = 0.01
+        post = PostFactory.create()
+
+        async def stream():
+            client = StreamClient(stream_path(post.pk))
+            await client.next()
+            keepalive = await client.next()
+            await client.close()
+            return keepalive
+
+        assert run(stream)["body"] == b": keepalive\n\n"
+
+    def test_ended_subscription_ends_stream(self):
+        post = PostFactory.create()
+
+        async def stream():
+            client = StreamClient(stream_path(post.pk))
+            await client.next()
+            get_event_backend()._end_all()
+            await asyncio.sleep(0)
+            end = await client.next()
+            await asyncio.wait_for(client.task, timeout=5)
+            return end
+
+        end = run(stream)  # act
+
+        assert end == {"type": "http.response.body", "body": b""}
+        assert not get_event_backend()._subscriptions
+
+    def test_unknown_post(self):
+        async def stream():
+            client = StreamClient(stream_path(0))
+            start, body = await client.next(), await client.next()
+            await client.task
+            return start, body
+
+        start, body = run(stream)  # act
+
+        assert start["status"] == 404
+        assert json.loads(body["body"]) == {"detail": "Not found."}
+
+    def test_method_not_allowed(self):
+        async def stream():
+            client = StreamClient(stream_path(1), method="POST")
+            return await client.next()
+
+        assert run(stream)["status"] == 405
+
+    def test_invalid_token(self, settings):
+        post = PostFactory.create()
+        cookie = f"{settings.JWT_AUTH_COOKIE}=invalid".encode()
+
+        async def stream():
+            client = StreamClient(stream_path(post.pk), headers=[(b"cookie", cookie)])
+            start, body = await client.next(), await client.next()
+            await client.task
+            return start, body
+
+        start, body = run(stream)  # act
+
+        assert start["status"] == 403
+        assert json.loads(body["body"])["code"] == "token_not_valid"
+
+    def test_throttled(self, monkeypatch):
+        monkeypatch.setattr(views.PostDetailView, "throttle_classes", [DenyingThrottle])
+        post = PostFactory.create()
+
+        async def stream():
+            client = StreamClient(stream_path(post.pk))
+            return await client.next()
+
+        start = run(stream)  # act
+
+        assert start["status"] == 429
+        assert (b"retry-after", b"60") in start["headers"]
+
+
+def test_other_paths_passed_on():
+    async def request():
+        client = StreamClient(reverse("forum:post-detail", args=[1]))
+        await client.next()
+        return await client.next()
+
+    assert run(request)["body"] == b"django"
+
+
+def test_not_found_under_wsgi(client):
+    response = client.get(stream_path(1))
+
+    assert response.status_code == 404
+
+
+def test_format_event():
+    message = json.dumps({"event": "reply.updated", "data": {"id": 1}})
+
+    assert format_event(message) == b'event: reply.updated\ndata: {"id":1}\n\n'
+
+
+def run(coroutine_function):
+    """Run the coroutine function from this thread, where the ORM's threads run."""
+    return async_to_sync(coroutine_function)()
+
+
+def stream_path(pk):
+    return reverse("forum:post-events", args=[pk])
@@ -0,0 +1,145 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from kombu.exceptions import OperationalError
+
+from apps.forum import events
+from apps.forum.models import Post
+from apps.forum.rendering import compile_cache
+from apps.forum.tasks import (
+    compile_pending_markdown,
+    requeue_pending_markdown,
+    schedule_compile,
+)
+from apps.forum.tests.factories import PostFactory, ReplyFactory
+
+
+@pytest.fixture(autouse=True)
+def _async_compile(settings):
+    settings.FORUM_MARKDOWN_ASYNC_MIN_LENGTH = 5
+    cache.clear()
+    compile_cache.clear()
+
+
+@pytest.mark.django_db()
+class TestAsyncCompile:
+    def test_short_markdown_compiled_on_save(self):
+        post = PostFactory.create(markdown="*a*")
+
+        assert post.compile_status == Post.CompileStatus.COMPILED
+        assert post.compiled_html == "<p><em>a</em></p>\n"
+
+    def test_pending_until_task_runs(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            post = PostFactory.create(markdown="**boom!**")
+
+        assert post.compile_status == Post.CompileStatus.PENDING
+        assert post.display_html == "<p>**boom!**</p>"
+        compile_callbacks = [
+            callback
+            for callback in callbacks
+            if getattr(callback, "func", None) is schedule_compile
+        ]
+        assert len(compile_callbacks) == 1
+
+        compile_callbacks[0]()  # act
+
+        post.refresh_from_db()
+        assert post.compile_status == Post.CompileStatus.COMPILED
+        assert post.display_html == "<p><strong>boom!</strong></p>\n"
+
+    def test_cached_markdown_compiled_on_save(self):
+        compile_cache.compile("**boom!**")
+
+        post = PostFactory.create(markdown="**boom!**")
+
+        assert post.compile_status == Post.CompileStatus.COMPILED
+
+    def test_display_html_escapes_pending_markdown(self):
+        post = PostFactory.build(markdown="<script>", compile_status="pending")
+
+        assert post.display_html == "<p>&lt;script&gt;</p>"
+
+    def test_rapid_edits_are_coalesced(self):
+        post = PostFactory.create(markdown="*a*")
+
+        with mock.patch.object(compile_pending_markdown, "delay") as delay:
+            schedule_compile(post)
+            schedule_compile(post)
+
+        delay.assert_called_once_with("forum.Post", post.pk)
+
+    def test_lock_released_when_queueing_fails(self):
+        post = PostFactory.create(markdown="*a*")
+
+        with mock.patch.object(
+            compile_pending_markdown, "delay", side_effect=OperationalError
+        ):
+            schedule_compile(post)
+        with mock.patch.object(compile_pending_markdown, "delay") as delay:
+            schedule_compile(post)  # act
+
+        delay.assert_called_once_with("forum.Post", post.pk)
+
+    def test_queueing_errors_logged(self, caplog):
+        post = PostFactory.create(markdown="*a*")
+
+        with mock.patch.object(
+            compile_pending_markdown, "delay", side_effect=OperationalError
+        ):
+            schedule_compile(post)  # act
+
+        assert "Queueing compilation of forum.Post" in caplog.text
+
+    def test_lost_tasks_requeued(self, django_capture_on_commit_callbacks):
+        with mock.patch.object(
+            compile_pending_markdown, "delay", side_effect=OperationalError
+        ), django_capture_on_commit_callbacks(execute=True):
+            post = PostFactory.create(markdown="**boom!**")
+            reply = ReplyFactory.create(markdown="**boom!**")
+        compiled = PostFactory.create(markdown="*a*")
+
+        with mock.patch.object(compile_pending_markdown, "delay") as delay:
+            requeue_pending_markdown()  # act
+
+        queued = {call.args for call in delay.call_args_list}
+        assert ("forum.Post", post.pk) in queued
+        assert ("forum.Reply", reply.pk) in queued
+        assert ("forum.Post", compiled.pk) not in queued
+
+    def test_task_compiles_latest_markdown(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            post = PostFactory.create(markdown="**boom!**")
+            post.markdown = "*latest*"
+            post.save()
+
+        post.refresh_from_db()
+        assert post.compile_status == Post.CompileStatus.COMPILED
+        assert post.compiled_html == "<p><em>latest</em></p>\n"
+
+    def test_task_skips_compiled(self):
+        post = PostFactory.create(markdown="*a*")
+        Post.objects.filter(pk=post.pk).update(compiled_html="kept")
+
+        compile_pending_markdown("forum.Post", post.pk)  # act
+
+        post.refresh_from_db()
+        assert post.compiled_html == "kept"
+
+    def test_task_publishes_compiled_reply(
+        self, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        backend = mock.Mock()
+        monkeypatch.setattr(events, "get_event_backend", lambda: backend)
+        with django_capture_on_commit_callbacks():
+            reply = ReplyFactory.create(markdown="**boom!**")
+        backend.reset_mock()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            compile_pending_markdown("forum.Reply", reply.pk)  # act
+
+        ((channel, message),) = [call.args for call in backend.publish.call_args_list]
+        assert channel == events.post_channel(reply.post_id)
+        assert '"event":"reply.updated"' in message
+        assert "<strong>boom!</strong>" in message
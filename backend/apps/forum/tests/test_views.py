@@ -0,0 +1,422 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+import redis
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import generics
+from rest_framework.test import APIClient
+
+from apps.forum.caching import PostDetailCache
+from apps.forum.conditional import ConditionalGetMixin
+from apps.forum.models import Post, Reply
+from apps.forum.tasks import rerender_markdown_chunk
+from apps.forum.tests.factories import CategoryFactory, PostFactory, ReplyFactory
+
+
+@pytest.fixture()
+def api_client():
+    return APIClient()
+
+
+@pytest.mark.django_db()
+class TestCategoryPostListView:
+    def test_pages_newest_first(self, api_client):
+        category = CategoryFactory.create()
+        created_at = datetime(2022, 12, 30, tzinfo=timezone.utc)
+        posts = [
+            PostFactory.create(
+                category=category, created_at=created_at + timedelta(hours=i // 2)
+            )
+            for i in range(7)
+        ]
+        PostFactory.create()
+        url = reverse("forum:category-posts", args=[category.pk]) + "?page_size=3"
+
+        ids, pages = collect_pages(api_client, url)  # act
+
+        expected = sorted(posts, key=lambda post: (post.created_at, post.pk))
+        assert ids == [post.pk for post in reversed(expected)]
+        assert pages == 3
+
+    def test_unknown_category(self, api_client):
+        response = api_client.get(reverse("forum:category-posts", args=[0]))
+
+        assert response.status_code == 404
+
+    def test_invalid_cursor(self, api_client):
+        category = CategoryFactory.create()
+        url = reverse("forum:category-posts", args=[category.pk])
+
+        response = api_client.get(url, {"cursor": "not a cursor"})
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            ["abc", 1],
+            [None, 1],
+            ["2022-01-01T00:00:00Z", "x"],
+            ["2022-01-01T00:00:00Z", [1]],
+            ["2022-01-01T00:00:00Z"],
+            {"created_at": "2022-01-01T00:00:00Z"},
+        ],
+    )
+    def test_malformed_cursor(self, api_client, values):
+        category = CategoryFactory.create()
+        url = reverse("forum:category-posts", args=[category.pk])
+        cursor = urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+        response = api_client.get(url, {"cursor": cursor})
+
+        assert response.status_code == 404
+        assert response.data["detail"] == "Invalid cursor"
+
+    def test_estimated_count(self, api_client):
+        category = CategoryFactory.create()
+        PostFactory.create(category=category)
+        url = reverse("forum:category-posts", args=[category.pk])
+
+        response = api_client.get(url, {"count": "true"})
+
+        assert isinstance(response.data["count"], int)
+        assert "count" not in api_client.get(url).data
+
+
+@pytest.mark.django_db()
+class TestPostReplyListView:
+    def test_pages_oldest_first(self, api_client):
+        post = PostFactory.create()
+        root = ReplyFactory.create(post=post, parent=None)
+        replies = [root] + ReplyFactory.create_batch(4, post=post, parent=root)
+        url = reverse("forum:post-replies", args=[post.pk]) + "?page_size=2"
+
+        ids, pages = collect_pages(api_client, url)  # act
+
+        expected = sorted(replies, key=lambda reply: (reply.created_at, reply.pk))
+        assert ids == [reply.pk for reply in expected]
+        assert pages == 3
+
+
+@pytest.mark.django_db()
+class TestPostSearchView:
+    @pytest.fixture()
+    def posts(self):
+        return {
+            "title": PostFactory.create(title="dragons", markdown="Nothing here."),
+            "content": PostFactory.create(
+                title="animals", markdown="A book about *dragons*."
+            ),
+            "other": PostFactory.create(title="wizards", markdown="Wands."),
+        }
+
+    def test_ranked(self, api_client, posts):
+        response = api_client.get(reverse("forum:post-search"), {"q": "dragon"})
+
+        assert response.status_code == 200
+        assert [item["id"] for item in response.data["results"]] == [
+            posts["title"].pk,
+            posts["content"].pk,
+        ]
+
+    def test_category(self, api_client, posts):
+        category = posts["content"].category.pk
+
+        response = api_client.get(
+            reverse("forum:post-search"), {"q": "dragons", "category": category}
+        )
+
+        assert [item["id"] for item in response.data["results"]] == [
+            posts["content"].pk
+        ]
+
+    def test_pages_equal_ranks(self, api_client):
+        posts = PostFactory.create_batch(5, title="dragons", markdown="Dragons.")
+        url = reverse("forum:post-search") + "?q=dragons&page_size=2"
+
+        ids, pages = collect_pages(api_client, url)  # act
+
+        assert ids == sorted((post.pk for post in posts), reverse=True)
+        assert pages == 3
+
+    def test_malformed_cursor(self, api_client):
+        cursor = urlsafe_b64encode(json.dumps(["high", 1]).encode()).decode()
+
+        response = api_client.get(
+            reverse("forum:post-search"), {"q": "dragons", "cursor": cursor}
+        )
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize("params", [{}, {"q": " "}, {"q": "a", "category": "x"}])
+    def test_invalid_params(self, api_client, params):
+        response = api_client.get(reverse("forum:post-search"), params)
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db()
+class TestPostDetailView:
+    @pytest.fixture()
+    def thread(self):
+        post = PostFactory.create()
+        root = ReplyFactory.create(post=post, parent=None)
+        ReplyFactory.create(post=post, parent=root)
+        return post, root
+
+    def test_reply_tree(self, api_client, thread):
+        post, root = thread
+
+        response = api_client.get(reverse("forum:post-detail", args=[post.pk]))
+
+        assert response.data["category_name"] == post.category.name
+        assert response.data["html"] == post.compiled_html
+        [root_data] = response.data["replies"]
+        assert root_data["id"] == root.pk
+        assert [child["depth"] for child in root_data["replies"]] == [1]
+
+    def test_max_depth(self, api_client):
+        parent = ReplyFactory.create(parent=None)
+        for _ in range(Reply.MAX_DEPTH):
+            parent = ReplyFactory.create(parent=parent)
+
+        response = api_client.get(reverse("forum:post-detail", args=[parent.post.pk]))
+
+        assert response.status_code == 200
+        reply = response.data["replies"][0]
+        while reply["replies"]:
+            [reply] = reply["replies"]
+        assert reply["id"] == parent.pk
+        assert reply["depth"] == Reply.MAX_DEPTH
+
+    def test_cache_hit_without_queries(
+        self, api_client, thread, django_assert_num_queries
+    ):
+        url = reverse("forum:post-detail", args=[thread[0].pk])
+        expected = api_client.get(url).data
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url)  # act
+
+        assert response.data == expected
+
+    def test_cache_errors(self, api_client, thread, django_capture_on_commit_callbacks):
+        post, root = thread
+        url = reverse("forum:post-detail", args=[post.pk])
+
+        with mock.patch.object(
+            PostDetailCache, "cache", new_callable=mock.PropertyMock
+        ) as property_mock:
+            failing_cache = property_mock.return_value
+            for method in ["get", "get_many", "add", "set", "incr"]:
+                getattr(failing_cache, method).side_effect = redis.ConnectionError
+            with django_capture_on_commit_callbacks(execute=True):
+                ReplyFactory.create(post=post, parent=root)
+            response = api_client.get(url)  # act
+
+        assert response.status_code == 200
+        assert response.data["replies_count"] == 3
+
+    def test_unknown_post(self, api_client):
+        response = api_client.get(reverse("forum:post-detail", args=[0]))
+
+        assert response.status_code == 404
+
+    def test_invalidated_by_reply(
+        self, api_client, thread, django_capture_on_commit_callbacks
+    ):
+        post, root = thread
+        url = reverse("forum:post-detail", args=[post.pk])
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ReplyFactory.create(post=post, parent=root)
+
+        response = api_client.get(url)
+        assert response.data["replies_count"] == 3
+        assert len(response.data["replies"][0]["replies"]) == 2
+
+    def test_invalidated_by_category(
+        self, api_client, thread, django_capture_on_commit_callbacks
+    ):
+        post, _ = thread
+        url = reverse("forum:post-detail", args=[post.pk])
+        api_client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post.category.name = "renamed"
+            post.category.save()
+
+        assert api_client.get(url).data["category_name"] == "Renamed"
+
+    def test_invalidated_by_rerender(
+        self, api_client, thread, django_capture_on_commit_callbacks
+    ):
+        post, root = thread
+        url = reverse("forum:post-detail", args=[post.pk])
+        api_client.get(url)
+        Reply.objects.filter(pk=root.pk).update(
+            markdown="**new**", renderer_version="old"
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            rerender_markdown_chunk(Reply._meta.label, [root.pk])
+
+        response = api_client.get(url)
+        assert response.data["replies"][0]["html"] == "<p><strong>new</strong></p>\n"
+
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        cache.clear()
+
+
+@pytest.mark.django_db()
+class TestConditionalGet:
+    @pytest.fixture()
+    def thread(self):
+        post = PostFactory.create()
+        root = ReplyFactory.create(post=post, parent=None)
+        ReplyFactory.create(post=post, parent=root)
+        return post, root
+
+    @pytest.fixture(params=["post-detail", "post-replies", "category-posts"])
+    def url(self, request, thread):
+        post, _ = thread
+        pk = post.category.pk if request.param == "category-posts" else post.pk
+        return reverse(f"forum:{request.param}", args=[pk])
+
+    def test_etag(self, api_client, url):
+        response = api_client.get(url)
+
+        assert response.status_code == 200
+        assert response.headers["ETag"]
+        assert "Last-Modified" not in response.headers
+
+    def test_not_modified(self, api_client, url):
+        response = api_client.get(url)
+
+        etag_response = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert etag_response.status_code == 304
+        assert etag_response["ETag"] == response["ETag"]
+
+    def test_modified_by_deleted_latest_reply(
+        self, api_client, thread, url, django_capture_on_commit_callbacks
+    ):
+        post, root = thread
+        with django_capture_on_commit_callbacks(execute=True):
+            latest = ReplyFactory.create(post=post, parent=root)
+        etag = api_client.get(url)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            latest.delete()
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_modified_by_reply(
+        self, api_client, thread, url, django_capture_on_commit_callbacks
+    ):
+        post, root = thread
+        etag = api_client.get(url)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            ReplyFactory.create(post=post, parent=root)
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_modified_by_delete(
+        self, api_client, thread, url, django_capture_on_commit_callbacks
+    ):
+        _, root = thread
+        etag = api_client.get(url)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Reply.objects.get(parent=root).delete()
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_category_modified_by_moved_post(
+        self, api_client, thread, django_capture_on_commit_callbacks
+    ):
+        post, _ = thread
+        url = reverse("forum:category-posts", args=[post.category.pk])
+        etag = api_client.get(url)["ETag"]
+        post = Post.objects.get(pk=post.pk)
+        post.category = CategoryFactory.create()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post.save()
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+        assert api_client.get(url).data["results"] == []
+
+    def test_modified_by_compile(
+        self, api_client, thread, django_capture_on_commit_callbacks
+    ):
+        post, root = thread
+        url = reverse("forum:post-replies", args=[post.pk])
+        etag = api_client.get(url)["ETag"]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Reply.objects.filter(pk=root.pk).update(renderer_version="")
+            rerender_markdown_chunk("forum.Reply", [root.pk])
+
+        assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_per_page(self, api_client, thread):
+        post, _ = thread
+        url = reverse("forum:post-replies", args=[post.pk])
+
+        first_page = api_client.get(url, {"page_size": 1})
+        second_page = api_client.get(first_page.data["next"])
+
+        assert first_page["ETag"] != second_page["ETag"]
+
+    def test_not_modified_without_queries(
+        self, api_client, thread, django_assert_num_queries
+    ):
+        url = reverse("forum:post-detail", args=[thread[0].pk])
+        etag = api_client.get(url)["ETag"]
+
+        with django_assert_num_queries(0):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)  # act
+
+        assert response.status_code == 304
+
+    def test_not_modified_with_one_query(
+        self, api_client, thread, django_assert_num_queries
+    ):
+        url = reverse("forum:post-replies", args=[thread[0].pk])
+        etag = api_client.get(url)["ETag"]
+
+        with django_assert_num_queries(1):
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)  # act
+
+        assert response.status_code == 304
+
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        cache.clear()
+
+
+def test_conditional_view_without_etag():
+    class View(ConditionalGetMixin, generics.ListAPIView):
+        pass
+
+    with pytest.raises(TypeError, match="get_etag"):
+        View()
+
+
+def collect_pages(client, url):
+    ids, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [item["id"] for item in response.data["results"]]
+        url = response.data["next"]
+        pages += 1
+    return ids, pages
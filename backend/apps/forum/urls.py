@@ -1,3 +1,38 @@
-# from django.urls import path
+from django.urls import path
 
-urlpatterns = []
+from apps.forum import async_views, streams, views
+
+app_name = "forum"
+urlpatterns = [
+    path("export/", views.ForumExportView.as_view(), name="export"),
+    path("posts/search/", views.PostSearchView.as_view(), name="post-search"),
+    path(
+        "categories/<int:category_pk>/posts/",
+        views.CategoryPostListView.as_view(),
+        name="category-posts",
+    ),
+    path("posts/<int:pk>/", views.PostDetailView.as_view(), name="post-detail"),
+    path(
+        "posts/<int:post_pk>/replies/",
+        views.PostReplyListView.as_view(),
+        name="post-replies",
+    ),
+    # Answered by apps.forum.streams.ReplyEventStream under config.asgi.
+    path("posts/<int:pk>/events/", streams.post_events, name="post-events"),
+    # Async variants of the read endpoints, for deployments on config.asgi.
+    path(
+        "async/categories/<int:category_pk>/posts/",
+        async_views.CategoryPostListView.as_view(),
+        name="async-category-posts",
+    ),
+    path(
+        "async/posts/<int:pk>/",
+        async_views.PostDetailView.as_view(),
+        name="async-post-detail",
+    ),
+    path(
+        "async/posts/<int:post_pk>/replies/",
+        async_views.PostReplyListView.as_view(),
+        name="async-post-replies",
+    ),
+]
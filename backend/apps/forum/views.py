@@ -1 +1,150 @@
-# Create your views here.
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.forum.caching import post_detail_cache
+from apps.forum.conditional import (
+    ConditionalGetMixin,
+    category_etag,
+    make_etag,
+    post_etag,
+)
+from apps.forum.exporters import export_chunks
+from apps.forum.models import Post, Reply
+from apps.forum.pagination import KeysetPagination
+from apps.forum.search import search_posts
+from apps.forum.serializers import (
+    PostDetailSerializer,
+    PostSearchSerializer,
+    PostSerializer,
+    ReplySerializer,
+)
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def make_detail_entry(data):
+    """Return the entry of `post_detail_cache` of the serialized post."""
+    content = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return {"data": data, "etag": make_etag(content)}
+
+
+class CategoryPostListView(ConditionalGetMixin, generics.ListAPIView):
+    """List the posts of a category, newest first."""
+
+    serializer_class = PostSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [AllowAny]
+    ordering = ("-created_at", "-id")
+
+    def get_etag(self):
+        return category_etag(self.kwargs["category_pk"])
+
+    def get_queryset(self):
+        # The category is known to exist, `get_etag` answers 404 otherwise.
+        return Post.objects.filter(
+            category_id=self.kwargs["category_pk"]
+        ).select_related("author")
+
+
+class PostDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """Retrieve a post with its whole reply tree, through `post_detail_cache`.
+
+    The entity tag is cached together with the serialized post, it is a hash of
+    its content. A cache hit does not touch the database at all.
+    """
+
+    serializer_class = PostDetailSerializer
+    permission_classes = [AllowAny]
+    queryset = Post.objects.select_related("author", "category")
+
+    def get_etag(self):
+        self.entry = post_detail_cache.get_or_build(self.kwargs["pk"], self.build_entry)
+        return self.entry["etag"]
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.entry["data"])
+
+    def build_entry(self):
+        return make_detail_entry(self.get_serializer(self.get_object()).data)
+
+
+class PostReplyListView(ConditionalGetMixin, generics.ListAPIView):
+    """List all replies of a post in the order they were written."""
+
+    serializer_class = ReplySerializer
+    pagination_class = KeysetPagination
+    permission_classes = [AllowAny]
+    ordering = ("created_at", "id")
+
+    def get_etag(self):
+        return post_etag(self.kwargs["post_pk"])
+
+    def get_queryset(self):
+        # The post is known to exist, `get_etag` answers 404 otherwise.
+        return Reply.objects.filter(post_id=self.kwargs["post_pk"]).select_related(
+            "author"
+        )
+
+
+class PostSearchView(generics.ListAPIView):
+    """Search posts by their title and content, best matches first.
+
+    Takes the search text in `q` and optionally a category primary key in
+    `category`.
+    """
+
+    serializer_class = PostSearchSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [AllowAny]
+    ordering = ("-rank", "-id")
+
+    def get_queryset(self):
+        text = self.request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": "This query parameter is required."})
+        queryset = Post.objects.select_related("author")
+        category = self.request.query_params.get("category")
+        if category is not None:
+            if not category.isdigit():
+                raise ValidationError({"category": "A valid integer is required."})
+            queryset = queryset.filter(category_id=category)
+        return search_posts(queryset, text)
+
+
+class ForumExportView(APIView):
+    """Stream categories, posts and replies as JSON Lines, for admins only.
+
+    Exports all categories, or those of the primary keys in `category`, which can
+    be repeated. The body is gzipped on the fly when the client accepts it. Rows
+    are read while the response streams, which needs the WSGI handler, Django 4.1
+    cannot iterate a streaming response with database queries under ASGI.
+    `config.asgi` serves it with the WSGI handler, see `apps.core.asgi.WSGIViews`.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        categories = request.query_params.getlist("category")
+        if not all(category.isdigit() for category in categories):
+            raise ValidationError({"category": "A valid integer is required."})
+        compress = bool(
+            ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        )
+        response = StreamingHttpResponse(
+            export_chunks([int(pk) for pk in categories] or None, compress=compress),
+            content_type="application/jsonl",
+        )
+        response["Content-Disposition"] = 'attachment; filename="forum.jsonl"'
+        if compress:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ["Accept-Encoding"])
+        return response
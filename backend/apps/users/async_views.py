@@ -0,0 +1,76 @@
+"""Async variants of the login and registration views of dj_rest_auth, for `config.asgi`.
+
+Django runs sync views under ASGI in its one thread of thread-sensitive code, where
+a burst of logins would wait in turn for `hashing_executor`. These views first
+verify or hash the password of the request with `acheck_password` and `aencode`,
+which hold no thread while they wait, then answer with dj_rest_auth's view, which
+uses those results instead of hashing again. Requests whose password could not be
+hashed ahead, like malformed ones, are answered the same, only by hashing in that
+thread.
+"""
+from asgiref.sync import sync_to_async
+from dj_rest_auth.registration.views import RegisterView
+from dj_rest_auth.views import LoginView
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.core.transactions import TransactionPolicyMiddleware
+from apps.users.hashers import acheck_password, aencode, precomputed_hashes
+
+
+def prehashing_view(view, prehash):
+    """Return an async view awaiting `prehash(data)` for POST requests, then `view`.
+
+    `data` is the request's data parsed like by DRF, `view` is a sync view which is
+    run in the thread of thread-sensitive code, like Django runs sync views, and in
+    a transaction like by `TransactionPolicyMiddleware`, which skips async views.
+    """
+    call_atomic = sync_to_async(TransactionPolicyMiddleware.call_atomic)
+    sync_view = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        with precomputed_hashes():
+            if request.method == "POST":
+                await prehash(request_data(request))
+            if TransactionPolicyMiddleware.is_atomic(request, view):
+                return await call_atomic(request, view, args, kwargs)
+            return await sync_view(request, *args, **kwargs)
+
+    # DRF views are exempt, they check CSRF tokens of session authentication.
+    async_view.csrf_exempt = True
+    return async_view
+
+
+def request_data(request):
+    """Return the parsed data of the request, or an empty dict if it is malformed."""
+    # Read first, so the body is kept for the DRF request of the sync view.
+    request.body
+    parsers = [parser() for parser in api_settings.DEFAULT_PARSER_CLASSES]
+    try:
+        data = Request(request, parsers=parsers).data
+    except ParseError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def verify_login(data):
+    """Verify the password of the user of the email, who logs in by email."""
+    email, password = data.get("email"), data.get("password")
+    if not email or not password:
+        return
+    user = await get_user_model().objects.filter(email__iexact=email).afirst()
+    if user is not None:
+        await acheck_password(password, user.password)
+
+
+async def hash_registration(data):
+    """Hash the password of the registration, unless its confirmation differs."""
+    password = data.get("password1")
+    if password and password == data.get("password2"):
+        await aencode(password)
+
+
+login = prehashing_view(LoginView.as_view(), verify_login)
+register = prehashing_view(RegisterView.as_view(), hash_registration)
@@ -0,0 +1,142 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+import redis
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """Read-through cache of users by their id, in this process and in a shared cache.
+
+    Only the fields in `fields` are cached, never the password hash, and every
+    lookup returns a new user loaded from them like from the default database, so
+    requests never share one. Its other fields are deferred, reading one queries
+    the database. Views which show or change other fields of the user load it from
+    the database, see `apps.users.views`. `version` is part of the keys, so
+    entries with other fields are never read.
+
+    Entries live for `AUTH_USER_CACHE_LOCAL_TIMEOUT` seconds in a bounded LRU of
+    this process, and for `AUTH_USER_CACHE_TIMEOUT` in the Django cache of
+    `AUTH_USER_CACHE_ALIAS`, where `invalidate` deletes them once the transaction
+    commits. Other processes keep using their local copy for at most the local
+    timeout. Errors of the shared cache are logged and treated as misses, like in
+    `CompileCache`, so an outage of it does not fail authentication; an entry it
+    failed to delete lives until `AUTH_USER_CACHE_TIMEOUT`.
+    """
+
+    fields = ("id", "username", "email", "is_active", "is_staff", "is_superuser")
+    version = 2
+    max_size = 1024
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+    @classmethod
+    def make_key(cls, user_id):
+        return f"users:user:{cls.version}:{user_id}"
+
+    def get_or_build(self, user_id, build):
+        """Return the cached user, or build the user and cache its fields.
+
+        `build` is called without arguments, exceptions it raises are not cached.
+        """
+        key = self.make_key(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                record_cache("auth_user", hit=True)
+                return self._load(entry[1])
+        try:
+            data = self.cache.get(key)
+        except (redis.RedisError, OSError):
+            logger.exception("Reading a user from the shared cache failed")
+            data = None
+        record_cache("auth_user", hit=data is not None)
+        if data is None:
+            data = self._dump(build())
+            try:
+                self.cache.set(key, data, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+            except (redis.RedisError, OSError):
+                logger.exception("Writing a user to the shared cache failed")
+        self._remember(key, data, now)
+        return self._load(data)
+
+    def invalidate(self, user_id):
+        """Drop the cached user now in this process, and once the transaction commits."""
+        key = self.make_key(user_id)
+        self._forget(key)
+        transaction.on_commit(lambda: self._delete(key))
+
+    def clear(self):
+        """Drop the entries of this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def _dump(self, user):
+        return {field: getattr(user, field) for field in self.fields}
+
+    def _load(self, data):
+        values = [data[field] for field in self.fields]
+        return get_user_model().from_db(DEFAULT_DB_ALIAS, self.fields, values)
+
+    def _remember(self, key, data, now):
+        with self._lock:
+            self._entries[key] = (now + settings.AUTH_USER_CACHE_LOCAL_TIMEOUT, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _delete(self, key):
+        try:
+            self.cache.delete(key)
+        except (redis.RedisError, OSError):
+            logger.exception("Deleting a user from the shared cache failed")
+        self._forget(key)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTCookieAuthentication(JWTCookieAuthentication):
+    """JWT cookie authentication loading the user through `user_cache`.
+
+    Authenticated requests need no query for the user while it is cached, their
+    `request.user` only has the fields of `UserCache.fields` loaded. Inactive and
+    unknown users are not cached, so they are rejected as before.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from None
+        return user_cache.get_or_build(
+            user_id, partial(super().get_user, validated_token)
+        )
@@ -0,0 +1,256 @@
+"""Password hashing on a bounded pool of threads.
+
+Argon2 takes tens of milliseconds of CPU and memory per hash on purpose, and a
+burst of logins would otherwise hash in every request worker at once.
+`BoundedArgon2PasswordHasher` runs every hash on `hashing_executor`, at most
+`PASSWORD_HASHING_WORKERS` at a time per process, and requests wait in its queue
+for their turn. argon2-cffi releases the GIL while hashing, so the threads hash in
+parallel. Hashes of logins and registrations always wait in the queue, however
+long it is, only optional operations are dropped past
+`PASSWORD_HASHING_MAX_PENDING`.
+
+Under ASGI a sync view blocking on the queue would hold the one thread of Django's
+thread-sensitive code. Async code awaits `aencode` and `acheck_password` instead,
+which remember their results for the sync code of the same request, see
+`apps.users.async_views`.
+
+Hashes made by an older hasher, or with other parameters, are replaced on a
+successful login by `User.check_password`, which hands the rehash to the executor
+and returns without waiting for it.
+"""
+import asyncio
+import contextlib
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.db import connections
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+queue_duration = Histogram(
+    "lem_password_hashing_queue_seconds",
+    "Time password hashing operations waited for a hashing thread.",
+    ["operation"],
+)
+hashing_duration = Histogram(
+    "lem_password_hashing_seconds",
+    "Time spent hashing passwords.",
+    ["operation"],
+)
+dropped = Counter(
+    "lem_password_hashing_dropped",
+    "Optional hashing operations dropped because the queue was full.",
+    ["operation"],
+)
+
+# Results of `aencode` and `acheck_password` in `precomputed_hashes`, by operation.
+_precomputed = contextvars.ContextVar("precomputed_hashes", default=None)
+
+
+class HashingExecutor:
+    """A thread pool of `PASSWORD_HASHING_WORKERS` threads, created on first use.
+
+    Operations submitted from one of its own threads run right away in that
+    thread, so nested hashing cannot wait for a free thread forever. The pool is
+    created again in a forked child, which does not inherit the threads.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_WORKERS,
+                    thread_name_prefix="password-hashing",
+                    initializer=self._mark_worker,
+                )
+                self._pid = os.getpid()
+                self._pending = 0
+            return self._executor
+
+    @property
+    def pending(self):
+        """The number of submitted operations which did not finish yet."""
+        return self._pending
+
+    def in_worker(self):
+        return getattr(self._local, "worker", False)
+
+    def submit(self, operation, func, *args, optional=False):
+        """Run `func(*args)` on a hashing thread and return its future.
+
+        Optional operations are dropped, and None is returned, while
+        `PASSWORD_HASHING_MAX_PENDING` operations are pending already. Other
+        operations are queued without a limit.
+        """
+        executor = self.executor
+        with self._lock:
+            if optional and self._pending >= settings.PASSWORD_HASHING_MAX_PENDING:
+                dropped.labels(operation).inc()
+                return None
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def run():
+            start = time.perf_counter()
+            queue_duration.labels(operation).observe(start - submitted)
+            try:
+                return func(*args)
+            finally:
+                hashing_duration.labels(operation).observe(time.perf_counter() - start)
+                with self._lock:
+                    self._pending -= 1
+
+        return executor.submit(run)
+
+    def run(self, operation, func, *args):
+        """Return `func(*args)`, computed on a hashing thread."""
+        if self.in_worker():
+            return func(*args)
+        return self.submit(operation, func, *args).result()
+
+    async def arun(self, operation, func, *args):
+        """Like `run`, but awaits the result instead of blocking the thread."""
+        return await asyncio.wrap_future(self.submit(operation, func, *args))
+
+    def shutdown(self):
+        """Wait for the pending operations and stop the threads."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _mark_worker(self):
+        self._local.worker = True
+
+
+hashing_executor = HashingExecutor()
+
+
+class BoundedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 hashing on `hashing_executor`, compatible with existing argon2 hashes.
+
+    Results computed ahead by `aencode` and `acheck_password` are used once instead
+    of hashing again.
+    """
+
+    def encode(self, password, salt):
+        encoded = _recall(("encode", password))
+        if encoded is None:
+            encoded = hashing_executor.run("encode", super().encode, password, salt)
+        return encoded
+
+    def verify(self, password, encoded):
+        correct = _recall(("verify", password, encoded))
+        if correct is None:
+            correct = hashing_executor.run("verify", super().verify, password, encoded)
+        return correct
+
+
+@contextlib.contextmanager
+def precomputed_hashes():
+    """Remember the results of `aencode` and `acheck_password` within the block.
+
+    Sync code called from the block with `sync_to_async` runs in a copy of its
+    context, where `BoundedArgon2PasswordHasher` uses each result once.
+    """
+    token = _precomputed.set({})
+    try:
+        yield
+    finally:
+        _precomputed.reset(token)
+
+
+async def aencode(password):
+    """Hash the password on a hashing thread for the next `make_password` of it.
+
+    Returns the hash, or None when the preferred hasher is not
+    `BoundedArgon2PasswordHasher`. The salt is chosen here, like by
+    `make_password`.
+    """
+    hasher = get_hasher()
+    if not isinstance(hasher, BoundedArgon2PasswordHasher):
+        return None
+    encoded = await hashing_executor.arun(
+        "encode", hasher.encode, password, hasher.salt()
+    )
+    return _remember(("encode", password), encoded)
+
+
+async def acheck_password(password, encoded):
+    """Verify the password on a hashing thread for the next `check_password` of it.
+
+    Returns whether the password matches the hash, or None when the hash is not
+    one of `BoundedArgon2PasswordHasher`.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return None
+    if not isinstance(hasher, BoundedArgon2PasswordHasher):
+        return None
+    correct = await hashing_executor.arun("verify", hasher.verify, password, encoded)
+    return _remember(("verify", password, encoded), correct)
+
+
+def rehash_password(user_id, password, encoded):
+    """Replace the user's hash `encoded` by a hash of the preferred hasher.
+
+    The hash is replaced only while it is still `encoded`, so a password changed
+    in the meantime is kept. Runs on a hashing thread, whose database connection is
+    closed afterwards.
+    """
+    from apps.users.authentication import user_cache
+
+    try:
+        updated = (
+            get_user_model()
+            .objects.filter(pk=user_id, password=encoded)
+            .update(password=make_password(password))
+        )
+        if updated:
+            user_cache.invalidate(user_id)
+    except Exception:
+        logger.exception("Rehashing the password of user %s failed", user_id)
+    finally:
+        if hashing_executor.in_worker():
+            connections.close_all()
+
+
+def schedule_rehash(user_id, password, encoded):
+    """Rehash the password on a hashing thread, unless the queue is full."""
+    return hashing_executor.submit(
+        "rehash", rehash_password, user_id, password, encoded, optional=True
+    )
+
+
+def _remember(key, result):
+    results = _precomputed.get()
+    if results is not None:
+        results[key] = result
+    return result
+
+
+def _recall(key):
+    results = _precomputed.get()
+    return None if results is None else results.pop(key, None)
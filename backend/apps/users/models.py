@@ -1,5 +1,18 @@
+from django.contrib.auth import hashers
 from django.contrib.auth.models import AbstractUser
 
+from apps.users.hashers import schedule_rehash
+
 
 class User(AbstractUser):
-    pass
+    def check_password(self, raw_password):
+        """Return whether the password is correct, like Django's.
+
+        An outdated hash is replaced in the background by `schedule_rehash`,
+        rather than by a second hash and a save during the login.
+        """
+
+        def setter(raw_password):
+            schedule_rehash(self.pk, raw_password, self.password)
+
+        return hashers.check_password(raw_password, self.password, setter)
@@ -0,0 +1,34 @@
+from importlib import import_module
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.utils import timezone
+
+
+@shared_task
+def clear_expired_sessions(chunk_size=None, max_chunks=None):
+    """Delete expired sessions stored in the database, one chunk per statement.
+
+    Unlike `clearsessions`, which deletes all expired rows in one statement, every
+    chunk commits on its own, so rows are locked only briefly and an interrupted
+    run keeps what it deleted. At most `max_chunks` are deleted per run, the rest
+    is left for the next one. Sessions kept only in the cache expire there.
+    """
+    chunk_size = chunk_size or settings.SESSION_CLEANUP_CHUNK_SIZE
+    max_chunks = max_chunks or settings.SESSION_CLEANUP_MAX_CHUNKS
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not issubclass(store, DatabaseSessionStore):
+        return 0
+    expired = store.get_model_class().objects.filter(expire_date__lt=timezone.now())
+    deleted = 0
+    for _ in range(max_chunks):
+        keys = list(
+            expired.order_by("expire_date").values_list("pk", flat=True)[:chunk_size]
+        )
+        if keys:
+            # Filtered by expiry again, in case a session was renewed meanwhile.
+            deleted += expired.filter(pk__in=keys).delete()[0]
+        if len(keys) < chunk_size:
+            break
+    return deleted
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import AsyncClient
+from django.urls import resolve, reverse
+from prometheus_client import REGISTRY
+
+from apps.users.models import User
+from apps.users.tests.factories import UserFactory
+
+BOUNDED = "apps.users.hashers.BoundedArgon2PasswordHasher"
+PASSWORD = "N3w-P@ssw0rd"
+
+
+@pytest.mark.parametrize("name", ["async_rest_login", "async_rest_register"])
+def test_views_are_async(name):
+    view = resolve(reverse(name)).func
+
+    assert asyncio.iscoroutinefunction(view)
+
+
+@pytest.mark.django_db()
+class TestLogin:
+    def test_verified_once(self):
+        user = UserFactory.create(password=make_password(PASSWORD))
+        verified_before = hashed("verify")
+
+        response = post(
+            reverse("async_rest_login"), {"email": user.email, "password": PASSWORD}
+        )  # act
+
+        assert response.status_code == 200
+        assert response.cookies[settings.JWT_AUTH_COOKIE].value
+        assert hashed("verify") == verified_before + 1
+
+    def test_wrong_password(self):
+        user = UserFactory.create(password=make_password(PASSWORD))
+        verified_before = hashed("verify")
+
+        response = post(
+            reverse("async_rest_login"), {"email": user.email, "password": "wrong"}
+        )  # act
+
+        assert response.status_code == 400
+        assert hashed("verify") == verified_before + 1
+
+    def test_malformed(self):
+        response = post(reverse("async_rest_login"), "{")  # act
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db()
+class TestRegister:
+    def test_hashed_once(self):
+        encoded_before = hashed("encode")
+
+        response = post(
+            reverse("async_rest_register"),
+            {
+                "email": "reader@example.com",
+                "password1": PASSWORD,
+                "password2": PASSWORD,
+            },
+        )  # act
+
+        assert response.status_code == 201
+        assert hashed("encode") == encoded_before + 1
+        user = User.objects.get(email="reader@example.com")
+        assert user.password.startswith("argon2$")
+        assert check_password(PASSWORD, user.password)
+
+
+@pytest.fixture(autouse=True)
+def _argon2(settings):
+    settings.PASSWORD_HASHERS = [BOUNDED]
+
+
+def post(url, data):
+    """Post JSON through Django's async handler and return the response.
+
+    The sync code of the request, the queries, runs in the test's thread, so it
+    sees the data of the test's transaction.
+    """
+
+    async def request():
+        return await AsyncClient().post(url, data, content_type="application/json")
+
+    return async_to_sync(request)()
+
+
+def hashed(operation):
+    return (
+        REGISTRY.get_sample_value(
+            "lem_password_hashing_queue_seconds_count", {"operation": operation}
+        )
+        or 0
+    )
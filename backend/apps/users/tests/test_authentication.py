@@ -0,0 +1,211 @@
+from unittest import mock
+
+import pytest
+import redis
+from django.conf import settings
+from django.urls import path, reverse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.authentication import UserCache, user_cache
+from apps.users.tests.factories import UserFactory
+
+URL = "/whoami/"
+
+
+@api_view()
+def whoami(request):
+    user = request.user
+    return Response(
+        {"pk": user.pk, "is_staff": user.is_staff, "is_superuser": user.is_superuser}
+    )
+
+
+urlpatterns = [path("whoami/", whoami)]
+
+
+@pytest.fixture(autouse=True)
+def _clear_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+@pytest.fixture()
+def authenticated(db):
+    user = UserFactory.create()
+    client = APIClient()
+    client.cookies[settings.JWT_AUTH_COOKIE] = str(AccessToken.for_user(user))
+    return user, client
+
+
+@pytest.mark.django_db()
+@pytest.mark.urls(__name__)
+class TestCachedJWTCookieAuthentication:
+    def test_cached_user_without_queries(
+        self, authenticated, django_assert_num_queries
+    ):
+        user, client = authenticated
+        client.get(URL)
+
+        with django_assert_num_queries(0):
+            response = client.get(URL)  # act
+
+        assert response.status_code == 200
+        assert response.data["pk"] == user.pk
+
+    def test_shared_cache(self, authenticated, django_assert_num_queries):
+        user, client = authenticated
+        client.get(URL)
+        user_cache.clear()
+
+        with django_assert_num_queries(0):
+            response = client.get(URL)  # act
+
+        assert response.data["pk"] == user.pk
+
+    def test_local_timeout(self, authenticated, settings, django_assert_num_queries):
+        settings.AUTH_USER_CACHE_LOCAL_TIMEOUT = -1
+        user, client = authenticated
+        client.get(URL)
+        user_cache.cache.clear()
+
+        with django_assert_num_queries(1):
+            client.get(URL)  # act
+
+    def test_invalidated_by_save(
+        self, authenticated, django_capture_on_commit_callbacks
+    ):
+        user, client = authenticated
+        client.get(URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_staff = True
+            user.save()
+        response = client.get(URL)
+
+        assert response.data["is_staff"] is True
+
+    def test_deactivated(self, authenticated, django_capture_on_commit_callbacks):
+        user, client = authenticated
+        client.get(URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.is_active = False
+            user.save()
+        response = client.get(URL)
+
+        # The first authentication class, for sessions, sends no challenge.
+        assert response.status_code == 403
+        assert response.data["code"] == "user_inactive"
+
+    def test_password_change(self, authenticated, django_capture_on_commit_callbacks):
+        user, client = authenticated
+        client.get(URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.set_password("N3w-P@ssw0rd")
+            user.save()
+
+        assert user_cache.cache.get(user_cache.make_key(user.pk)) is None
+
+    def test_deleted(self, authenticated, django_capture_on_commit_callbacks):
+        user, client = authenticated
+        client.get(URL)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user.delete()
+        response = client.get(URL)
+
+        assert response.status_code == 403
+        assert response.data["code"] == "user_not_found"
+
+    def test_shared_cache_errors(
+        self, authenticated, django_capture_on_commit_callbacks
+    ):
+        user, client = authenticated
+        shared_cache = mock.Mock()
+        shared_cache.get.side_effect = redis.ConnectionError
+        shared_cache.set.side_effect = redis.ConnectionError
+        shared_cache.delete.side_effect = redis.ConnectionError
+
+        with mock.patch.object(
+            UserCache, "cache", new_callable=mock.PropertyMock
+        ) as property_mock:
+            property_mock.return_value = shared_cache
+            response = client.get(URL)  # act
+            with django_capture_on_commit_callbacks(execute=True):
+                user.save()
+
+        assert response.status_code == 200
+        assert response.data["pk"] == user.pk
+        shared_cache.delete.assert_called_once_with(user_cache.make_key(user.pk))
+
+    def test_separate_instances(self, authenticated):
+        user, client = authenticated
+        client.get(URL)
+
+        first = user_cache.get_or_build(user.pk, pytest.fail)
+        second = user_cache.get_or_build(user.pk, pytest.fail)
+
+        assert first == second
+        assert first is not second
+
+    def test_cached_fields(self, authenticated):
+        user, client = authenticated
+        client.get(URL)
+
+        cached = user_cache.get_or_build(user.pk, pytest.fail)  # act
+
+        assert user_cache.cache.get(user_cache.make_key(user.pk)) == {
+            "id": user.pk,
+            "username": user.username,
+            "email": user.email,
+            "is_active": True,
+            "is_staff": False,
+            "is_superuser": False,
+        }
+        assert not cached._state.adding
+        assert cached._state.db == "default"
+        assert "password" in cached.get_deferred_fields()
+
+    def test_superuser(self, authenticated, django_assert_num_queries):
+        user, client = authenticated
+        user.is_superuser = True
+        user.save()
+        client.get(URL)
+
+        with django_assert_num_queries(0):
+            response = client.get(URL)  # act
+
+        assert response.data["is_superuser"]
+
+
+@pytest.mark.django_db()
+class TestDatabaseUserViews:
+    def test_user_details(self, authenticated):
+        user, client = authenticated
+        client.get(URL)
+        user.first_name = "Renamed"
+        user.save()
+
+        response = client.get(reverse("rest_user_details"))  # act
+
+        assert response.data["first_name"] == "Renamed"
+        assert response.data["email"] == user.email
+
+    def test_password_change(self, authenticated):
+        user, client = authenticated
+        client.get(reverse("rest_user_details"))
+
+        response = client.post(
+            reverse("rest_password_change"),
+            {"new_password1": "N3w-P@ssw0rd", "new_password2": "N3w-P@ssw0rd"},
+        )  # act
+
+        assert response.status_code == 200
+        user.refresh_from_db()
+        assert user.check_password("N3w-P@ssw0rd")
+        assert user.email
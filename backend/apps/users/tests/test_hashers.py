@@ -0,0 +1,174 @@
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from apps.users import hashers
+from apps.users.models import User
+from apps.users.tests.factories import UserFactory
+
+BOUNDED = "apps.users.hashers.BoundedArgon2PasswordHasher"
+PBKDF2 = "django.contrib.auth.hashers.PBKDF2PasswordHasher"
+
+
+class TestBoundedArgon2PasswordHasher:
+    def test_hashes_on_executor(self):
+        encoded_before, verified_before = hashed("encode"), hashed("verify")
+
+        encoded = make_password("secret")  # act
+
+        assert isinstance(identify_hasher(encoded), hashers.BoundedArgon2PasswordHasher)
+        assert check_password("secret", encoded)
+        assert not check_password("wrong", encoded)
+        assert hashed("encode") == encoded_before + 1
+        assert hashed("verify") == verified_before + 2
+
+    def test_runs_in_hashing_thread(self, monkeypatch):
+        threads = []
+        encode = hashers.Argon2PasswordHasher.encode
+
+        def recording_encode(self, password, salt):
+            threads.append(threading.current_thread().name)
+            return encode(self, password, salt)
+
+        monkeypatch.setattr(hashers.Argon2PasswordHasher, "encode", recording_encode)
+
+        make_password("secret")  # act
+
+        assert threads[0].startswith("password-hashing")
+
+    def test_verifies_django_argon2_hashes(self, settings):
+        settings.PASSWORD_HASHERS = ["django.contrib.auth.hashers.Argon2PasswordHasher"]
+        encoded = make_password("secret")
+        settings.PASSWORD_HASHERS = [BOUNDED, PBKDF2]
+
+        assert check_password("secret", encoded)  # act
+
+
+class TestPrecomputed:
+    def test_aencode(self):
+        async def encode():
+            with hashers.precomputed_hashes():
+                encoded = await hashers.aencode("secret")
+                return encoded, await sync_to_async(make_password)("secret")
+
+        encoded, made = async_to_sync(encode)()  # act
+
+        assert made == encoded
+        assert check_password("secret", encoded)
+
+    def test_acheck_password(self):
+        encoded = make_password("secret")
+        verified_before = hashed("verify")
+
+        async def check():
+            with hashers.precomputed_hashes():
+                correct = await hashers.acheck_password("wrong", encoded)
+                return correct, await sync_to_async(check_password)("wrong", encoded)
+
+        results = async_to_sync(check)()  # act
+
+        assert results == (False, False)
+        assert hashed("verify") == verified_before + 1
+
+    def test_other_hashers_not_precomputed(self):
+        encoded = make_password("secret", hasher="pbkdf2_sha256")
+
+        correct = async_to_sync(hashers.acheck_password)("secret", encoded)  # act
+
+        assert correct is None
+
+    def test_used_once(self):
+        async def encode():
+            with hashers.precomputed_hashes():
+                encoded = await hashers.aencode("secret")
+                made = await sync_to_async(make_password)("secret")
+                return encoded, made, await sync_to_async(make_password)("secret")
+
+        encoded, made, made_again = async_to_sync(encode)()  # act
+
+        assert made == encoded
+        assert made_again != encoded
+
+
+@pytest.mark.django_db()
+class TestRehash:
+    def test_login_schedules_rehash(self, monkeypatch):
+        scheduled = []
+        monkeypatch.setattr(
+            "apps.users.models.schedule_rehash",
+            lambda *args: scheduled.append(args),
+        )
+        user = UserFactory.create(
+            password=make_password("secret", hasher="pbkdf2_sha256")
+        )
+
+        response = APIClient().post(
+            reverse("rest_login"), {"email": user.email, "password": "secret"}
+        )  # act
+
+        assert response.status_code == 200
+        assert scheduled == [(user.pk, "secret", user.password)]
+        user.refresh_from_db()
+        assert user.password.startswith("pbkdf2_sha256$")
+
+    def test_current_hash_not_rehashed(self, monkeypatch):
+        scheduled = []
+        monkeypatch.setattr(
+            "apps.users.models.schedule_rehash",
+            lambda *args: scheduled.append(args),
+        )
+        user = User(password=make_password("secret"))
+
+        assert user.check_password("secret")  # act
+
+        assert scheduled == []
+
+    def test_rehash_password(self, django_capture_on_commit_callbacks):
+        user = UserFactory.create(
+            password=make_password("secret", hasher="pbkdf2_sha256")
+        )
+
+        with django_capture_on_commit_callbacks(execute=True):
+            hashers.rehash_password(user.pk, "secret", user.password)  # act
+
+        user.refresh_from_db()
+        assert user.password.startswith("argon2$")
+        assert user.check_password("secret")
+
+    def test_changed_password_kept(self):
+        old = make_password("secret", hasher="pbkdf2_sha256")
+        user = UserFactory.create(
+            password=make_password("changed", hasher="pbkdf2_sha256")
+        )
+
+        hashers.rehash_password(user.pk, "secret", old)  # act
+
+        user.refresh_from_db()
+        assert user.password.startswith("pbkdf2_sha256$")
+        assert check_password("changed", user.password)
+
+    def test_rehash_dropped_when_queue_full(self, settings):
+        settings.PASSWORD_HASHING_MAX_PENDING = 0
+
+        future = hashers.schedule_rehash(1, "secret", "pbkdf2_sha256$")  # act
+
+        assert future is None
+
+
+@pytest.fixture(autouse=True)
+def _argon2(settings):
+    settings.PASSWORD_HASHERS = [BOUNDED, PBKDF2]
+
+
+def hashed(operation):
+    return (
+        REGISTRY.get_sample_value(
+            "lem_password_hashing_queue_seconds_count", {"operation": operation}
+        )
+        or 0
+    )
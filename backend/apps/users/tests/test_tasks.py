@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+from apps.users.tasks import clear_expired_sessions
+
+
+@pytest.fixture()
+def _sessions(db):
+    now = timezone.now()
+    create_sessions(5, now - timedelta(days=1))
+    create_sessions(2, now + timedelta(days=1))
+
+
+@pytest.mark.usefixtures("_sessions")
+class TestClearExpiredSessions:
+    def test_deletes_expired(self, django_assert_num_queries):
+        with django_assert_num_queries(6):
+            deleted = clear_expired_sessions.delay(chunk_size=2).get()  # act
+
+        assert deleted == 5
+        assert Session.objects.count() == 2
+        assert not Session.objects.filter(expire_date__lt=timezone.now()).exists()
+
+    def test_max_chunks(self):
+        deleted = clear_expired_sessions(chunk_size=2, max_chunks=2)
+
+        assert deleted == 4
+        assert Session.objects.count() == 3
+
+    def test_cache_engine(self, settings):
+        settings.SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+
+        assert clear_expired_sessions() == 0
+        assert Session.objects.count() == 7
+
+
+def create_sessions(count, expire_date):
+    Session.objects.bulk_create(
+        Session(
+            session_key=f"{expire_date:%s}-{number}",
+            session_data=SessionStore().encode({}),
+            expire_date=expire_date,
+        )
+        for number in range(count)
+    )
@@ -0,0 +1,26 @@
+from dj_rest_auth import views
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class DatabaseUserMixin:
+    """Replace the authenticated user of the request by the user in the database.
+
+    For views which show or change fields of the user. The user of JWT cookie
+    authenticated requests only has the cached fields, see `UserCache`.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user = get_user_model().objects.filter(pk=request.user.pk).first()
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        request.user = user
+
+
+class UserDetailsView(DatabaseUserMixin, views.UserDetailsView):
+    pass
+
+
+class PasswordChangeView(DatabaseUserMixin, views.PasswordChangeView):
+    pass
@@ -2,6 +2,19 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from apps.core.db.pool import open_pools
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up.
+from apps.core.asgi import WSGIViews  # noqa: E402
+from apps.forum.streams import ReplyEventStream  # noqa: E402
+
+# Streams of reply events are served next to Django, see apps.forum.streams, and
+# streaming responses which query as they stream by Django's WSGI handler.
+application = ReplyEventStream(WSGIViews(django_application, ["forum:export"]))
+
+# Connect pooled databases before the first request.
+open_pools()
@@ -0,0 +1,13 @@
+"""Gunicorn hooks of the application servers.
+
+Pass the module to gunicorn with the rest of the settings on the command line or
+in GUNICORN_CMD_ARGS, e.g.::
+
+    gunicorn -c python:config.gunicorn -k uvicorn.workers.UvicornWorker config.asgi
+"""
+from apps.core.metrics import mark_process_dead
+
+
+def child_exit(server, worker):
+    """Drop the live metrics of an exited worker from PROMETHEUS_MULTIPROC_DIR."""
+    mark_process_dead(worker.pid)
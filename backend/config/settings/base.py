@@ -27,7 +27,39 @@ LOCALE_PATHS = [str(BACKEND_DIR / "locale")]
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#databases
 DATABASES = {"default": env.db("DATABASE_URL")}
-DATABASES["default"]["ATOMIC_REQUESTS"] = True
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica-1/lem,postgres://...
+# Reads of the routed apps within safe requests are spread over them, see
+# apps.core.replicas. In tests they mirror the default database.
+DATABASE_REPLICAS = []
+for index, url in enumerate(env.list("DATABASE_REPLICA_URLS", default=[])):
+    DATABASES[f"replica_{index}"] = {
+        **env.db_url_config(url),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+# Connections taken from a pool per process and returned after every request,
+# instead of one persistent connection per thread, see apps.core.db.pool.
+if env.bool("DATABASE_POOL", default=False):
+    for alias in ["default", *DATABASE_REPLICAS]:
+        DATABASES[alias]["ENGINE"] = "apps.core.db.backends.postgresql_pool"
+        DATABASES[alias]["CONN_MAX_AGE"] = 0
+        DATABASES[alias]["POOL"] = {
+            "MIN_SIZE": env.int("DATABASE_POOL_MIN_SIZE", default=2),
+            "MAX_SIZE": env.int("DATABASE_POOL_MAX_SIZE", default=10),
+            # Seconds a request waits for a free connection before it fails.
+            "TIMEOUT": env.float("DATABASE_POOL_TIMEOUT", default=5.0),
+            # Check idle connections with a query before handing them out.
+            "PRE_PING": env.bool("DATABASE_POOL_PRE_PING", default=True),
+        }
+# https://docs.djangoproject.com/en/dev/ref/settings/#database-routers
+DATABASE_ROUTERS = ["apps.core.replicas.ReplicaRouter"]
+REPLICA_ROUTED_APPS = ["forum", "books", "quotes"]
+# Time a client reads from the primary after it wrote, and the cookie pinning it.
+REPLICA_PIN_SECONDS = env.int("REPLICA_PIN_SECONDS", default=5)
+REPLICA_PIN_COOKIE = "lem-primary"
+# Requests with these methods run in a transaction, views can override them with
+# `atomic_methods`, see apps.core.transactions. Replaces ATOMIC_REQUESTS.
+ATOMIC_REQUEST_METHODS = ["POST", "PUT", "PATCH", "DELETE"]
 # https://docs.djangoproject.com/en/stable/ref/settings/#std:setting-DEFAULT_AUTO_FIELD
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -50,6 +82,7 @@ DJANGO_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -68,6 +101,7 @@ THIRD_PARTY_APPS = [
 
 
 LOCAL_APPS = [
+    "apps.core",
     "apps.users",
     "apps.forum",
     "apps.news",
@@ -96,10 +130,14 @@ AUTH_USER_MODEL = "users.User"
 # https://docs.djangoproject.com/en/dev/ref/settings/#password-hashers
 PASSWORD_HASHERS = [
     # https://docs.djangoproject.com/en/dev/topics/auth/passwords/#using-argon2-with-django
-    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "apps.users.hashers.BoundedArgon2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",
     "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
 ]
+# Argon2 hashes run on this many threads per process, see apps.users.hashers.
+PASSWORD_HASHING_WORKERS = env.int("PASSWORD_HASHING_WORKERS", default=2)
+# Rehashes of outdated hashes are skipped while this many hashes are pending.
+PASSWORD_HASHING_MAX_PENDING = env.int("PASSWORD_HASHING_MAX_PENDING", default=100)
 # https://docs.djangoproject.com/en/dev/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +153,8 @@ AUTH_PASSWORD_VALIDATORS = [
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
+    "apps.core.middleware.RequestMetricsMiddleware",
+    "apps.core.replicas.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -125,6 +165,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.common.BrokenLinkEmailsMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "apps.core.transactions.TransactionPolicyMiddleware",
 ]
 
 
@@ -179,6 +220,14 @@ TEMPLATES = [
 ]
 
 
+# SESSIONS
+# ------------------------------------------------------------------------------
+# Expired sessions stored in the database are deleted by a periodic task, in
+# chunks of this size and at most this many chunks per run.
+SESSION_CLEANUP_CHUNK_SIZE = 1000
+SESSION_CLEANUP_MAX_CHUNKS = 100
+
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#session-cookie-httponly
@@ -258,6 +307,17 @@ CELERY_TASK_TIME_LIMIT = 5 * 60
 CELERY_TASK_SOFT_TIME_LIMIT = 60
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-scheduler
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html#beat-schedule
+CELERY_BEAT_SCHEDULE = {
+    "clear-expired-sessions": {
+        "task": "apps.users.tasks.clear_expired_sessions",
+        "schedule": 15 * 60,
+    },
+    "requeue-pending-markdown": {
+        "task": "apps.forum.tasks.requeue_pending_markdown",
+        "schedule": 10 * 60,
+    },
+}
 
 
 # django-rest-framework
@@ -266,7 +326,7 @@ CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.SessionAuthentication",
-        "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
+        "apps.users.authentication.CachedJWTCookieAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -290,6 +350,11 @@ REST_USE_JWT = True
 REST_AUTH_TOKEN_MODEL = None
 JWT_AUTH_COOKIE = "lem-auth-cookie"
 JWT_AUTH_REFRESH_COOKIE = "lem-auth-token"
+# Users of JWT authenticated requests, cached by id in every process for the
+# local timeout and in the shared cache for the other, see apps.users.authentication.
+AUTH_USER_CACHE_ALIAS = "default"
+AUTH_USER_CACHE_TIMEOUT = env.int("AUTH_USER_CACHE_TIMEOUT", default=5 * 60)
+AUTH_USER_CACHE_LOCAL_TIMEOUT = env.int("AUTH_USER_CACHE_LOCAL_TIMEOUT", default=5)
 
 
 # django-cors-headers - https://github.com/adamchainz/django-cors-headers#setup
@@ -309,3 +374,50 @@ SPECTACULAR_SETTINGS = {
         {"url": "http://127.0.0.1:8000", "description": "Local Development server"},
     ],
 }
+
+
+# Request metrics
+# ------------------------------------------------------------------------------
+# Queries, their duration and cache lookups recorded per request and view.
+REQUEST_METRICS_ENABLED = env.bool("REQUEST_METRICS_ENABLED", default=True)
+# https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Server-Timing
+REQUEST_METRICS_SERVER_TIMING = env.bool("REQUEST_METRICS_SERVER_TIMING", default=True)
+# A warning is logged for requests over any of these, None disables a budget.
+# Times are in seconds.
+REQUEST_METRICS_BUDGETS = {
+    "queries": env.int("REQUEST_BUDGET_QUERIES", default=50),
+    "db_time": env.float("REQUEST_BUDGET_DB_TIME", default=0.5),
+    "time": env.float("REQUEST_BUDGET_TIME", default=1.0),
+}
+# Budgets of single views by URL name, e.g. {"forum:post-search": {"time": 2.0}}.
+REQUEST_METRICS_VIEW_BUDGETS = {}
+# Token scrapers of /metrics/ have to send as a bearer token, None leaves the
+# endpoint open, which only local settings allow. Production requires a token.
+METRICS_TOKEN = env("METRICS_TOKEN", default=None)
+
+
+# Forum
+# ------------------------------------------------------------------------------
+# Number of compiled markdown documents memoized in every process.
+FORUM_MARKDOWN_CACHE_SIZE = env.int("FORUM_MARKDOWN_CACHE_SIZE", default=1024)
+# Cache shared between processes backing the in-process memoization.
+FORUM_MARKDOWN_CACHE_ALIAS = "default"
+FORUM_MARKDOWN_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Markdown at least this long is compiled by a Celery task after the save commits,
+# None compiles all markdown during the save.
+FORUM_MARKDOWN_ASYNC_MIN_LENGTH = env.int(
+    "FORUM_MARKDOWN_ASYNC_MIN_LENGTH", default=None
+)
+# Time after which a queued compilation that never ran can be queued again.
+FORUM_MARKDOWN_COMPILE_LOCK_TIMEOUT = 10 * 60
+# Cache of serialized post details, and the time after which its entries expire
+# even without any change, e.g. of the author's username.
+FORUM_POST_CACHE_ALIAS = "default"
+FORUM_POST_CACHE_TIMEOUT = env.int("FORUM_POST_CACHE_TIMEOUT", default=60 * 60)
+# Reply events of posts streamed to clients, see apps.forum.events. The memory
+# backend reaches streams of the same process only.
+FORUM_EVENTS_BACKEND = "apps.forum.events.MemoryEventBackend"
+FORUM_EVENTS_OPTIONS = {}
+# Clients further behind are disconnected, idle streams get a comment this often.
+FORUM_EVENTS_QUEUE_SIZE = 100
+FORUM_EVENTS_KEEPALIVE = 15
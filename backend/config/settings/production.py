@@ -11,9 +11,11 @@ ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS")
 
 # DATABASES
 # ------------------------------------------------------------------------------
-DATABASES["default"] = env.db("DATABASE_URL")  # noqa F405
-DATABASES["default"]["ATOMIC_REQUESTS"] = True  # noqa F405
-DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)  # noqa F405
+# Pooled databases return their connections after every request, see base.
+for alias in ["default", *DATABASE_REPLICAS]:  # noqa F405
+    DATABASES[alias].setdefault(  # noqa F405
+        "CONN_MAX_AGE", env.int("CONN_MAX_AGE", default=60)
+    )
 
 
 # CACHES
@@ -22,10 +24,36 @@ CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
         "LOCATION": env("REDIS_URL"),
-    }
+    },
+    # Preferably a Redis which does not evict keys, sessions would be lost.
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("SESSION_REDIS_URL", default=env("REDIS_URL")),
+        "KEY_PREFIX": "sessions",
+    },
 }
 
 
+# SESSIONS
+# ------------------------------------------------------------------------------
+# https://docs.djangoproject.com/en/dev/topics/http/sessions/#using-cached-sessions
+# Sessions are read from Redis, and with the write-through also written to the
+# database, from where they are read when they are missing in Redis.
+SESSION_ENGINE = (
+    "django.contrib.sessions.backends.cached_db"
+    if env.bool("SESSION_WRITE_THROUGH", default=True)
+    else "django.contrib.sessions.backends.cache"
+)
+SESSION_CACHE_ALIAS = "sessions"
+
+
+# FORUM
+# ------------------------------------------------------------------------------
+# Reply events reach the streams of all processes through Redis pub/sub.
+FORUM_EVENTS_BACKEND = "apps.forum.events.RedisEventBackend"
+FORUM_EVENTS_OPTIONS = {"url": env("FORUM_EVENTS_REDIS_URL", default=env("REDIS_URL"))}
+
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-proxy-ssl-header
@@ -72,6 +100,12 @@ EMAIL_SUBJECT_PREFIX = env(
 ADMIN_URL = env("DJANGO_ADMIN_URL")
 
 
+# METRICS
+# ------------------------------------------------------------------------------
+# Bearer token of the scrapers of /metrics/, which is never left open here.
+METRICS_TOKEN = env("METRICS_TOKEN")
+
+
 # LOGGING
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#logging
@@ -4,8 +4,26 @@ from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from apps.core.views import metrics
+from apps.users import async_views as users_async_views
+from apps.users.views import PasswordChangeView, UserDetailsView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    # Before dj_rest_auth's views of the same names, which use the cached user.
+    path("api-auth/user/", UserDetailsView.as_view(), name="rest_user_details"),
+    path(
+        "api-auth/password/change/",
+        PasswordChangeView.as_view(),
+        name="rest_password_change",
+    ),
+    # Async variants of login and registration, for deployments on config.asgi.
+    path("api-auth/async/login/", users_async_views.login, name="async_rest_login"),
+    path(
+        "api-auth/async/registration/",
+        users_async_views.register,
+        name="async_rest_register",
+    ),
     path("api-auth/", include("dj_rest_auth.urls")),
     path("api-auth/registration/", include("dj_rest_auth.registration.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
@@ -19,6 +37,7 @@ urlpatterns = [
     path("api/news/", include("apps.news.urls")),
     path("api/quotes/", include("apps.quotes.urls")),
     path("api/groups/", include("apps.groups.urls")),
+    path("metrics/", metrics, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 if settings.DEBUG:
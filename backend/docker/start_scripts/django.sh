@@ -5,5 +5,10 @@ set -o pipefail
 set -o nounset
 
 
+# Metrics of processes from an earlier run would be aggregated with the new ones.
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+    mkdir -p "${PROMETHEUS_MULTIPROC_DIR}"
+    find "${PROMETHEUS_MULTIPROC_DIR}" -mindepth 1 -delete
+fi
 python manage.py migrate
 python manage.py runserver_plus 0.0.0.0:8000